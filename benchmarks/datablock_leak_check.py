@@ -0,0 +1,130 @@
+'''
+Regression check that exports don't leave data-blocks behind.
+
+Builds a scene of meshes with modifiers, then runs many consecutive EVALUATED exports of it, one of which fails with an
+`ASEBuildError` while the evaluated mesh is held (its color attribute is on the wrong domain). The number of meshes and
+objects in `bpy.data` must be the same after the exports as before them. The extraction cache is not used, so that
+every export evaluates every mesh.
+
+This must be run in Blender, in the background:
+
+    blender -b --factory-startup --python benchmarks/datablock_leak_check.py -- --exports 100
+
+The process exits with a non-zero code if any data-blocks were leaked, or if the failing export didn't fail.
+'''
+
+import argparse
+import os
+import sys
+from typing import Tuple
+
+import bmesh
+import bpy
+from bpy.types import Collection, Material, Mesh, Object
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from io_scene_ase.builder import ASEBuildError, ASEBuildOptions, build_ase
+from io_scene_ase.dfs import dfs_collection_objects
+from io_scene_ase.materials import MaterialTable
+
+
+def _create_collection(name: str) -> Collection:
+    collection = bpy.data.collections.new(name)
+    bpy.context.scene.collection.children.link(collection)
+    return collection
+
+
+def _create_cube_mesh(name: str, material: Material) -> Mesh:
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    bm.loops.layers.uv.new()
+    bmesh.ops.create_cube(bm, size=1.0, calc_uvs=True)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.materials.append(material)
+    return mesh
+
+
+def _create_modified_object(name: str, mesh: Mesh, collection: Collection) -> Object:
+    obj = bpy.data.objects.new(name, mesh)
+    collection.objects.link(obj)
+    # The modifiers make the evaluated mesh differ from the original, so that it must be evaluated into a temporary
+    # mesh.
+    subdivision = obj.modifiers.new('Subdivision', 'SUBSURF')
+    subdivision.levels = 1
+    obj.modifiers.new('Mirror', 'MIRROR')
+    return obj
+
+
+def create_scene() -> Tuple[Collection, Collection, Material]:
+    '''
+    @return: The collection that exports successfully, the collection whose export fails, and the material they use.
+    '''
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    material = bpy.data.materials.new('Material')
+
+    collection = _create_collection('Export')
+    for i in range(8):
+        _create_modified_object(f'Cube{i}', _create_cube_mesh(f'Cube{i}', material), collection)
+
+    broken_collection = _create_collection('Broken')
+    broken_mesh = _create_cube_mesh('Broken', material)
+    # Only color attributes on the CORNER domain can be exported.
+    broken_mesh.color_attributes.new('Color', 'BYTE_COLOR', 'POINT')
+    _create_modified_object('Broken', broken_mesh, broken_collection)
+
+    return collection, broken_collection, material
+
+
+def export(collection: Collection, material: Material, vertex_color_attribute: str = ''):
+    options = ASEBuildOptions()
+    options.object_eval_state = 'EVALUATED'
+    options.materials = MaterialTable([material])
+    if vertex_color_attribute:
+        options.has_vertex_colors = True
+        options.vertex_color_mode = 'EXPLICIT'
+        options.vertex_color_attribute = vertex_color_attribute
+    build_ase(bpy.context, options, dfs_collection_objects(collection))
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(prog='datablock_leak_check')
+    parser.add_argument('--exports', type=int, default=100, help='The number of consecutive exports')
+    args = parser.parse_args(argv)
+
+    collection, broken_collection, material = create_scene()
+    mesh_count = len(bpy.data.meshes)
+    object_count = len(bpy.data.objects)
+
+    failing_export_index = args.exports // 2
+    is_failure_raised = False
+    for export_index in range(args.exports):
+        if export_index == failing_export_index:
+            try:
+                export(broken_collection, material, vertex_color_attribute='Color')
+            except ASEBuildError as e:
+                print(f'Export {export_index} failed as expected: {e}')
+                is_failure_raised = True
+        else:
+            export(collection, material)
+
+    is_passed = True
+    if not is_failure_raised:
+        print(f'Export {failing_export_index} was expected to raise an ASEBuildError, but didn\'t')
+        is_passed = False
+    if len(bpy.data.meshes) != mesh_count:
+        print(f'Meshes leaked: {mesh_count} before the exports, {len(bpy.data.meshes)} after')
+        is_passed = False
+    if len(bpy.data.objects) != object_count:
+        print(f'Objects leaked: {object_count} before the exports, {len(bpy.data.objects)} after')
+        is_passed = False
+    if is_passed:
+        print(f'{args.exports} exports left {mesh_count} meshes and {object_count} objects unchanged')
+
+    sys.exit(0 if is_passed else 1)
+
+
+if __name__ == '__main__':
+    main()
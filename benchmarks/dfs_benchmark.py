@@ -0,0 +1,168 @@
+'''
+Stress benchmark for the depth-first traversal of collections (`dfs_collection_objects`).
+
+Each scenario fills a collection with empties in a particular hierarchy, at a range of sizes, and times the traversal.
+The time per object should stay roughly constant as the size grows; the reported scaling exponent (the slope of time
+against size on a log-log scale, between the smallest and the largest size) should be close to 1.
+
+    flat    Objects without parents.
+    wide    A single parent with every other object as its direct child.
+    deep    Chains of parented objects, each `--depth` objects long.
+    mixed   Trees with a branching factor of 4, with a third of the objects left out of the collection.
+
+This must be run in Blender, in the background:
+
+    blender -b --factory-startup --python benchmarks/dfs_benchmark.py -- --sizes 1000 4000 16000
+
+With `--reference`, the previous traversal, which checked membership and children once per object, is also timed (up
+to `--reference-max-size` objects, since it is quadratic), and both traversals are checked to yield the same objects
+in the same order.
+'''
+
+import argparse
+import gc
+import math
+import os
+import sys
+import time
+from typing import Callable, Dict, Iterable, List
+
+import bpy
+from bpy.types import Collection, Object
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from io_scene_ase.dfs import dfs_collection_objects
+
+
+def _reset_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    gc.collect()
+
+
+def _create_collection(name: str) -> Collection:
+    collection = bpy.data.collections.new(name)
+    bpy.context.scene.collection.children.link(collection)
+    return collection
+
+
+def _create_empty(name: str, collection: Collection, parent: Object | None = None) -> Object:
+    obj = bpy.data.objects.new(name, None)
+    obj.parent = parent
+    collection.objects.link(obj)
+    return obj
+
+
+def scenario_flat(collection: Collection, size: int, depth: int):
+    for i in range(size):
+        _create_empty(f'Flat{i}', collection)
+
+
+def scenario_wide(collection: Collection, size: int, depth: int):
+    root = _create_empty('Root', collection)
+    for i in range(size - 1):
+        _create_empty(f'Child{i}', collection, root)
+
+
+def scenario_deep(collection: Collection, size: int, depth: int):
+    parent = None
+    for i in range(size):
+        parent = _create_empty(f'Chain{i // depth}_{i % depth}', collection, parent if i % depth else None)
+
+
+def scenario_mixed(collection: Collection, size: int, depth: int):
+    # Objects that aren't in the collection are linked to another collection, so that their children in the collection
+    # become roots of the traversal.
+    other_collection = _create_collection('Other')
+    objects = []
+    for i in range(size):
+        parent = objects[(i - 1) // 4] if i > 0 else None
+        objects.append(_create_empty(f'Node{i}', other_collection if i % 3 == 2 else collection, parent))
+
+
+SCENARIOS: Dict[str, Callable[[Collection, int, int], None]] = {
+    'flat': scenario_flat,
+    'wide': scenario_wide,
+    'deep': scenario_deep,
+    'mixed': scenario_mixed,
+}
+
+
+def _reference_dfs_object_children(obj: Object, collection: Collection) -> Iterable[Object]:
+    yield obj
+    for child in obj.children:
+        if child.name in collection.objects:
+            yield from _reference_dfs_object_children(child, collection)
+
+
+def reference_dfs_objects(collection: Collection) -> Iterable[Object]:
+    '''
+    The previous traversal of the objects directly in a collection.
+    '''
+    objects_hierarchy = []
+    for obj in collection.objects:
+        if obj.parent is None or obj.parent not in set(collection.objects):
+            objects_hierarchy.append(obj)
+    for obj in objects_hierarchy:
+        yield from _reference_dfs_object_children(obj, collection)
+
+
+def measure(function: Callable, repeat: int) -> float:
+    best_seconds = math.inf
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+    return best_seconds
+
+
+def get_scaling_exponent(sizes: List[int], seconds: List[float]) -> float:
+    if len(sizes) < 2 or seconds[0] <= 0.0 or sizes[-1] == sizes[0]:
+        return math.nan
+    return math.log(seconds[-1] / seconds[0]) / math.log(sizes[-1] / sizes[0])
+
+
+def main():
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(prog='dfs_benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000, 8000, 16000, 32000])
+    parser.add_argument('--depth', type=int, default=200, help='The length of the chains of the deep scenario')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS.keys(), default=list(SCENARIOS.keys()))
+    parser.add_argument('--reference', action='store_true', help='Also time and check against the previous traversal')
+    parser.add_argument('--reference-max-size', type=int, default=4000)
+    args = parser.parse_args(argv)
+
+    is_order_mismatched = False
+    for scenario_name in args.scenarios:
+        print(f'{scenario_name}:')
+        print(f'  {"Objects":>8} {"Time (ms)":>10} {"Per object (us)":>16} {"Reference (ms)":>15}')
+        sizes = sorted(args.sizes)
+        times = []
+        for size in sizes:
+            _reset_scene()
+            collection = _create_collection('Benchmark')
+            SCENARIOS[scenario_name](collection, size, args.depth)
+            object_count = len(collection.objects)
+
+            seconds = measure(lambda: list(dfs_collection_objects(collection)), args.repeat)
+            times.append(seconds)
+
+            reference_text = f'{"-":>15}'
+            if args.reference and size <= args.reference_max_size:
+                reference_seconds = measure(lambda: list(reference_dfs_objects(collection)), 1)
+                reference_text = f'{reference_seconds * 1e3:15.1f}'
+                objects = [x.obj for x in dfs_collection_objects(collection)]
+                if objects != list(reference_dfs_objects(collection)):
+                    print(f'  The traversal order differs from the reference with {size} objects')
+                    is_order_mismatched = True
+
+            print(f'  {object_count:8} {seconds * 1e3:10.1f} {seconds / max(object_count, 1) * 1e6:16.2f} '
+                  f'{reference_text}')
+        print(f'  Scaling exponent: {get_scaling_exponent(sizes, times):.2f}')
+
+    sys.exit(1 if is_order_mismatched else 0)
+
+
+if __name__ == '__main__':
+    main()
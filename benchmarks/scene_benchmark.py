@@ -0,0 +1,373 @@
+'''
+Benchmark suite for the whole export pipeline, on procedurally generated scenes.
+
+Each scenario builds a scene from scratch, then times the stages of an export of one of its collections: the
+depth-first traversal (`dfs_collection_objects`), the build (`build_ase`) and the write (`write_ase`). For every stage,
+the best time over the repeats and the peak memory allocated by Python and NumPy (as traced by `tracemalloc`) are
+recorded, along with the size of the output. Memory allocated by Blender itself is not traced; the peak resident set
+size of the whole process is recorded separately.
+
+This must be run in Blender, in the background:
+
+    blender -b --factory-startup --python benchmarks/scene_benchmark.py -- --output report.json
+
+The report can be compared against a stored baseline, in which case the process exits with a non-zero code if any
+stage is slower than the baseline by more than the threshold:
+
+    blender -b --factory-startup --python benchmarks/scene_benchmark.py -- --baseline baseline.json
+'''
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import bmesh
+import bpy
+import numpy as np
+from bpy.types import Collection, Material, Mesh, Object
+from mathutils import Matrix
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from io_scene_ase.builder import ASEBuildOptions, build_ase
+from io_scene_ase.dfs import dfs_collection_objects
+from io_scene_ase.materials import MaterialTable
+from io_scene_ase.writer import write_ase
+
+REPORT_VERSION = 1
+
+STAGES = ('dfs', 'build', 'write')
+
+
+def _reset_scene():
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    gc.collect()
+
+
+def _create_collection(name: str, parent: Optional[Collection] = None) -> Collection:
+    collection = bpy.data.collections.new(name)
+    if parent is None:
+        bpy.context.scene.collection.children.link(collection)
+    else:
+        parent.children.link(collection)
+    return collection
+
+
+def _create_materials(count: int) -> List[Material]:
+    return [bpy.data.materials.new(f'Material{i}') for i in range(count)]
+
+
+def _create_cube_mesh(name: str, materials: List[Material] = ()) -> Mesh:
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    bm.loops.layers.uv.new()
+    bmesh.ops.create_cube(bm, size=1.0, calc_uvs=True)
+    for face in bm.faces:
+        face.material_index = face.index % max(len(materials), 1)
+    bm.to_mesh(mesh)
+    bm.free()
+    for material in materials:
+        mesh.materials.append(material)
+    return mesh
+
+
+def _create_grid_mesh(name: str, segments: int, uv_layer_count: int = 1, has_colors: bool = False,
+                      materials: List[Material] = (), seed: int = 0) -> Mesh:
+    '''
+    Creates a square grid of `segments` x `segments` quads with random heights, so that the smoothing groups and
+    normals are not trivial.
+    '''
+    rng = np.random.default_rng(seed)
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    bm.loops.layers.uv.new()
+    bmesh.ops.create_grid(bm, x_segments=segments, y_segments=segments, size=segments / 2, calc_uvs=True)
+    for vertex in bm.verts:
+        vertex.co.z = rng.random()
+    for face in bm.faces:
+        face.material_index = face.index % max(len(materials), 1)
+    bm.to_mesh(mesh)
+    bm.free()
+    for material in materials:
+        mesh.materials.append(material)
+
+    loop_count = len(mesh.loops)
+    for i in range(1, uv_layer_count):
+        uv_layer = mesh.uv_layers.new(name=f'UVMap{i}')
+        uv_layer.data.foreach_set('uv', rng.random(loop_count * 2, dtype=np.float32))
+
+    if has_colors:
+        color_attribute = mesh.color_attributes.new('Color', 'BYTE_COLOR', 'CORNER')
+        color_attribute.data.foreach_set('color', rng.random(loop_count * 4, dtype=np.float32))
+        mesh.color_attributes.active_color = color_attribute
+
+    return mesh
+
+
+def _create_object(name: str, data: Optional[Mesh], collection: Collection,
+                   location: Tuple[float, float, float] = (0.0, 0.0, 0.0)) -> Object:
+    obj = bpy.data.objects.new(name, data)
+    obj.location = location
+    collection.objects.link(obj)
+    return obj
+
+
+def _create_instance(name: str, instance_collection: Collection, collection: Collection,
+                     matrix: Matrix) -> Object:
+    obj = bpy.data.objects.new(name, None)
+    obj.instance_type = 'COLLECTION'
+    obj.instance_collection = instance_collection
+    obj.matrix_world = matrix
+    collection.objects.link(obj)
+    return obj
+
+
+# Each scenario populates a fresh scene and returns the collection to export and the build options to use.
+# The counts are multiplied by the `--scale` argument.
+
+def scenario_huge_mesh(scale: float) -> Tuple[Collection, ASEBuildOptions]:
+    collection = _create_collection('Export')
+    materials = _create_materials(4)
+    segments = max(int(700 * scale ** 0.5), 1)
+    _create_object('Terrain', _create_grid_mesh('Terrain', segments, materials=materials), collection)
+    options = ASEBuildOptions()
+    options.materials = MaterialTable(materials)
+    return collection, options
+
+
+def scenario_many_objects(scale: float) -> Tuple[Collection, ASEBuildOptions]:
+    collection = _create_collection('Export')
+    materials = _create_materials(4)
+    mesh = _create_cube_mesh('Cube', materials)
+    count = max(int(10000 * scale), 1)
+    side = int(np.ceil(count ** 0.5))
+    for i in range(count):
+        # Every object gets its own copy of the mesh, so that nothing is shared between extractions.
+        _create_object(f'Cube{i}', mesh.copy(), collection, (2.0 * (i % side), 2.0 * (i // side), 0.0))
+    options = ASEBuildOptions()
+    options.materials = MaterialTable(materials)
+    return collection, options
+
+
+def scenario_nested_instances(scale: float) -> Tuple[Collection, ASEBuildOptions]:
+    '''
+    A chain of collections, each holding several instances of the one below it, with a single mesh at the bottom.
+    '''
+    materials = _create_materials(2)
+    depth = 6
+    branching = max(int(round(3 * scale ** (1 / depth))), 1)
+    library = _create_collection('Library')
+    library.hide_render = True
+    level = _create_collection('Level0', library)
+    _create_object('Leaf', _create_grid_mesh('Leaf', 4, materials=materials), level)
+    for level_index in range(1, depth):
+        parent = _create_collection(f'Level{level_index}', library)
+        for i in range(branching):
+            _create_instance(f'Level{level_index}Instance{i}', level, parent,
+                             Matrix.Translation((10.0 ** level_index * i, 0.0, 0.0)))
+        level = parent
+    collection = _create_collection('Export')
+    for i in range(branching):
+        _create_instance(f'Instance{i}', level, collection, Matrix.Translation((0.0, 10.0 ** depth * i, 0.0)))
+    options = ASEBuildOptions()
+    options.materials = MaterialTable(materials)
+    return collection, options
+
+
+def scenario_shared_meshes(scale: float) -> Tuple[Collection, ASEBuildOptions]:
+    '''
+    Many objects sharing a single mesh, some of them mirrored, as with props placed around a level.
+    '''
+    collection = _create_collection('Export')
+    materials = _create_materials(2)
+    mesh = _create_grid_mesh('Prop', 40, materials=materials)
+    count = max(int(500 * scale), 1)
+    side = int(np.ceil(count ** 0.5))
+    for i in range(count):
+        obj = _create_object(f'Prop{i}', mesh, collection, (4.0 * (i % side), 4.0 * (i // side), 0.0))
+        if i % 4 == 3:
+            obj.scale.x = -1.0
+    options = ASEBuildOptions()
+    options.materials = MaterialTable(materials)
+    return collection, options
+
+
+def scenario_uv_layers_and_colors(scale: float) -> Tuple[Collection, ASEBuildOptions]:
+    collection = _create_collection('Export')
+    materials = _create_materials(2)
+    segments = max(int(250 * scale ** 0.5), 1)
+    for i in range(4):
+        mesh = _create_grid_mesh(f'Grid{i}', segments, uv_layer_count=8, has_colors=True, materials=materials, seed=i)
+        _create_object(f'Grid{i}', mesh, collection, (segments * i, 0.0, 0.0))
+    options = ASEBuildOptions()
+    options.materials = MaterialTable(materials)
+    options.has_vertex_colors = True
+    return collection, options
+
+
+def scenario_collision_hulls(scale: float) -> Tuple[Collection, ASEBuildOptions]:
+    collection = _create_collection('Export')
+    materials = _create_materials(1)
+    _create_object('Base', _create_grid_mesh('Base', 50, materials=materials), collection)
+    count = max(int(2000 * scale), 1)
+    side = int(np.ceil(count ** 0.5))
+    for i in range(count):
+        mesh = _create_cube_mesh(f'MCDCX_Hull{i}')
+        _create_object(f'MCDCX_Hull{i}', mesh, collection, (2.0 * (i % side), 2.0 * (i // side), 0.0))
+    options = ASEBuildOptions()
+    options.materials = MaterialTable(materials)
+    return collection, options
+
+
+SCENARIOS: Dict[str, Callable[[float], Tuple[Collection, ASEBuildOptions]]] = {
+    'huge_mesh': scenario_huge_mesh,
+    'many_objects': scenario_many_objects,
+    'nested_instances': scenario_nested_instances,
+    'shared_meshes': scenario_shared_meshes,
+    'uv_layers_and_colors': scenario_uv_layers_and_colors,
+    'collision_hulls': scenario_collision_hulls,
+}
+
+
+def _get_peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure(function: Callable, repeat: int) -> Tuple[object, Dict[str, float]]:
+    '''
+    Calls `function` `repeat` times.
+    @return: The result of the last call, and the best time in seconds and the peak traced memory in bytes.
+    '''
+    best_seconds = float('inf')
+    peak_bytes = 0
+    result = None
+    for _ in range(repeat):
+        result = None
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        best_seconds = min(best_seconds, seconds)
+        peak_bytes = max(peak_bytes, peak)
+    return result, {'seconds': best_seconds, 'peak_bytes': peak_bytes}
+
+
+def run_scenario(name: str, scale: float, repeat: int, worker_count: int) -> Dict:
+    _reset_scene()
+    setup_start = time.perf_counter()
+    collection, options = SCENARIOS[name](scale)
+    bpy.context.view_layer.update()
+    setup_seconds = time.perf_counter() - setup_start
+
+    stages = dict()
+    dfs_objects, stages['dfs'] = measure(
+        lambda: [x for x in dfs_collection_objects(collection) if x.obj.type == 'MESH'], repeat)
+    ase, stages['build'] = measure(lambda: build_ase(bpy.context, options, dfs_objects), repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f'{name}.ase')
+        _, stages['write'] = measure(lambda: write_ase(path, ase, worker_count=worker_count), repeat)
+        output_bytes = os.path.getsize(path)
+
+    return {
+        'setup_seconds': setup_seconds,
+        'object_count': len(dfs_objects),
+        'face_count': sum(len(x.face_indices) for x in ase.geometry_objects),
+        'geometry_object_count': len(ase.geometry_objects),
+        'output_bytes': output_bytes,
+        'peak_rss_bytes': _get_peak_rss_bytes(),
+        'stages': stages,
+    }
+
+
+def compare_reports(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    '''
+    Compares the stage times of a report against a baseline.
+    @param threshold: The allowed relative slowdown, e.g. 0.1 for 10%.
+    @return: A description of each regression.
+    '''
+    regressions = []
+    for name, scenario in report['scenarios'].items():
+        baseline_scenario = baseline['scenarios'].get(name, None)
+        if baseline_scenario is None:
+            continue
+        if baseline_scenario['scale'] != scenario['scale']:
+            regressions.append(f'{name}: scale {scenario["scale"]} does not match baseline scale '
+                               f'{baseline_scenario["scale"]}')
+            continue
+        for stage in STAGES:
+            seconds = scenario['stages'][stage]['seconds']
+            baseline_seconds = baseline_scenario['stages'][stage]['seconds']
+            ratio = seconds / baseline_seconds if baseline_seconds > 0 else 1.0
+            print(f'{name:24} {stage:6} {baseline_seconds:9.3f} s -> {seconds:9.3f} s ({ratio - 1.0:+7.1%})')
+            if ratio > 1.0 + threshold:
+                regressions.append(f'{name}: {stage} is {ratio - 1.0:.1%} slower than the baseline '
+                                   f'({seconds:.3f} s vs. {baseline_seconds:.3f} s)')
+        if scenario['output_bytes'] != baseline_scenario['output_bytes']:
+            print(f'{name:24} output size changed from {baseline_scenario["output_bytes"]} to '
+                  f'{scenario["output_bytes"]} bytes')
+    return regressions
+
+
+def main():
+    # Blender passes its own arguments on the command line; the script's arguments come after `--`.
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    parser = argparse.ArgumentParser(prog='scene_benchmark.py', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS.keys()), default=list(SCENARIOS.keys()))
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplies the size of every scenario')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=0, help='Format large sections in this many worker processes')
+    parser.add_argument('--output', help='Write the report to this JSON file')
+    parser.add_argument('--baseline', help='Compare the report against this JSON report')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='The relative slowdown against the baseline that counts as a regression (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    report = {
+        'version': REPORT_VERSION,
+        'blender_version': bpy.app.version_string,
+        'python_version': platform.python_version(),
+        'numpy_version': np.__version__,
+        'platform': platform.platform(),
+        'scenarios': dict(),
+    }
+    for name in args.scenarios:
+        scenario = run_scenario(name, args.scale, args.repeat, args.workers)
+        scenario['scale'] = args.scale
+        report['scenarios'][name] = scenario
+        stage_times = ', '.join(f'{stage} {scenario["stages"][stage]["seconds"]:.3f} s' for stage in STAGES)
+        print(f'{name}: {scenario["object_count"]} objects, {scenario["face_count"]} faces, '
+              f'{scenario["output_bytes"] / (1024 * 1024):.1f} MB ({stage_times})')
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+        regressions = compare_reports(report, baseline, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION: {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+'''
+Benchmark for the smoothing group engine (`assign_smoothing_groups`).
+
+Assigns smoothing groups to triangulated grids of increasing size and reports the time per million triangles, which
+should stay roughly constant as the size grows. Each grid is measured fully smooth (a single region), with a sharp edge
+every few rows (a band of regions), and fully flat (a region per quad, which is the worst case for coloring).
+
+This does not require Blender:
+
+    python benchmarks/smoothing_benchmark.py --sizes 250 500 1000
+'''
+
+import argparse
+import os
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from io_scene_ase.smoothing import assign_smoothing_groups
+
+
+def make_grid(size: int) -> Tuple[np.ndarray, int, np.ndarray]:
+    '''
+    Makes a grid of `size` by `size` quads, each split into two triangles.
+    @return: The vertex indices of the triangles, the number of vertices, and the quad of each triangle.
+    '''
+    indices = np.arange((size + 1) * (size + 1)).reshape(size + 1, size + 1)
+    a = indices[:-1, :-1].ravel()
+    b = indices[:-1, 1:].ravel()
+    c = indices[1:, 1:].ravel()
+    d = indices[1:, :-1].ravel()
+    triangle_vertices = np.concatenate((np.stack((a, b, c), axis=1), np.stack((a, c, d), axis=1))).astype(np.int32)
+    triangle_polygons = np.tile(np.arange(size * size, dtype=np.int32), 2)
+    return triangle_vertices, (size + 1) * (size + 1), triangle_polygons
+
+
+def make_sharp_rows(size: int, spacing: int) -> np.ndarray:
+    '''
+    Makes sharp edges along every `spacing`th row of vertices of a grid.
+    '''
+    rows = np.arange(spacing, size, spacing)
+    starts = (rows[:, np.newaxis] * (size + 1) + np.arange(size)).ravel()
+    return np.stack((starts, starts + 1), axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='smoothing_benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 500, 1000])
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f'{"Case":8} {"Triangles":>10} {"Regions":>10} {"Groups":>7} {"Conflicts":>10} {"Time (s)":>9} '
+          f'{"s / M tris":>11}')
+    for size in args.sizes:
+        triangle_vertices, vertex_count, triangle_polygons = make_grid(size)
+        quad_count = size * size
+        cases = {
+            'smooth': (np.ones(quad_count, dtype=bool), None),
+            'banded': (np.ones(quad_count, dtype=bool), make_sharp_rows(size, 4)),
+            'flat': (np.zeros(quad_count, dtype=bool), None),
+        }
+        for case_name, (polygon_smooth, sharp_edges) in cases.items():
+            best_seconds = float('inf')
+            result = None
+            for _ in range(args.repeat):
+                start_time = time.perf_counter()
+                result = assign_smoothing_groups(triangle_vertices, vertex_count, triangle_polygons, polygon_smooth,
+                                                 sharp_edges)
+                best_seconds = min(best_seconds, time.perf_counter() - start_time)
+            triangle_count = len(triangle_vertices)
+            group_count = int(result.triangle_groups.max()) + 1
+            conflict_count = result.edge_conflict_count + result.vertex_conflict_count
+            print(f'{case_name:8} {triangle_count:10} {result.region_count:10} {group_count:7} {conflict_count:10} '
+                  f'{best_seconds:9.3f} {best_seconds / triangle_count * 1e6:11.3f}')
+
+
+if __name__ == '__main__':
+    main()
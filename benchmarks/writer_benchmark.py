@@ -0,0 +1,119 @@
+'''
+Benchmark for the ASE writer.
+
+Compares the command-tree writer (`ASEWriter.build_ase_tree` + `ASEWriter.write_file`) with the bulk streaming writer
+(`ASEWriter.write`) on a synthetic geometry object, reporting the throughput of each in MB/s. With `--workers`, the
+streaming writer is also measured with its bulk sections formatted in a process pool.
+
+This does not require Blender:
+
+    python benchmarks/writer_benchmark.py --faces 200000
+'''
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from io_scene_ase.ase import ASE, ASEGeometryObject, ASEUVLayer, POSITION_DTYPE, INDEX_DTYPE, ATTRIBUTE_DTYPE
+from io_scene_ase.writer import ASEWriter, write_ase
+
+
+def make_ase(face_count: int, uv_layer_count: int, seed: int = 0) -> ASE:
+    rng = np.random.default_rng(seed)
+    vertex_count = face_count // 2 + 1
+    loop_count = face_count * 3
+
+    geometry_object = ASEGeometryObject()
+    geometry_object.name = 'io_scene_ase'
+    geometry_object.vertices = (rng.standard_normal((vertex_count, 3)) * 512.0).astype(POSITION_DTYPE)
+    geometry_object.face_indices = rng.integers(0, vertex_count, (face_count, 3), dtype=INDEX_DTYPE)
+    geometry_object.face_smoothing = rng.integers(0, 32, face_count, dtype=INDEX_DTYPE)
+    geometry_object.face_material_indices = rng.integers(0, 4, face_count, dtype=INDEX_DTYPE)
+    geometry_object.texture_vertex_faces = np.arange(loop_count, dtype=INDEX_DTYPE).reshape(face_count, 3)
+    geometry_object.normals = rng.standard_normal((face_count, 3)).astype(ATTRIBUTE_DTYPE)
+    geometry_object.vertex_normals = rng.standard_normal((face_count, 3, 3)).astype(ATTRIBUTE_DTYPE)
+    geometry_object.vertex_colors = rng.random((loop_count, 3)).astype(ATTRIBUTE_DTYPE)
+    for _ in range(uv_layer_count):
+        uv_layer = ASEUVLayer()
+        uv_layer.texture_vertices = np.zeros((loop_count, 3), dtype=ATTRIBUTE_DTYPE)
+        uv_layer.texture_vertices[:, :2] = rng.random((loop_count, 2))
+        geometry_object.uv_layers.append(uv_layer)
+
+    ase = ASE()
+    ase.materials = [f'Material{i}' for i in range(4)]
+    ase.geometry_objects.append(geometry_object)
+    return ase
+
+
+def write_tree(path: str, ase: ASE):
+    writer = ASEWriter(path)
+    writer.write_file(writer.build_ase_tree(ase))
+    writer.fp.close()
+
+
+def write_streaming(path: str, ase: ASE):
+    writer = ASEWriter(path)
+    writer.write(ase)
+    writer.fp.close()
+
+
+def write_parallel(path: str, ase: ASE, worker_count: int):
+    write_ase(path, ase, worker_count=worker_count)
+
+
+def measure(function, path: str, ase: ASE, repeat: int, *args) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(path, ase, *args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faces', type=int, default=100000)
+    parser.add_argument('--uv-layers', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=0, help='Also measure parallel writing with this many workers')
+    args = parser.parse_args()
+
+    ase = make_ase(args.faces, args.uv_layers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        tree_path = os.path.join(directory, 'tree.ase')
+        streaming_path = os.path.join(directory, 'streaming.ase')
+
+        tree_seconds = measure(write_tree, tree_path, ase, args.repeat)
+        streaming_seconds = measure(write_streaming, streaming_path, ase, args.repeat)
+
+        with open(tree_path, 'rb') as tree_file, open(streaming_path, 'rb') as streaming_file:
+            if tree_file.read() != streaming_file.read():
+                raise RuntimeError('Tree and streaming output differ')
+
+        parallel_seconds = None
+        if args.workers > 1:
+            parallel_path = os.path.join(directory, 'parallel.ase')
+            parallel_seconds = measure(write_parallel, parallel_path, ase, args.repeat, args.workers)
+            with open(parallel_path, 'rb') as parallel_file, open(streaming_path, 'rb') as streaming_file:
+                if parallel_file.read() != streaming_file.read():
+                    raise RuntimeError('Parallel and streaming output differ')
+
+        megabytes = os.path.getsize(streaming_path) / (1024 * 1024)
+
+    print(f'{args.faces} faces, {args.uv_layers} UV layers, {megabytes:.1f} MB')
+    print(f'tree:      {tree_seconds:8.3f} s {megabytes / tree_seconds:8.1f} MB/s')
+    print(f'streaming: {streaming_seconds:8.3f} s {megabytes / streaming_seconds:8.1f} MB/s')
+    print(f'speedup:   {tree_seconds / streaming_seconds:8.1f}x')
+    if parallel_seconds is not None:
+        print(f'parallel:  {parallel_seconds:8.3f} s {megabytes / parallel_seconds:8.1f} MB/s ({args.workers} workers)')
+
+
+if __name__ == '__main__':
+    main()
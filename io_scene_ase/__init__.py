@@ -1,26 +1,68 @@
 if 'bpy' in locals():
     import importlib
     if 'ase'        in locals(): importlib.reload(ase)
+    if 'stats'      in locals(): importlib.reload(stats)
+    if 'smoothing'  in locals(): importlib.reload(smoothing)
+    if 'extraction' in locals(): importlib.reload(extraction)
+    if 'cache'      in locals(): importlib.reload(cache)
+    if 'collision'  in locals(): importlib.reload(collision)
+    if 'overlap'    in locals(): importlib.reload(overlap)
+    if 'materials'  in locals(): importlib.reload(materials)
+    if 'deduplication' in locals(): importlib.reload(deduplication)
     if 'builder'    in locals(): importlib.reload(builder)
+    if 'sinks'      in locals(): importlib.reload(sinks)
     if 'writer'     in locals(): importlib.reload(writer)
+    if 'parallel'   in locals(): importlib.reload(parallel)
+    if 'manifest'   in locals(): importlib.reload(manifest)
+    if 'intermediate' in locals(): importlib.reload(intermediate)
+    if 'modal'      in locals(): importlib.reload(modal)
+    if 'reader'     in locals(): importlib.reload(reader)
+    if 'verify'     in locals(): importlib.reload(verify)
+    if 'cli'        in locals(): importlib.reload(cli)
     if 'properties' in locals(): importlib.reload(properties)
+    if 'snapshot'   in locals(): importlib.reload(snapshot)
     if 'exporter'   in locals(): importlib.reload(exporter)
     if 'dfs'        in locals(): importlib.reload(dfs)
 
-import bpy
-import bpy.utils.previews
-from . import ase
-from . import builder
-from . import writer
-from . import properties
-from . import exporter
-from . import dfs
+try:
+    import bpy
+except ModuleNotFoundError:
+    # Running outside of Blender (e.g., benchmarks or command-line tools).
+    # Only the Blender-independent modules, such as `ase` and `writer`, can be imported.
+    bpy = None
 
-classes = properties.classes + exporter.classes
+if bpy is not None:
+    import bpy.utils.previews
+    from . import ase
+    from . import stats
+    from . import smoothing
+    from . import extraction
+    from . import cache
+    from . import collision
+    from . import overlap
+    from . import materials
+    from . import deduplication
+    from . import builder
+    from . import sinks
+    from . import writer
+    from . import parallel
+    from . import manifest
+    from . import intermediate
+    from . import modal
+    from . import reader
+    from . import verify
+    from . import cli
+    from . import properties
+    from . import snapshot
+    from . import exporter
+    from . import dfs
+
+    classes = properties.classes + exporter.classes
 
 
 def menu_func_export(self, context):
     self.layout.operator(exporter.ASE_OT_export.bl_idname, text='ASCII Scene Export (.ase)')
+    self.layout.operator(exporter.ASE_OT_export_all_collections.bl_idname, text='ASCII Scene Export (All Collections)')
 
 
 def register():
@@ -32,8 +74,18 @@ def register():
 
     bpy.types.TOPBAR_MT_file_export.append(menu_func_export)
 
+    for handler_list, handler in cache.handlers + snapshot.handlers + modal.handlers:
+        handler_list.append(handler)
+
 
 def unregister():
+    for handler_list, handler in cache.handlers + snapshot.handlers + modal.handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+
+    cache.extraction_cache.clear()
+    snapshot.clear_snapshots()
+
     bpy.types.TOPBAR_MT_file_export.remove(menu_func_export)
 
     del bpy.types.Scene.ase_settings
@@ -1,4 +1,9 @@
-from typing import List
+from typing import List, Optional, Sequence, TYPE_CHECKING, overload
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .stats import ExportStats
 
 
 class ASEFace:
@@ -29,20 +34,132 @@ def is_collision_name(name: str) -> bool:
     return name.startswith('MCDCX_')
 
 
+# Array data types used by the geometry model.
+POSITION_DTYPE = np.float32
+INDEX_DTYPE = np.int32
+ATTRIBUTE_DTYPE = np.float32
+
+
+def empty_vectors(count: int = 0) -> np.ndarray:
+    return np.zeros((count, 3), dtype=ATTRIBUTE_DTYPE)
+
+
+def empty_indices(count: int = 0) -> np.ndarray:
+    return np.zeros((count, 3), dtype=INDEX_DTYPE)
+
+
 class ASEUVLayer:
     def __init__(self):
-        self.texture_vertices: list[tuple[float, float, float]] = []
+        # (T, 3) array of (u, v, w) texture vertices.
+        self.texture_vertices: np.ndarray = empty_vectors()
+        # (F, 3) texture vertex indices of each face for this layer, or None to use those of the geometry object.
+        self.texture_vertex_faces: Optional[np.ndarray] = None
+
+
+class ASEFaceList(Sequence[ASEFace]):
+    '''
+    Read-only view over the face arrays of a geometry object, yielding an `ASEFace` per face.
+    This exists for compatibility with code written against the old per-face object model; bulk consumers should use
+    the arrays on `ASEGeometryObject` directly.
+    '''
+    def __init__(self, geometry_object: 'ASEGeometryObject'):
+        self._geometry_object = geometry_object
+
+    def __len__(self) -> int:
+        return len(self._geometry_object.face_indices)
+
+    def _make_face(self, index: int) -> ASEFace:
+        geometry_object = self._geometry_object
+        face = ASEFace()
+        face.a, face.b, face.c = geometry_object.face_indices[index].tolist()
+        face.smoothing = int(geometry_object.face_smoothing[index])
+        face.material_index = int(geometry_object.face_material_indices[index])
+        return face
+
+    @overload
+    def __getitem__(self, index: int) -> ASEFace: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[ASEFace]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._make_face(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('face index out of range')
+        return self._make_face(index)
+
+
+class ASEFaceNormalList(Sequence[ASEFaceNormal]):
+    '''
+    Read-only view over the normal arrays of a geometry object, yielding an `ASEFaceNormal` per face.
+    '''
+    def __init__(self, geometry_object: 'ASEGeometryObject'):
+        self._geometry_object = geometry_object
+
+    def __len__(self) -> int:
+        return len(self._geometry_object.normals)
+
+    def _make_face_normal(self, index: int) -> ASEFaceNormal:
+        geometry_object = self._geometry_object
+        face_normal = ASEFaceNormal()
+        face_normal.normal = tuple(geometry_object.normals[index].tolist())
+        face_normal.vertex_normals = []
+        for vertex_index, normal in zip(geometry_object.face_indices[index].tolist(),
+                                        geometry_object.vertex_normals[index].tolist()):
+            vertex_normal = ASEVertexNormal()
+            vertex_normal.vertex_index = vertex_index
+            vertex_normal.normal = tuple(normal)
+            face_normal.vertex_normals.append(vertex_normal)
+        return face_normal
+
+    @overload
+    def __getitem__(self, index: int) -> ASEFaceNormal: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[ASEFaceNormal]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._make_face_normal(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('face normal index out of range')
+        return self._make_face_normal(index)
 
 
 class ASEGeometryObject:
+    '''
+    A geometry object stored as contiguous, typed arrays.
+
+    All per-face arrays share the same face ordering. Normals are optional (collision objects have none), in which
+    case `normals` and `vertex_normals` are empty. The vertex normal for corner `j` of face `i` belongs to the vertex
+    `face_indices[i, j]`.
+    '''
     def __init__(self):
         self.name: str = ''
-        self.vertices: list[tuple[float, float, float]] = []
+        # (V, 3) vertex positions.
+        self.vertices: np.ndarray = np.zeros((0, 3), dtype=POSITION_DTYPE)
         self.uv_layers: list[ASEUVLayer] = []
-        self.faces: list[ASEFace] = []
-        self.texture_vertex_faces: list[tuple[int, int, int]] = []
-        self.face_normals: list[ASEFaceNormal] = []
-        self.vertex_colors: list[tuple[float, float, float]] = []
+        # (F, 3) vertex indices of each face.
+        self.face_indices: np.ndarray = empty_indices()
+        # (F,) smoothing group of each face.
+        self.face_smoothing: np.ndarray = np.zeros(0, dtype=INDEX_DTYPE)
+        # (F,) material index of each face.
+        self.face_material_indices: np.ndarray = np.zeros(0, dtype=INDEX_DTYPE)
+        # (F, 3) texture vertex indices of each face, shared by all UV layers.
+        self.texture_vertex_faces: np.ndarray = empty_indices()
+        # (F, 3) face normals.
+        self.normals: np.ndarray = empty_vectors()
+        # (F, 3, 3) vertex normals for each corner of each face.
+        self.vertex_normals: np.ndarray = np.zeros((0, 3, 3), dtype=ATTRIBUTE_DTYPE)
+        # (C, 3) vertex colors.
+        self.vertex_colors: np.ndarray = empty_vectors()
+        # (F, 3) vertex color indices of each face, or None to use `texture_vertex_faces`.
+        self.color_vertex_faces: Optional[np.ndarray] = None
         self.vertex_offset: int = 0
         self.texture_vertex_offset: int = 0
 
@@ -50,8 +167,26 @@ class ASEGeometryObject:
     def is_collision(self):
         return is_collision_name(self.name)
 
+    def get_texture_vertex_faces(self, uv_layer: ASEUVLayer) -> np.ndarray:
+        return uv_layer.texture_vertex_faces if uv_layer.texture_vertex_faces is not None else self.texture_vertex_faces
+
+    def get_color_vertex_faces(self) -> np.ndarray:
+        return self.color_vertex_faces if self.color_vertex_faces is not None else self.texture_vertex_faces
+
+    @property
+    def faces(self) -> ASEFaceList:
+        return ASEFaceList(self)
+
+    @property
+    def face_normals(self) -> ASEFaceNormalList:
+        return ASEFaceNormalList(self)
+
 
 class ASE(object):
     def __init__(self):
         self.materials: List[str] = []
         self.geometry_objects: List[ASEGeometryObject] = []
+        # Problems found while building that don't prevent the export.
+        self.warnings: List[str] = []
+        # The statistics collected while building, if any.
+        self.stats: Optional['ExportStats'] = None
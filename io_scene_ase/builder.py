@@ -1,18 +1,24 @@
-from typing import Iterable, Optional, List, Dict, cast
+from typing import Generator, Iterable, Optional, List, Dict, Set, cast
 from collections import OrderedDict
+from contextlib import ExitStack
 
 
-from bpy.types import Context, Material, Mesh
+from bpy.types import Context, Depsgraph, Material, Mesh, Object, WindowManager
 
-from .ase import ASE, ASEGeometryObject, ASEFace, ASEFaceNormal, ASEVertexNormal, ASEUVLayer, is_collision_name
-import bpy
-import bmesh
+from .ase import ASE, ASEGeometryObject, ASEUVLayer, is_collision_name, POSITION_DTYPE, INDEX_DTYPE, ATTRIBUTE_DTYPE
 import math
+import numpy as np
 from mathutils import Matrix, Vector
 
 from .dfs import DfsObject
-
-SMOOTHING_GROUP_MAX = 32
+from .extraction import MeshExtraction, extract_mesh, object_mesh
+from .collision import validate_collision_meshes
+from .overlap import dodge_overlapping_smoothing_groups
+from .materials import MaterialTable
+from .deduplication import deduplicate_geometry_object_attributes
+from .cache import ExtractionCache, ExtractionKey, get_extraction_key
+from .smoothing import SMOOTHING_GROUP_MAX
+from .stats import ExportStats, NULL_STATS
 
 class ASEBuildError(Exception):
     pass
@@ -21,7 +27,7 @@ class ASEBuildError(Exception):
 class ASEBuildOptions(object):
     def __init__(self):
         self.object_eval_state = 'EVALUATED'
-        self.materials: Optional[List[Material]] = None
+        self.materials: Optional[MaterialTable | List[Material]] = None
         self.material_mapping: Dict[str, str] = OrderedDict()
         self.transform = Matrix.Identity(4)
         self.should_export_vertex_colors = True
@@ -33,6 +39,10 @@ class ASEBuildOptions(object):
         self.forward_axis = 'X'
         self.up_axis = 'Z'
         self.scct_versus_mcdcx_flip = False
+        self.extraction_cache: Optional[ExtractionCache] = None
+        self.should_dodge_overlapping_smoothing_groups = True
+        self.should_deduplicate_vertex_attributes = False
+        self.stats: ExportStats = NULL_STATS
 
 
 def get_vector_from_axis_identifier(axis_identifier: str) -> Vector:
@@ -66,23 +76,144 @@ def get_coordinate_system_transform(forward_axis: str = 'X', up_axis: str = 'Z')
     ))
 
 
-def build_ase(context: Context, options: ASEBuildOptions, dfs_objects: Iterable[DfsObject]) -> ASE:
+def _get_color_attribute_name(obj: Object, options: ASEBuildOptions, is_collision: bool) -> Optional[str]:
+    '''
+    Resolves the name of the color attribute to export for the object, if any.
+    '''
+    if is_collision or not options.should_export_vertex_colors or not options.has_vertex_colors:
+        return None
+    match options.vertex_color_mode:
+        case 'ACTIVE':
+            return obj.data.color_attributes.active_color_name
+        case 'EXPLICIT':
+            return options.vertex_color_attribute
+        case _:
+            raise ASEBuildError('Invalid vertex color mode')
+
+
+def _is_extraction_shared_by_mesh(obj: Object, options: ASEBuildOptions) -> bool:
+    '''
+    Whether the extraction of an object only depends on its mesh, so that all objects using the mesh can share it.
+    An evaluated mesh can only differ from the mesh itself through modifiers, whose settings aren't compared, so objects
+    with any modifiers only share their extraction with instances of the same object.
+    '''
+    return options.object_eval_state == 'ORIGINAL' or len(obj.modifiers) == 0
+
+
+def _get_mesh_extraction(dfs_object: DfsObject, options: ASEBuildOptions, depsgraph: Optional[Depsgraph],
+                         is_collision: bool, color_attribute_name: Optional[str],
+                         extractions: Dict[ExtractionKey, MeshExtraction]) -> MeshExtraction:
+    '''
+    Extracts the local-space geometry of the object, reusing an extraction of the same mesh from this build, or a cached
+    extraction, if one is available.
+    @param extractions: The extractions made so far in this build, to which the extraction is added.
+    '''
+    obj = dfs_object.obj
+
+    # Extractions are in local space, so they can be reused as long as the geometry and the options that
+    # affect the extraction are unchanged.
+    extraction_key = get_extraction_key(obj, (options.object_eval_state, is_collision, color_attribute_name),
+                                        _is_extraction_shared_by_mesh(obj, options))
+    extraction = extractions.get(extraction_key, None)
+    if extraction is not None:
+        return extraction
+    if options.extraction_cache is not None:
+        extraction = options.extraction_cache.get(extraction_key)
+        if extraction is not None:
+            extractions[extraction_key] = extraction
+            return extraction
+
+    match options.object_eval_state:
+        case 'ORIGINAL':
+            mesh_depsgraph = None
+        case 'EVALUATED':
+            # Evaluate the mesh after modifiers are applied
+            mesh_depsgraph = depsgraph
+        case _:
+            assert False, f"Invalid object_eval_state '{options.object_eval_state}'"
+
+    stats = options.stats
+    with stats.stage('extract', obj.name), ExitStack() as exit_stack:
+        with stats.stage('evaluate_mesh'):
+            mesh_data = exit_stack.enter_context(object_mesh(obj, mesh_depsgraph))
+
+        if color_attribute_name is not None:
+            color_attribute = mesh_data.color_attributes.get(color_attribute_name, None)
+
+            # Make sure that the selected color attribute is on the CORNER domain.
+            if color_attribute is not None and color_attribute.domain != 'CORNER':
+                raise ASEBuildError(f'Color attribute \'{color_attribute.name}\' for object \'{obj.name}\' must have domain of \'CORNER\' (found  \'{color_attribute.domain}\')')
+
+        extraction = extract_mesh(mesh_data,
+                                  should_extract_attributes=not is_collision,
+                                  color_attribute_name=color_attribute_name,
+                                  stats=stats)
+
+    if options.extraction_cache is not None:
+        options.extraction_cache.put(extraction_key, extraction)
+    extractions[extraction_key] = extraction
+
+    return extraction
+
+
+def build_ase(context: Context, options: ASEBuildOptions, dfs_objects: Iterable[DfsObject],
+              should_show_progress: bool = True) -> ASE:
+    '''
+    Builds the ASE data for the given objects.
+    The time and memory used by each stage of the build are recorded in `options.stats`, which is also made available
+    as the `stats` of the returned ASE.
+    @param should_show_progress: Whether to show the progress of the build in the window manager. Callers that build
+        several ASEs and show their own progress turn this off.
+    '''
+    builder = iter_build_ase(context, options, dfs_objects, should_show_progress)
+    while True:
+        try:
+            next(builder)
+        except StopIteration as e:
+            return e.value
+
+
+def iter_build_ase(context: Context, options: ASEBuildOptions, dfs_objects: Iterable[DfsObject],
+                   should_show_progress: bool = True) -> Generator[float, None, ASE]:
+    '''
+    Builds the ASE data for the given objects a unit of work at a time, so that the build can be spread over several
+    calls (e.g., from a modal operator) and abandoned part way through by closing the generator.
+    A unit of work is the extraction and transformation of a single object, or the post-processing of a single
+    geometry object. Blender's own evaluation and triangulation of a mesh can't be split, so the time taken by each
+    unit depends on the size of the meshes.
+    The context needs no window manager (e.g., when run from a script), in which case no progress is shown.
+    @return: A generator that yields the fraction of the work done after each unit, and returns the built ASE.
+    '''
+    dfs_objects = list(dfs_objects)
+    window_manager = getattr(context, 'window_manager', None) if should_show_progress else None
+    if window_manager is not None:
+        window_manager.progress_begin(0, len(dfs_objects))
+    try:
+        with options.stats.stage('build'):
+            ase = yield from _iter_build_ase(context, options, dfs_objects, window_manager)
+    finally:
+        if window_manager is not None:
+            window_manager.progress_end()
+    ase.stats = options.stats
+    return ase
+
+
+def _iter_build_ase(context: Context, options: ASEBuildOptions, dfs_objects: List[DfsObject],
+                    window_manager: Optional[WindowManager]) -> Generator[float, None, ASE]:
+    stats = options.stats
     ase = ASE()
-    if options.materials is None:
-        ase.materials = []
-    else:
-        ase.materials = [x.name if x is not None else 'None' for x in options.materials]
+    material_table = options.materials
+    if not isinstance(material_table, MaterialTable):
+        material_table = MaterialTable(material_table or [])
+    ase.materials = material_table.get_names()
 
     # If no materials are assigned to the object, add an empty material.
     # This is necessary for the ASE format to be compatible with the UT2K4 importer.
     if len(ase.materials) == 0:
         ase.materials.append('')
 
-    dfs_objects = list(dfs_objects)
     dfs_objects_processed = 0
 
-    context.window_manager.progress_begin(0, len(dfs_objects))
-
     class GeometryObjectInfo:
         def __init__(self, name: str):
             self.name = name
@@ -104,6 +235,34 @@ def build_ase(context: Context, options: ASEBuildOptions, dfs_objects: Iterable[
     # Sort the DFS objects into collision and non-collision objects.
     coordinate_system_transform = get_coordinate_system_transform(options.forward_axis, options.up_axis)
 
+    with stats.stage('evaluate_depsgraph'):
+        depsgraph = context.evaluated_depsgraph_get() if options.object_eval_state == 'EVALUATED' else None
+
+    # Test that collision meshes are manifold and convex before doing any other work.
+    collision_dfs_objects = [dfs_object for x in geometry_object_infos[1:] for dfs_object in x.dfs_objects]
+
+    # Collision objects are counted twice: once for their extraction here, and once in the main loop.
+    work_unit_count = len(collision_dfs_objects) + len(dfs_objects) + len(geometry_object_infos)
+    work_units_done = 0
+
+    # Each mesh is only extracted once, however many objects or instances use it; only the transforms differ.
+    extractions: Dict[ExtractionKey, MeshExtraction] = dict()
+    smoothing_reported_extractions: Set[int] = set()
+
+    collision_extractions: Dict[int, MeshExtraction] = dict()
+    for dfs_object in collision_dfs_objects:
+        collision_extractions[id(dfs_object)] = _get_mesh_extraction(dfs_object, options, depsgraph, True, None,
+                                                                     extractions)
+        work_units_done += 1
+        yield work_units_done / work_unit_count
+    with stats.stage('validate_collision'):
+        validation_results = validate_collision_meshes(
+            [(x.positions, x.triangle_vertices) for x in collision_extractions.values()])
+    for dfs_object, validation_result in zip(collision_dfs_objects, validation_results):
+        error_message = validation_result.get_error_message(dfs_object.obj.name)
+        if error_message is not None:
+            raise ASEBuildError(error_message)
+
     for geometry_object_info in geometry_object_infos:
         geometry_object = ASEGeometryObject()
         geometry_object.name = geometry_object_info.name
@@ -115,43 +274,22 @@ def build_ase(context: Context, options: ASEBuildOptions, dfs_objects: Iterable[
 
         geometry_object.uv_layers = [ASEUVLayer() for _ in range(max_uv_layers)]
 
+        # Per-object array chunks, concatenated into the geometry object once all objects have been processed.
+        vertex_chunks: List[np.ndarray] = []
+        face_index_chunks: List[np.ndarray] = []
+        face_smoothing_chunks: List[np.ndarray] = []
+        face_material_index_chunks: List[np.ndarray] = []
+        texture_vertex_face_chunks: List[np.ndarray] = []
+        normal_chunks: List[np.ndarray] = []
+        vertex_normal_chunks: List[np.ndarray] = []
+        vertex_color_chunks: List[np.ndarray] = []
+        texture_vertex_chunks: List[List[np.ndarray]] = [[] for _ in range(max_uv_layers)]
+
         for dfs_object in geometry_object_info.dfs_objects:
             obj = dfs_object.obj
 
-            if geometry_object.is_collision:
-                # Test that collision meshes are manifold and convex.
-                bm = bmesh.new()
-                bm.from_mesh(obj.data)
-                for edge in bm.edges:
-                    if not edge.is_manifold:
-                        del bm
-                        raise ASEBuildError(f'Collision mesh \'{obj.name}\' is not manifold')
-                    if not edge.is_convex:
-                        del bm
-                        raise ASEBuildError(f'Collision mesh \'{obj.name}\' is not convex')
-
             matrix_world = dfs_object.matrix_world
 
-            # Save the active color name for vertex color export.
-            active_color_name = obj.data.color_attributes.active_color_name
-
-            match options.object_eval_state:
-                case 'ORIGINAL':
-                    mesh_object = obj
-                    mesh_data = mesh_object.data
-                case 'EVALUATED':
-                    # Evaluate the mesh after modifiers are applied
-                    depsgraph = context.evaluated_depsgraph_get()
-                    bm = bmesh.new()
-                    bm.from_object(obj, depsgraph)
-                    mesh_data = bpy.data.meshes.new('')
-                    bm.to_mesh(mesh_data)
-                    del bm
-                    mesh_object = bpy.data.objects.new('', mesh_data)
-                    mesh_object.matrix_world = matrix_world
-                case _:
-                    assert False, f"Invalid object_eval_state '{options.object_eval_state}'"
-
             vertex_transform = (Matrix.Rotation(math.pi, 4, 'Z') @
                                 Matrix.Scale(options.scale, 4) @
                                 options.transform @
@@ -164,149 +302,157 @@ def build_ase(context: Context, options: ASEBuildOptions, dfs_objects: Iterable[
                 flip_transform = Matrix.Scale(-1.0, 4, Vector((1, 0, 0))) @ Matrix.Scale(-1.0, 4, Vector((0, 1, 0)))
                 full_transform = flip_transform @ full_transform
 
-            for _, vertex in enumerate(mesh_data.vertices):
-                geometry_object.vertices.append(full_transform @ vertex.co)
-
             material_indices = []
             if not geometry_object.is_collision:
                 for mesh_material_index, material in enumerate(obj.data.materials): # TODO: this needs to use the evaluated object, doesn't it?
                     if material is None:
                         raise ASEBuildError(f'Material slot {mesh_material_index + 1} for mesh \'{obj.name}\' cannot be empty')
-                    material_indices.append(ase.materials.index(material.name))
+                    material_index = material_table.index_of_name(material.name)
+                    if material_index is None:
+                        raise ASEBuildError(f'Material \'{material.name}\' for mesh \'{obj.name}\' is not in the list of exported materials')
+                    material_indices.append(material_index)
 
             if len(material_indices) == 0:
                 # If no materials are assigned to the mesh, just have a single empty material.
                 material_indices.append(0)
 
-            mesh_data.calc_loop_triangles()
-
-            # Calculate smoothing groups.
-            poly_groups, groups = mesh_data.calc_smooth_groups(use_bitflags=False)
+            # Collision meshes were already extracted during validation.
+            extraction = collision_extractions.pop(id(dfs_object), None)
+            if extraction is None:
+                color_attribute_name = _get_color_attribute_name(obj, options, geometry_object.is_collision)
+                extraction = _get_mesh_extraction(dfs_object, options, depsgraph, geometry_object.is_collision, color_attribute_name, extractions)
 
-            # Figure out how many scaling axes are negative.
-            # This is important for calculating the normals of the mesh.
-            _, _, scale = vertex_transform.decompose()
-            negative_scaling_axes = sum([1 for x in scale if x < 0])
-            should_invert_normals = negative_scaling_axes % 2 == 1
+            # A transform with a negative determinant (i.e., an odd number of negative scaling axes) mirrors the mesh,
+            # which reverses the winding of its faces. This is important for calculating the normals of the mesh.
+            should_invert_normals = vertex_transform.determinant() < 0.0
             if options.should_invert_normals:
                 should_invert_normals = not should_invert_normals
 
-            loop_triangle_index_order = (2, 1, 0) if should_invert_normals else (0, 1, 2)
+            loop_triangle_index_order = [2, 1, 0] if should_invert_normals else [0, 1, 2]
 
             # Gather the list of unique material indices in the loop triangles.
-            face_material_indices = {loop_triangle.material_index for loop_triangle in mesh_data.loop_triangles}
+            face_material_indices = np.unique(extraction.triangle_material_indices)
 
             # Make sure that each material index is within the bounds of the material indices list.
-            for material_index in face_material_indices:
-                if material_index >= len(material_indices):
-                    raise ASEBuildError(f'Material index {material_index} for mesh \'{obj.name}\' is out of bounds.\n'
-                                        f'This means that one or more faces are assigned to a material slot that does '
-                                        f'not exist.\n'
-                                        f'The referenced material indices in the faces are: {sorted(list(face_material_indices))}.\n'
-                                        f'Either add enough materials to the object or assign faces to existing material slots.'
-                                        )
+            if len(face_material_indices) > 0 and face_material_indices[-1] >= len(material_indices):
+                raise ASEBuildError(f'Material index {face_material_indices[-1]} for mesh \'{obj.name}\' is out of bounds.\n'
+                                    f'This means that one or more faces are assigned to a material slot that does '
+                                    f'not exist.\n'
+                                    f'The referenced material indices in the faces are: {face_material_indices.tolist()}.\n'
+                                    f'Either add enough materials to the object or assign faces to existing material slots.'
+                                    )
 
             del face_material_indices
 
-            # TODO: There is an edge case here where if two different meshes have identical or nearly identical
-            # vertices and also matching smoothing groups, the engine's importer will incorrectly calculate the
-            # normal of any faces that have the shared vertices.
-            # The get around this, we could detect the overlapping vertices and display a warning, though checking
-            # for unique vertices can be quite expensive (use a KD-tree!)
-            # Another thing we can do is; when we find an overlapping vertex, we find out the range of smoothing
-            # groups that were used for that mesh. Then we can simply dodge the smoothing group by offseting the
-            # smoothing groups for the current mesh. This should work the majority of the time.
-
-            # Faces
-            for _, loop_triangle in enumerate(mesh_data.loop_triangles):
-                face = ASEFace()
-                face.a, face.b, face.c = map(lambda j: geometry_object.vertex_offset + mesh_data.loops[loop_triangle.loops[j]].vertex_index, loop_triangle_index_order)
-                if not geometry_object.is_collision:
-                    face.material_index = material_indices[loop_triangle.material_index]
-                # The UT2K4 importer only accepts 32 smoothing groups. Anything past this completely mangles the
-                # smoothing groups and effectively makes the whole model use sharp-edge rendering.
-                # The fix is to constrain the smoothing group between 0 and 31 by applying a modulo of 32 to the actual
-                # smoothing group index.
-                # This may result in bad calculated normals on export in rare cases. For example, if a face with a
-                # smoothing group of 3 is adjacent to a face with a smoothing group of 35 (35 % 32 == 3), those faces
-                # will be treated as part of the same smoothing group.
-                face.smoothing = (poly_groups[loop_triangle.polygon_index] - 1) % SMOOTHING_GROUP_MAX
-                geometry_object.faces.append(face)
+            if not geometry_object.is_collision and id(extraction) not in smoothing_reported_extractions:
+                # Extractions shared by several objects are only reported once.
+                smoothing_reported_extractions.add(id(extraction))
+                if extraction.smoothing_edge_conflict_count > 0:
+                    ase.warnings.append(f'Mesh \'{obj.name}\' has {extraction.smoothing_edge_conflict_count} pairs of '
+                                        f'neighboring smooth regions that could not be given different smoothing groups '
+                                        f'(at most {SMOOTHING_GROUP_MAX} are available). The edges between them will be '
+                                        f'shaded smoothly')
+                if extraction.smoothing_vertex_conflict_count > 0:
+                    ase.warnings.append(f'Mesh \'{obj.name}\' has {extraction.smoothing_vertex_conflict_count} places '
+                                        f'where smooth regions that meet at a vertex share a smoothing group. The '
+                                        f'shading at those vertices may be softened')
+
+            with stats.stage('transform', obj.name):
+                # Vertices
+                transform = np.array(full_transform, dtype=np.float64)
+                vertices = extraction.positions @ transform[:3, :3].T + transform[:3, 3]
+                vertex_chunks.append(vertices.astype(POSITION_DTYPE))
+
+                # Faces
+                face_index_chunks.append(extraction.triangle_vertices[:, loop_triangle_index_order] + geometry_object.vertex_offset)
+                if geometry_object.is_collision:
+                    face_material_index_chunks.append(np.zeros(extraction.triangle_count, dtype=INDEX_DTYPE))
+                else:
+                    face_material_index_chunks.append(np.asarray(material_indices, dtype=INDEX_DTYPE)[extraction.triangle_material_indices])
+                # The UT2K4 importer only accepts 32 smoothing groups, which the extraction has already assigned so
+                # that neighboring smooth regions don't share a group.
+                face_smoothing_chunks.append(extraction.triangle_smoothing_groups)
 
-            if not geometry_object.is_collision:
-                # Normals
-                for _, loop_triangle in enumerate(mesh_data.loop_triangles):
-                    face_normal = ASEFaceNormal()
-                    face_normal.normal = loop_triangle.normal
-                    face_normal.vertex_normals = []
-                    for i in loop_triangle_index_order:
-                        vertex_normal = ASEVertexNormal()
-                        vertex_normal.vertex_index = geometry_object.vertex_offset + mesh_data.loops[loop_triangle.loops[i]].vertex_index
-                        vertex_normal.normal = loop_triangle.split_normals[i]
-                        if should_invert_normals:
-                            vertex_normal.normal = (-Vector(vertex_normal.normal)).to_tuple()
-                        face_normal.vertex_normals.append(vertex_normal)
-                    geometry_object.face_normals.append(face_normal)
-
-                # Texture Coordinates
-                for i, uv_layer_data in enumerate([x.data for x in mesh_data.uv_layers]):
-                    uv_layer = geometry_object.uv_layers[i]
-                    for loop_index, loop in enumerate(mesh_data.loops):
-                        u, v = uv_layer_data[loop_index].uv
-                        uv_layer.texture_vertices.append((u, v, 0.0))
-
-                # Add zeroed texture vertices for any missing UV layers.
-                for i in range(len(mesh_data.uv_layers), max_uv_layers):
-                    uv_layer = geometry_object.uv_layers[i]
-                    for _ in mesh_data.loops:
-                        uv_layer.texture_vertices.append((0.0, 0.0, 0.0))
-
-                # Texture Faces
-                for loop_triangle in mesh_data.loop_triangles:
-                    geometry_object.texture_vertex_faces.append(
-                        tuple(map(lambda l: geometry_object.texture_vertex_offset + loop_triangle.loops[l], loop_triangle_index_order))
-                    )
-
-                # Vertex Colors
-                if options.should_export_vertex_colors and options.has_vertex_colors:
-                    match options.vertex_color_mode:
-                        case 'ACTIVE':
-                            color_attribute_name = active_color_name
-                        case 'EXPLICIT':
-                            color_attribute_name = options.vertex_color_attribute
-                        case _:
-                            raise ASEBuildError('Invalid vertex color mode')
-
-                    color_attribute = mesh_data.color_attributes.get(color_attribute_name, None)
-
-                    if color_attribute is not None:
-                        # Make sure that the selected color attribute is on the CORNER domain.
-                        if color_attribute.domain != 'CORNER':
-                            raise ASEBuildError(f'Color attribute \'{color_attribute.name}\' for object \'{obj.name}\' must have domain of \'CORNER\' (found  \'{color_attribute.domain}\')')
-
-                        for color in map(lambda x: x.color, color_attribute.data):
-                            geometry_object.vertex_colors.append(tuple(color[0:3]))
+                if not geometry_object.is_collision:
+                    # Normals
+                    vertex_normals = extraction.triangle_split_normals[:, loop_triangle_index_order]
+                    if should_invert_normals:
+                        vertex_normals = -vertex_normals
+                    normal_chunks.append(extraction.triangle_normals)
+                    vertex_normal_chunks.append(vertex_normals)
+
+                    # Texture Coordinates
+                    for i, uvs in enumerate(extraction.uv_layers):
+                        texture_vertices = np.zeros((extraction.loop_count, 3), dtype=ATTRIBUTE_DTYPE)
+                        texture_vertices[:, :2] = uvs
+                        texture_vertex_chunks[i].append(texture_vertices)
+
+                    # Add zeroed texture vertices for any missing UV layers.
+                    for i in range(len(extraction.uv_layers), max_uv_layers):
+                        texture_vertex_chunks[i].append(np.zeros((extraction.loop_count, 3), dtype=ATTRIBUTE_DTYPE))
+
+                    # Texture Faces
+                    texture_vertex_face_chunks.append(extraction.triangle_loops[:, loop_triangle_index_order] + geometry_object.texture_vertex_offset)
+
+                    # Vertex Colors
+                    if extraction.colors is not None:
+                        vertex_color_chunks.append(extraction.colors)
 
             # Update data offsets for next iteration
-            geometry_object.texture_vertex_offset += len(mesh_data.loops)
-            geometry_object.vertex_offset = len(geometry_object.vertices)
+            geometry_object.texture_vertex_offset += extraction.loop_count
+            geometry_object.vertex_offset += extraction.vertex_count
 
             dfs_objects_processed += 1
-            context.window_manager.progress_update(dfs_objects_processed)
+            if window_manager is not None:
+                window_manager.progress_update(dfs_objects_processed)
+
+            work_units_done += 1
+            yield work_units_done / work_unit_count
+
+        if vertex_chunks:
+            geometry_object.vertices = np.concatenate(vertex_chunks)
+        if face_index_chunks:
+            geometry_object.face_indices = np.concatenate(face_index_chunks)
+            geometry_object.face_smoothing = np.concatenate(face_smoothing_chunks)
+            geometry_object.face_material_indices = np.concatenate(face_material_index_chunks)
+
+        if not geometry_object.is_collision and options.should_dodge_overlapping_smoothing_groups:
+            # If two meshes have coincident vertices and matching smoothing groups, the engine's importer will
+            # incorrectly calculate the normal of any faces that have the shared vertices, so the smoothing groups of
+            # the later mesh are offset to dodge those of the earlier one.
+            with stats.stage('dodge_smoothing_groups'):
+                unresolved_sources = dodge_overlapping_smoothing_groups(geometry_object.vertices,
+                                                                        [len(x) for x in vertex_chunks],
+                                                                        geometry_object.face_indices,
+                                                                        [len(x) for x in face_index_chunks],
+                                                                        geometry_object.face_smoothing,
+                                                                        SMOOTHING_GROUP_MAX)
+            for source in unresolved_sources:
+                ase.warnings.append(f'Mesh \'{geometry_object_info.dfs_objects[source].obj.name}\' has vertices that '
+                                    f'coincide with those of another mesh, and its smoothing groups could not be '
+                                    f'offset to avoid a clash. Normals around the shared vertices may be incorrect')
+        if texture_vertex_face_chunks:
+            geometry_object.texture_vertex_faces = np.concatenate(texture_vertex_face_chunks)
+        if normal_chunks:
+            geometry_object.normals = np.concatenate(normal_chunks)
+            geometry_object.vertex_normals = np.concatenate(vertex_normal_chunks)
+        if vertex_color_chunks:
+            geometry_object.vertex_colors = np.concatenate(vertex_color_chunks)
+        for uv_layer, chunks in zip(geometry_object.uv_layers, texture_vertex_chunks):
+            if chunks:
+                uv_layer.texture_vertices = np.concatenate(chunks)
+
+        if options.should_deduplicate_vertex_attributes:
+            with stats.stage('deduplicate'):
+                deduplicate_geometry_object_attributes(geometry_object)
 
         ase.geometry_objects.append(geometry_object)
+
+        work_units_done += 1
+        yield work_units_done / work_unit_count
     
     # Apply the material mapping.
-    material_mapping_items: list[tuple[str, str]] = list(options.material_mapping.items())
-    material_mapping_keys = list(map(lambda x: x[0], material_mapping_items))
-    for i in range(len(ase.materials)):
-        try:
-            index = material_mapping_keys.index(ase.materials[i])
-            ase.materials[i] = material_mapping_items[index][1]
-        except ValueError:
-            pass
-
-    context.window_manager.progress_end()
+    ase.materials = [options.material_mapping.get(x, x) for x in ase.materials]
 
     if len(ase.geometry_objects) == 0:
         raise ASEBuildError('At least one mesh object must be selected')
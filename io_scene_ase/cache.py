@@ -0,0 +1,130 @@
+'''
+Session-level cache of extracted mesh geometry.
+
+Extractions are stored in the mesh's local space, so they stay valid when objects are moved; they are invalidated
+through depsgraph update handlers whenever the geometry of an object or mesh changes, and evicted in least recently
+used order when the cache grows past its memory limit. Changing the frame doesn't send a depsgraph update, but may
+deform any evaluated mesh (through armatures, animated modifiers or shape keys), so the cache is cleared then too.
+'''
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Set, Tuple
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Depsgraph, Object
+
+from .extraction import MeshExtraction
+
+
+# Default memory limit of the cache, in megabytes.
+DEFAULT_CACHE_SIZE_MB = 1024
+
+ExtractionKey = Tuple[Optional[int], int, Hashable]
+
+
+def get_extraction_key(obj: Object, options: Hashable, is_shared_by_mesh: bool = False) -> ExtractionKey:
+    '''
+    Gets the cache key for the extraction of an object.
+    @param obj: The original (non-evaluated) object.
+    @param options: The export options that affect the extraction.
+    @param is_shared_by_mesh: Whether the extraction only depends on the object's mesh, and not the object itself (e.g.,
+        because it has no modifiers), so that it can be shared by every object that uses the mesh.
+    '''
+    return None if is_shared_by_mesh else obj.session_uid, obj.data.session_uid, options
+
+
+class ExtractionCache:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_SIZE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[ExtractionKey, MeshExtraction] = OrderedDict()
+        # Maps the session UID of each object and mesh to the keys of the entries that depend on it.
+        self._keys_by_uid: Dict[int, Set[ExtractionKey]] = dict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: ExtractionKey) -> Optional[MeshExtraction]:
+        extraction = self._entries.get(key, None)
+        if extraction is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return extraction
+
+    def put(self, key: ExtractionKey, extraction: MeshExtraction):
+        self._remove(key)
+        if extraction.nbytes > self.max_bytes:
+            # Never cache anything that would evict everything else.
+            return
+        self._entries[key] = extraction
+        self.nbytes += extraction.nbytes
+        for uid in key[:2]:
+            if uid is not None:
+                self._keys_by_uid.setdefault(uid, set()).add(key)
+        self.evict()
+
+    def evict(self):
+        while self.nbytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, uid: int):
+        '''
+        Removes all entries that depend on the object or mesh with the given session UID.
+        '''
+        for key in list(self._keys_by_uid.get(uid, ())):
+            self._remove(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_uid.clear()
+        self.nbytes = 0
+
+    def _remove(self, key: ExtractionKey):
+        extraction = self._entries.pop(key, None)
+        if extraction is None:
+            return
+        self.nbytes -= extraction.nbytes
+        for uid in key[:2]:
+            keys = self._keys_by_uid.get(uid, None)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_uid[uid]
+
+
+extraction_cache = ExtractionCache()
+
+
+@persistent
+def on_depsgraph_update_post(_scene, depsgraph: Depsgraph):
+    if len(extraction_cache) == 0:
+        return
+    for update in depsgraph.updates:
+        if update.is_updated_geometry:
+            extraction_cache.invalidate(update.id.original.session_uid)
+
+
+@persistent
+def on_data_reloaded(*_args):
+    # Loading a file or stepping through the undo history replaces the data-blocks wholesale.
+    extraction_cache.clear()
+
+
+@persistent
+def on_frame_change_post(_scene, _depsgraph: Optional[Depsgraph] = None):
+    # Animation can change the evaluated geometry of any object without a geometry update being sent.
+    extraction_cache.clear()
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update_post),
+    (bpy.app.handlers.load_post, on_data_reloaded),
+    (bpy.app.handlers.undo_post, on_data_reloaded),
+    (bpy.app.handlers.redo_post, on_data_reloaded),
+    (bpy.app.handlers.frame_change_post, on_frame_change_post),
+)
@@ -0,0 +1,403 @@
+'''
+Command-line batch exporter.
+
+Exports the collections of one or more .blend files without a user interface, fanning the files out over several
+background Blender processes. The work is described either by .blend files, in which case every collection that has an
+ASE collection exporter is exported to the exporter's file path with the exporter's settings, or by a JSON job manifest:
+
+    {
+        "options": {"scale": 2.0},
+        "jobs": [
+            {"blend": "levels/level1.blend"},
+            {"blend": "levels/level2.blend", "collection": "Walls", "output": "out/walls.ase",
+             "options": {"should_deduplicate_vertex_attributes": true}}
+        ]
+    }
+
+Relative paths in a manifest are relative to the manifest. The options are named after the properties of
+`AseExportMixin` (plus `export_space`); each job's options override the manifest's options, which override the settings
+of the collection's exporter, if it has one.
+
+From a shell, with a Blender executable on the path (or given with `--blender`):
+
+    python -m io_scene_ase.cli manifest.json --processes 4
+
+From inside Blender, for the file that is already open:
+
+    blender -b level1.blend --python-expr "from io_scene_ase.cli import main; main()" -- --collection Walls
+'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+
+# The exit codes of the command.
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+# The statuses of a job result.
+JOB_EXPORTED = 'EXPORTED'
+JOB_UNCHANGED = 'UNCHANGED'
+JOB_FAILED = 'FAILED'
+
+# Run by each worker process to import this module from the same location as the coordinator, regardless of whether
+# (or which version of) the add-on is installed in Blender.
+_WORKER_BOOTSTRAP = 'import sys; sys.path.insert(0, {path!r}); from io_scene_ase.cli import main; main()'
+
+
+class ExportJob:
+    '''
+    The export of one collection of a .blend file, or of all of the collections with ASE exporters if no collection is
+    given.
+    '''
+    def __init__(self, blend: str, collection: Optional[str] = None, output: Optional[str] = None,
+                 options: Optional[Dict[str, Any]] = None):
+        self.blend = blend
+        self.collection = collection
+        self.output = output
+        self.options: Dict[str, Any] = options or dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'blend': self.blend, 'collection': self.collection, 'output': self.output, 'options': self.options}
+
+    @staticmethod
+    def from_dict(value: Dict[str, Any]) -> 'ExportJob':
+        return ExportJob(value['blend'], value.get('collection', None), value.get('output', None),
+                         value.get('options', None))
+
+
+class JobError(Exception):
+    pass
+
+
+def load_job_manifest(path: str) -> List[ExportJob]:
+    '''
+    Loads the jobs of a JSON job manifest, resolving their paths relative to the manifest.
+    '''
+    with open(path, 'r') as fp:
+        manifest = json.load(fp)
+    directory = os.path.dirname(os.path.abspath(path))
+    shared_options = manifest.get('options', dict())
+    jobs = []
+    for job_index, value in enumerate(manifest.get('jobs', [])):
+        if 'blend' not in value:
+            raise JobError(f'{path}: Job {job_index} has no \'blend\' file')
+        if value.get('output', None) is not None and value.get('collection', None) is None:
+            # Without a collection, each collection is exported to the file path of its own exporter.
+            raise JobError(f'{path}: Job {job_index} has an \'output\' but no \'collection\'')
+        job = ExportJob.from_dict(value)
+        job.blend = os.path.join(directory, job.blend)
+        if job.output is not None:
+            job.output = os.path.join(directory, job.output)
+        job.options = {**shared_options, **job.options}
+        jobs.append(job)
+    return jobs
+
+
+# Running the jobs of one .blend file inside Blender.
+
+class JobProperties:
+    '''
+    Export settings in the shape of `ASE_OT_export_collection`'s properties, for use where there is no operator.
+    '''
+    def __init__(self, values: Dict[str, Any]):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+
+class _KeyValue:
+    def __init__(self, key: str, value: str):
+        self.key = key
+        self.value = value
+
+
+def _get_default_property_values() -> Dict[str, Any]:
+    '''
+    Gets the default values of the export settings from the property definitions of `AseExportMixin`.
+    '''
+    from bpy.props import EnumProperty
+    from .properties import AseExportMixin
+    values: Dict[str, Any] = {'export_space': 'INSTANCE', 'material_mapping': []}
+    for cls in reversed(AseExportMixin.__mro__):
+        for name, prop in getattr(cls, '__annotations__', dict()).items():
+            keywords = getattr(prop, 'keywords', None)
+            if keywords is None:
+                continue
+            if 'default' in keywords:
+                values[name] = keywords['default']
+            elif getattr(prop, 'function', None) is EnumProperty:
+                # Enums without a default use their first item. Dynamic items can't be resolved without a context.
+                items = keywords.get('items', ())
+                values[name] = items[0][0] if isinstance(items, (list, tuple)) and items else ''
+    return values
+
+
+def _get_job_properties(exporter_props, options: Dict[str, Any]) -> JobProperties:
+    '''
+    Combines the default settings, the settings of a collection exporter (if any) and the options of a job.
+    '''
+    values = _get_default_property_values()
+    if exporter_props is not None:
+        for name in values.keys():
+            if name == 'material_mapping':
+                values[name] = [_KeyValue(x.key, x.value) for x in exporter_props.material_mapping]
+            elif hasattr(exporter_props, name):
+                values[name] = getattr(exporter_props, name)
+    for name, value in options.items():
+        if name not in values:
+            raise JobError(f'Unknown export option \'{name}\'')
+        if name == 'material_mapping':
+            # Either a {material: name} mapping or a list of [material, name] pairs, in the order of the materials.
+            pairs = value.items() if isinstance(value, dict) else value
+            value = [_KeyValue(key, mapped_value) for key, mapped_value in pairs]
+        values[name] = value
+    return JobProperties(values)
+
+
+def _export_collection(collection, props: JobProperties, filepath: str, worker_count: int) -> Dict[str, Any]:
+    import bpy
+    from .builder import ASEBuildError, build_ase
+    from .exporter import _get_collection_build_inputs, _write_ase
+
+    start_time = time.perf_counter()
+    result: Dict[str, Any] = {'collection': collection.name, 'output': filepath, 'warnings': []}
+    try:
+        options, dfs_objects = _get_collection_build_inputs(collection, props)
+        ase = build_ase(bpy.context, options, dfs_objects)
+        result['warnings'] = ase.warnings
+        result['face_count'] = sum(len(x.face_indices) for x in ase.geometry_objects)
+        result['vertex_count'] = sum(len(x.vertices) for x in ase.geometry_objects)
+        is_written = _write_ase(filepath, ase, props.should_skip_unchanged, worker_count=worker_count,
+                                should_save_intermediate=props.should_save_intermediate)
+        result['status'] = JOB_EXPORTED if is_written else JOB_UNCHANGED
+    except (ASEBuildError, OSError) as e:
+        result['status'] = JOB_FAILED
+        result['error'] = str(e)
+    except Exception:
+        # Anything else is unexpected, but must only fail this collection rather than the worker and every other
+        # collection of the file.
+        result['status'] = JOB_FAILED
+        result['error'] = traceback.format_exc()
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+
+def run_jobs_in_blender(jobs: List[ExportJob], worker_count: int = 0) -> List[Dict[str, Any]]:
+    '''
+    Runs export jobs for the .blend file that is open in this Blender session.
+    The add-on is registered first if it isn't already, so that this also works when it isn't installed.
+    @param worker_count: The number of processes used to format the text of large meshes (see `write_ase`).
+    @return: A result for each exported collection.
+    '''
+    import bpy
+    from . import register
+    from .exporter import _get_ase_collection_exporters
+
+    if not hasattr(bpy.types.Scene, 'ase_settings'):
+        register()
+
+    exporters: Dict[str, Any] = {collection.name: props for collection, props in _get_ase_collection_exporters()}
+    results = []
+    for job in jobs:
+        def fail(message: str, collection_name: Optional[str] = job.collection):
+            results.append({'collection': collection_name, 'output': job.output, 'status': JOB_FAILED,
+                            'error': message, 'warnings': []})
+
+        if job.collection is not None:
+            collection_names = [job.collection]
+        else:
+            collection_names = list(exporters.keys())
+            if not collection_names:
+                fail('No collections have an ASE exporter')
+                continue
+        for collection_name in collection_names:
+            collection = bpy.data.collections.get(collection_name, None)
+            if collection is None:
+                fail(f'Collection \'{collection_name}\' does not exist')
+                continue
+            exporter_props = exporters.get(collection_name, None)
+            try:
+                props = _get_job_properties(exporter_props, job.options)
+            except JobError as e:
+                fail(str(e), collection_name)
+                continue
+            filepath = job.output if job.collection is not None else None
+            if filepath is None and exporter_props is not None:
+                filepath = exporter_props.filepath
+            if not filepath:
+                fail('No output path set', collection_name)
+                continue
+            result = _export_collection(collection, props, bpy.path.abspath(filepath), worker_count)
+            result['blend'] = job.blend
+            results.append(result)
+    return results
+
+
+# Fanning jobs out over background Blender processes.
+
+def _get_default_blender_path() -> str:
+    try:
+        import bpy
+        return bpy.app.binary_path
+    except ModuleNotFoundError:
+        return os.environ.get('BLENDER', 'blender')
+
+
+def _get_failed_results(blend: str, jobs: List[ExportJob], message: str) -> List[Dict[str, Any]]:
+    return [{'blend': blend, 'collection': job.collection, 'output': job.output, 'status': JOB_FAILED,
+             'error': message, 'warnings': []} for job in jobs]
+
+
+def _run_worker(blender: str, blend: str, jobs: List[ExportJob], directory: str, worker_index: int,
+                worker_count: int) -> List[Dict[str, Any]]:
+    '''
+    Runs the jobs of a single .blend file in a background Blender process.
+    @return: The results of the jobs. If the process fails without reporting results, a failed result for each job.
+    '''
+    jobs_path = os.path.join(directory, f'jobs{worker_index}.json')
+    results_path = os.path.join(directory, f'results{worker_index}.json')
+    with open(jobs_path, 'w') as fp:
+        json.dump([job.to_dict() for job in jobs], fp)
+    package_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [
+        blender, '--background', '--factory-startup', blend,
+        '--python-exit-code', str(EXIT_FAILURE),
+        '--python-expr', _WORKER_BOOTSTRAP.format(path=package_directory),
+        '--', '--worker-jobs', jobs_path, '--worker-results', results_path, '--workers', str(worker_count),
+    ]
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                 errors='replace')
+    except OSError as e:
+        return _get_failed_results(blend, jobs, f'Could not run Blender ({e})')
+    try:
+        with open(results_path, 'r') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        output = process.stdout.strip().splitlines()[-10:]
+        return _get_failed_results(blend, jobs, f'Blender exited with code {process.returncode} without reporting '
+                                                f'results:\n' + '\n'.join(output))
+
+
+def run_jobs(jobs: List[ExportJob], blender: str, process_count: int, worker_count: int = 0) -> List[Dict[str, Any]]:
+    '''
+    Runs export jobs in background Blender processes, one process per .blend file and at most `process_count` at once.
+    @return: The results of all of the jobs, in the order of the .blend files.
+    '''
+    jobs_by_blend: Dict[str, List[ExportJob]] = dict()
+    for job in jobs:
+        jobs_by_blend.setdefault(os.path.abspath(job.blend), []).append(job)
+    with tempfile.TemporaryDirectory() as directory, ThreadPoolExecutor(max_workers=max(process_count, 1)) as executor:
+        futures = [executor.submit(_run_worker, blender, blend, blend_jobs, directory, worker_index, worker_count)
+                   for worker_index, (blend, blend_jobs) in enumerate(jobs_by_blend.items())]
+        return [result for future in futures for result in future.result()]
+
+
+def _print_results(results: List[Dict[str, Any]], duration: float):
+    counts = {JOB_EXPORTED: 0, JOB_UNCHANGED: 0, JOB_FAILED: 0}
+    for result in results:
+        counts[result['status']] += 1
+        name = f'{result.get("blend") or ""}:{result.get("collection") or "*"}'
+        if result['status'] == JOB_FAILED:
+            print(f'{result["status"]:9} {name}: {result.get("error")}')
+        else:
+            print(f'{result["status"]:9} {name} -> {result["output"]} ({result["face_count"]} faces, '
+                  f'{result["seconds"]:.2f}s)')
+        for warning in result.get('warnings', []):
+            print(f'          warning: {warning}')
+    print(f'{counts[JOB_EXPORTED]} exported, {counts[JOB_UNCHANGED]} unchanged, {counts[JOB_FAILED]} failed '
+          f'in {duration:.2f}s')
+
+
+def main(argv: Optional[List[str]] = None):
+    if argv is None:
+        # Inside Blender, the script's arguments follow `--`.
+        argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(prog='io_scene_ase.cli', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='*', help='.blend files and JSON job manifests. Inside Blender, the open file '
+                                                  'is exported if none are given')
+    parser.add_argument('--collection', action='append', dest='collections',
+                        help='Only export this collection of each .blend file (can be repeated)')
+    parser.add_argument('--output', help='The output path, when exporting a single collection')
+    parser.add_argument('--option', action='append', default=[], metavar='NAME=VALUE',
+                        help='Override an export option for all jobs, with a JSON value (e.g., scale=2.0)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='The maximum number of Blender processes to run at once')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Format large meshes in this many processes per Blender process')
+    parser.add_argument('--blender', default=None, help='The Blender executable (default: $BLENDER or blender)')
+    parser.add_argument('--results', help='Also write the results to this JSON file')
+    parser.add_argument('--worker-jobs', help=argparse.SUPPRESS)
+    parser.add_argument('--worker-results', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+
+    if args.worker_jobs is not None:
+        # This is a worker process, started by `run_jobs`.
+        with open(args.worker_jobs, 'r') as fp:
+            jobs = [ExportJob.from_dict(x) for x in json.load(fp)]
+        results = run_jobs_in_blender(jobs, args.workers)
+        with open(args.worker_results, 'w') as fp:
+            json.dump(results, fp)
+        sys.exit(EXIT_FAILURE if any(x['status'] == JOB_FAILED for x in results) else EXIT_SUCCESS)
+
+    options: Dict[str, Any] = dict()
+    for option in args.option:
+        name, separator, value = option.partition('=')
+        if not separator:
+            parser.error(f'Option \'{option}\' must be of the form NAME=VALUE')
+        try:
+            options[name] = json.loads(value)
+        except ValueError:
+            # Allow enum values to be given without quotes.
+            options[name] = value
+
+    collections = args.collections or [None]
+    if args.output is not None and (len(collections) != 1 or collections[0] is None):
+        parser.error('--output requires exactly one --collection')
+
+    jobs: List[ExportJob] = []
+    try:
+        for path in args.inputs:
+            if path.lower().endswith('.json'):
+                for job in load_job_manifest(path):
+                    job.options.update(options)
+                    jobs.append(job)
+            else:
+                jobs.extend(ExportJob(path, collection, args.output, dict(options)) for collection in collections)
+    except (OSError, ValueError, JobError) as e:
+        parser.exit(EXIT_USAGE, f'{parser.prog}: error: {e}\n')
+
+    if not args.inputs:
+        try:
+            import bpy
+        except ModuleNotFoundError:
+            parser.error('No .blend files or job manifests given')
+        if not bpy.data.filepath:
+            parser.error('No .blend files or job manifests given, and no .blend file is open')
+        jobs = [ExportJob(bpy.data.filepath, collection, args.output, dict(options)) for collection in collections]
+        results = run_jobs_in_blender(jobs, args.workers)
+    else:
+        results = run_jobs(jobs, args.blender or _get_default_blender_path(), args.processes, args.workers)
+
+    _print_results(results, time.perf_counter() - start_time)
+    if args.results:
+        with open(args.results, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    sys.exit(EXIT_FAILURE if any(x['status'] == JOB_FAILED for x in results) else EXIT_SUCCESS)
+
+
+if __name__ == '__main__':
+    main()
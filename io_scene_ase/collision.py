@@ -0,0 +1,119 @@
+'''
+Validation of convex collision meshes (MCDCX_) on extracted geometry arrays.
+
+A collision mesh must be a closed, convex hull. Manifoldness is checked by counting how many triangles share each edge,
+and convexity by testing every vertex against the plane of every triangle.
+'''
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Vertices may lie in front of a face plane by up to this fraction of the mesh's bounding box diagonal.
+CONVEXITY_TOLERANCE = 1e-4
+
+# The maximum number of vertex/plane pairs tested at once by the convexity check.
+CONVEXITY_BLOCK_SIZE = 1 << 22
+
+
+class CollisionValidationResult:
+    def __init__(self):
+        self.non_manifold_edge_count: int = 0
+        self.edge_count: int = 0
+        # The number of vertices found outside the plane of a face. The check stops at the first block of faces that
+        # has any, so this is a lower bound.
+        self.non_convex_vertex_count: int = 0
+        self.vertex_count: int = 0
+
+    @property
+    def is_manifold(self) -> bool:
+        return self.non_manifold_edge_count == 0
+
+    @property
+    def is_convex(self) -> bool:
+        return self.non_convex_vertex_count == 0
+
+    @property
+    def is_valid(self) -> bool:
+        return self.is_manifold and self.is_convex
+
+    def get_error_message(self, name: str) -> Optional[str]:
+        if not self.is_manifold:
+            return (f'Collision mesh \'{name}\' is not manifold '
+                    f'({self.non_manifold_edge_count} of {self.edge_count} edges are not shared by exactly two faces)')
+        if not self.is_convex:
+            return (f'Collision mesh \'{name}\' is not convex '
+                    f'({self.non_convex_vertex_count} of {self.vertex_count} vertices lie outside the plane of a face)')
+        return None
+
+
+def count_non_manifold_edges(triangle_vertices: np.ndarray) -> Tuple[int, int]:
+    '''
+    Counts the edges that are not shared by exactly two triangles.
+    @param triangle_vertices: (T, 3) vertex indices of each triangle.
+    @return: The number of non-manifold edges and the total number of edges.
+    '''
+    edges = np.stack((triangle_vertices, np.roll(triangle_vertices, -1, axis=1)), axis=2).reshape(-1, 2)
+    edges.sort(axis=1)
+    # Pack each edge into a single integer key so that the edges can be counted with a 1D unique.
+    keys = edges[:, 0].astype(np.int64) << 32 | edges[:, 1].astype(np.int64)
+    _, counts = np.unique(keys, return_counts=True)
+    return int(np.count_nonzero(counts != 2)), len(counts)
+
+
+def count_non_convex_vertices(positions: np.ndarray, triangle_vertices: np.ndarray,
+                              tolerance: float = CONVEXITY_TOLERANCE) -> int:
+    '''
+    Counts the vertices that lie in front of the plane of any triangle, stopping at the first block of triangles in
+    which any are found.
+    @param positions: (V, 3) vertex positions.
+    @param triangle_vertices: (T, 3) vertex indices of each triangle, wound counter-clockwise when seen from outside.
+    @return: The number of vertices found in front of a triangle's plane.
+    '''
+    if len(positions) == 0 or len(triangle_vertices) == 0:
+        return 0
+    positions = positions.astype(np.float64)
+    a, b, c = (positions[triangle_vertices[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)
+    lengths = np.linalg.norm(normals, axis=1)
+    # Degenerate triangles don't have a plane.
+    is_degenerate = lengths <= np.finfo(np.float64).eps
+    normals = normals[~is_degenerate] / lengths[~is_degenerate, np.newaxis]
+    offsets = np.einsum('ij,ij->i', normals, a[~is_degenerate])
+    epsilon = tolerance * max(float(np.linalg.norm(positions.max(axis=0) - positions.min(axis=0))), 1.0)
+    block_size = max(1, CONVEXITY_BLOCK_SIZE // len(positions))
+    for start in range(0, len(normals), block_size):
+        stop = start + block_size
+        distances = positions @ normals[start:stop].T - offsets[start:stop]
+        is_outside = (distances > epsilon).any(axis=1)
+        if is_outside.any():
+            return int(np.count_nonzero(is_outside))
+    return 0
+
+
+def validate_collision_mesh(positions: np.ndarray, triangle_vertices: np.ndarray) -> CollisionValidationResult:
+    result = CollisionValidationResult()
+    result.vertex_count = len(positions)
+    result.non_manifold_edge_count, result.edge_count = count_non_manifold_edges(triangle_vertices)
+    # A non-manifold mesh can't be checked for convexity meaningfully.
+    if result.is_manifold:
+        result.non_convex_vertex_count = count_non_convex_vertices(positions, triangle_vertices)
+    return result
+
+
+def validate_collision_meshes(meshes: Sequence[Tuple[np.ndarray, np.ndarray]],
+                              max_workers: Optional[int] = None) -> List[CollisionValidationResult]:
+    '''
+    Validates many collision meshes on a thread pool.
+    @param meshes: The (positions, triangle vertices) of each mesh.
+    @return: The results, in the same order as the meshes.
+    '''
+    if len(meshes) <= 1:
+        return [validate_collision_mesh(positions, triangle_vertices) for positions, triangle_vertices in meshes]
+    if max_workers is None:
+        max_workers = min(len(meshes), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda mesh: validate_collision_mesh(*mesh), meshes))
@@ -0,0 +1,62 @@
+'''
+Deduplication of the texture and color vertices of geometry objects.
+
+The builder emits one texture vertex per face corner for every UV layer, and one color per corner. Most of these are
+duplicates of each other, so they are collapsed into the unique values at the precision they are written with, and the
+texture and color faces are rewritten to index the unique values.
+'''
+
+from typing import Tuple
+
+import numpy as np
+
+from .ase import ASEGeometryObject, INDEX_DTYPE
+
+
+# Attributes are written with 4 decimal places, so values that are equal at that precision are duplicates.
+DEDUPLICATION_DECIMALS = 4
+
+
+def deduplicate_rows(values: np.ndarray, decimals: int = DEDUPLICATION_DECIMALS) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    Finds the unique rows of `values`, comparing them at the given precision.
+    @param values: (N, K) values.
+    @return: The (U, K) unique rows, in order of first appearance, and the (N,) index of each row's unique row.
+    '''
+    if len(values) == 0:
+        return values, np.zeros(0, dtype=INDEX_DTYPE)
+    keys = np.round(values.astype(np.float64) * 10 ** decimals).astype(np.int64)
+    # View each row of keys as a single opaque value so that the rows can be compared with a 1D unique.
+    keys = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+    _, first_indices, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    # Number the unique rows in order of first appearance rather than in sorted order.
+    order = np.argsort(first_indices)
+    ranks = np.empty(len(order), dtype=INDEX_DTYPE)
+    ranks[order] = np.arange(len(order), dtype=INDEX_DTYPE)
+    return values[first_indices[order]], ranks[inverse.ravel()]
+
+
+def deduplicate_geometry_object_attributes(geometry_object: ASEGeometryObject):
+    '''
+    Replaces the texture vertices of each UV layer and the vertex colors of the geometry object with their unique
+    values, giving each UV layer its own texture faces and the colors their own color faces.
+    Vertex colors are dropped entirely if they are all white.
+    '''
+    for uv_layer in geometry_object.uv_layers:
+        layer_texture_vertex_faces = geometry_object.get_texture_vertex_faces(uv_layer)
+        uv_layer.texture_vertices, inverse = deduplicate_rows(uv_layer.texture_vertices)
+        uv_layer.texture_vertex_faces = inverse[layer_texture_vertex_faces]
+
+    vertex_colors = geometry_object.vertex_colors
+    if len(vertex_colors) == 0:
+        return
+    color_vertex_faces = geometry_object.get_color_vertex_faces()
+    if np.all(np.round(vertex_colors, DEDUPLICATION_DECIMALS) == 1.0):
+        geometry_object.vertex_colors = vertex_colors[:0]
+        geometry_object.color_vertex_faces = None
+        return
+    if len(color_vertex_faces) > 0 and int(color_vertex_faces.max()) >= len(vertex_colors):
+        # Not every mesh has colors, so the colors don't line up with the texture faces. Leave them as they are.
+        return
+    geometry_object.vertex_colors, inverse = deduplicate_rows(vertex_colors)
+    geometry_object.color_vertex_faces = inverse[color_vertex_faces]
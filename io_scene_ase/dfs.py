@@ -5,8 +5,10 @@ These functions are used to iterate over objects in a collection or view layer i
 instances. This is useful for exporters that need to traverse the object hierarchy in a predictable order.
 '''
 
-from typing import Optional, Set, Iterable, List
+from typing import Dict, Optional, Set, Iterable, List, Tuple
 
+import bpy
+import numpy as np
 from bpy.types import Collection, Object, ViewLayer, LayerCollection, Context
 from mathutils import Matrix
 
@@ -21,34 +23,95 @@ class DfsObject:
         self.matrix_world = matrix_world
 
 
+class FlattenedCollection:
+    '''
+    The non-instance objects of a collection, including those of its child collections and instances, in depth-first
+    order, along with the instance objects leading to each object and each object's matrix, all relative to the
+    collection.
+    '''
+    def __init__(self):
+        self.objects: List[Object] = []
+        self.instance_objects: List[Tuple[Object, ...]] = []
+        self.matrices = np.empty((0, 4, 4), dtype=np.float64)
+
+
+class DfsIndex:
+    '''
+    The parent-child relationships and collection memberships needed by a depth-first search, computed once for a
+    whole search instead of once per object: `Object.children` scans every object in the file, and looking an object up
+    in `Collection.objects` is linear in the size of the collection.
+    The index must not be kept across changes to the scene.
+    '''
+    def __init__(self):
+        self._children: Optional[Dict[Object, List[Object]]] = None
+        self._collection_members: Dict[Collection, Tuple[List[Object], Set[Object], Set[str]]] = dict()
+        self._flattened_collections: Dict[Collection, FlattenedCollection] = dict()
+
+    def get_children(self, obj: Object) -> List[Object]:
+        '''
+        Gets the children of an object, in the same order as `Object.children`.
+        '''
+        if self._children is None:
+            # `Object.children` lists the objects in `bpy.data.objects` whose parent is the object.
+            self._children = dict()
+            for child in bpy.data.objects:
+                if child.parent is not None:
+                    self._children.setdefault(child.parent, []).append(child)
+        return self._children.get(obj, [])
+
+    def get_collection_members(self, collection: Collection) -> Tuple[List[Object], Set[Object], Set[str]]:
+        '''
+        Gets the objects directly in a collection, as a list (in the order of `Collection.objects`), a set, and a set of
+        their names.
+        '''
+        members = self._collection_members.get(collection, None)
+        if members is None:
+            objects = list(collection.objects)
+            members = self._collection_members[collection] = (objects, set(objects), {x.name for x in objects})
+        return members
+
+    def get_flattened_collection(self, collection: Collection) -> FlattenedCollection:
+        '''
+        Gets the flattened contents of a collection. Each collection is only flattened once, however often it is
+        instanced.
+        '''
+        return _flatten_collection(collection, self, set())
 
-def _dfs_object_children(obj: Object, collection: Collection) -> Iterable[Object]:
+
+def _dfs_object_children(obj: Object, object_names: Set[str], index: DfsIndex) -> Iterable[Object]:
     '''
     Construct a list of objects in hierarchy order from `collection.objects`, only keeping those that are in the
     collection.
     @param obj: The object to start the search from.
-    @param collection:  The collection to search in.
+    @param object_names: The names of the objects in the collection to search in.
+    @param index: The index of the search.
     @return: An iterable of objects in hierarchy order.
     '''
-    yield obj
-    for child in obj.children:
-        if child.name in collection.objects:
-            yield from _dfs_object_children(child, collection)
+    # This is iterative so that deep hierarchies don't run into the recursion limit, or nest generators.
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        yield obj
+        stack.extend(child for child in reversed(index.get_children(obj)) if child.name in object_names)
 
 
-def dfs_objects_in_collection(collection: Collection) -> Iterable[Object]:
+def dfs_objects_in_collection(collection: Collection, index: Optional[DfsIndex] = None) -> Iterable[Object]:
     '''
     Returns a depth-first iterator over all objects in a collection, only keeping those that are directly in the
     collection.
     @param collection: The collection to search in.
+    @param index: The index of the search, if this is part of a larger search.
     @return: An iterable of objects in hierarchy order.
     '''
+    if index is None:
+        index = DfsIndex()
+    objects, object_set, object_names = index.get_collection_members(collection)
     objects_hierarchy = []
-    for obj in collection.objects:
-        if obj.parent is None or obj.parent not in set(collection.objects):
+    for obj in objects:
+        if obj.parent is None or obj.parent not in object_set:
             objects_hierarchy.append(obj)
     for obj in objects_hierarchy:
-        yield from _dfs_object_children(obj, collection)
+        yield from _dfs_object_children(obj, object_names, index)
 
 
 def dfs_collection_objects(collection: Collection) -> Iterable[DfsObject]:
@@ -57,23 +120,85 @@ def dfs_collection_objects(collection: Collection) -> Iterable[DfsObject]:
     @param collection: The collection to search in.
     @return: An iterable of tuples containing the object, the instance objects, and the world matrix.
     '''
-    yield from _dfs_collection_objects_recursive(collection)
+    yield from _dfs_collection_objects_recursive(collection, index=DfsIndex())
+
+
+def _flatten_collection(collection: Collection, index: DfsIndex, flattening: Set[Collection]) -> FlattenedCollection:
+    '''
+    Flattens a collection, reusing the flattened contents of collections that were already flattened.
+    @param collection: The collection to flatten.
+    @param index: The index of the search.
+    @param flattening: The collections that are being flattened, in which the collection is nested. Instances of these
+        collections would be cyclic, so they are skipped.
+    @return: The flattened collection.
+    '''
+    flattened = index._flattened_collections.get(collection, None)
+    if flattened is not None:
+        return flattened
+
+    flattened = FlattenedCollection()
+    matrix_chunks: List[np.ndarray] = []
+    leaf_matrices: List[Matrix] = []
+
+    def add_leaf_matrices():
+        if leaf_matrices:
+            matrix_chunks.append(np.array(leaf_matrices, dtype=np.float64))
+            leaf_matrices.clear()
+
+    flattening.add(collection)
+
+    # First, add all objects in child collections.
+    for child in collection.children:
+        child_flattened = _flatten_collection(child, index, flattening)
+        add_leaf_matrices()
+        flattened.objects += child_flattened.objects
+        flattened.instance_objects += child_flattened.instance_objects
+        matrix_chunks.append(child_flattened.matrices)
+
+    # Then, add all objects in this collection.
+    for obj in dfs_objects_in_collection(collection, index):
+        # If this an instance, add the contents of the instanced collection.
+        if obj.instance_collection is not None:
+            if obj.instance_collection in flattening:
+                continue
+            instance_flattened = _flatten_collection(obj.instance_collection, index, flattening)
+            # Calculate the instance transform, and apply it to all of the instanced objects at once.
+            instance_matrix = obj.matrix_world @ Matrix.Translation(-obj.instance_collection.instance_offset)
+            add_leaf_matrices()
+            flattened.objects += instance_flattened.objects
+            flattened.instance_objects += [(obj,) + x for x in instance_flattened.instance_objects]
+            matrix_chunks.append(np.matmul(np.array(instance_matrix, dtype=np.float64), instance_flattened.matrices))
+        else:
+            flattened.objects.append(obj)
+            flattened.instance_objects.append(())
+            leaf_matrices.append(obj.matrix_world)
+
+    flattening.remove(collection)
+
+    add_leaf_matrices()
+    if matrix_chunks:
+        flattened.matrices = np.concatenate(matrix_chunks)
+    index._flattened_collections[collection] = flattened
+    return flattened
 
 
 def _dfs_collection_objects_recursive(
         collection: Collection,
         instance_objects: Optional[List[Object]] = None,
         matrix_world: Matrix = Matrix.Identity(4),
-        visited: Set[tuple[Object, Object | None]] | None=None
+        visited: Set[tuple[Object, Object | None]] | None=None,
+        index: Optional[DfsIndex] = None
 ) -> Iterable[DfsObject]:
     """
     Depth-first search of objects in a collection, including recursing into instances.
-    This is a recursive function.
-    
+    The contents of the collection are flattened once per search, so instancing a collection again only costs a
+    matrix multiplication per object.
+
     @param collection: The collection to search in.
     @param instance_objects: The running hierarchy of instance objects.
     @param matrix_world: The world matrix of the current object.
     @param visited: A set of visited object-instance pairs.
+    @param index: The index of the search.
     @return: An iterable of tuples containing the object, the instance objects, and the world matrix.
     """
 
@@ -84,28 +209,28 @@ def _dfs_collection_objects_recursive(
     if instance_objects is None:
         instance_objects = list()
 
-    # First, yield all objects in child collections.
-    for child in collection.children:
-        yield from _dfs_collection_objects_recursive(child, instance_objects, matrix_world.copy(), visited)
+    if index is None:
+        index = DfsIndex()
+
+    flattened = index.get_flattened_collection(collection)
+    if not flattened.objects:
+        return
+
+    matrices = np.matmul(np.array(matrix_world, dtype=np.float64), flattened.matrices).tolist()
+    # Objects reached through the same instances share the same list of instance objects.
+    instance_objects_lists: Dict[Tuple[Object, ...], List[Object]] = {(): instance_objects}
+    outer_instance_object = instance_objects[-1] if instance_objects else None
 
-    # Then, evaluate all objects in this collection.
-    for obj in dfs_objects_in_collection(collection):
-        visited_pair = (obj, instance_objects[-1] if instance_objects else None)
+    for obj, relative_instance_objects, matrix in zip(flattened.objects, flattened.instance_objects, matrices):
+        visited_pair = (obj, relative_instance_objects[-1] if relative_instance_objects else outer_instance_object)
         if visited_pair in visited:
             continue
-        # If this an instance, we need to recurse into it.
-        if obj.instance_collection is not None:
-            # Calculate the instance transform.
-            instance_offset_matrix = Matrix.Translation(-obj.instance_collection.instance_offset)
-            # Recurse into the instance collection.
-            yield from _dfs_collection_objects_recursive(obj.instance_collection,
-                                                         instance_objects + [obj],
-                                                         matrix_world @ (obj.matrix_world @ instance_offset_matrix),
-                                                         visited)
-        else:
-            # Object is not an instance, yield it.
-            yield DfsObject(obj, instance_objects, matrix_world @ obj.matrix_world)
-            visited.add(visited_pair)
+        object_instance_objects = instance_objects_lists.get(relative_instance_objects, None)
+        if object_instance_objects is None:
+            object_instance_objects = instance_objects + list(relative_instance_objects)
+            instance_objects_lists[relative_instance_objects] = object_instance_objects
+        yield DfsObject(obj, object_instance_objects, Matrix(matrix))
+        visited.add(visited_pair)
 
 
 def dfs_view_layer_objects(view_layer: ViewLayer) -> Iterable[DfsObject]:
@@ -114,13 +239,15 @@ def dfs_view_layer_objects(view_layer: ViewLayer) -> Iterable[DfsObject]:
     @param view_layer: The view layer to inspect.
     @return: An iterable of tuples containing the object, the instance objects, and the world matrix.
     '''
+    index = DfsIndex()
+
     def layer_collection_objects_recursive(layer_collection: LayerCollection, visited: Set[Object]=None):
         if visited is None:
             visited = set()
         for child in layer_collection.children:
             yield from layer_collection_objects_recursive(child, visited=visited)
         # Iterate only the top-level objects in this collection first.
-        yield from _dfs_collection_objects_recursive(layer_collection.collection, visited=visited)
+        yield from _dfs_collection_objects_recursive(layer_collection.collection, visited=visited, index=index)
 
     yield from layer_collection_objects_recursive(view_layer.layer_collection)
 
@@ -130,6 +257,7 @@ def dfs_objects_recursive(objects: Iterable[Object]) -> Iterable[DfsObject]:
     Depth-first iterator over the provided objects, including recusing into instances.
     """
     visited: set[tuple[Object, Object | None]] = set()
+    index = DfsIndex()
     for obj in objects:
         visited_pair = (obj, None)
         if visited_pair in visited:
@@ -143,7 +271,8 @@ def dfs_objects_recursive(objects: Iterable[Object]) -> Iterable[DfsObject]:
                 obj.instance_collection,
                 [obj],
                 obj.matrix_world @ instance_offset_matrix,
-                visited
+                visited,
+                index
                 )
         else:
             # Object is not an instance, yield it.
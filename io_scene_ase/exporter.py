@@ -1,28 +1,28 @@
 from abc import ABCMeta, abstractmethod
-from typing import Iterable, List, cast, Optional
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Iterable, List, cast, Optional, Dict, Set, Tuple
+import os
+import time
 
 import bpy
 from bpy_extras.io_utils import ExportHelper
 from bpy.props import StringProperty, EnumProperty
 from bpy.types import Operator, Material, UILayout, UIList, Object, FileHandler, Event, Context, SpaceProperties, \
-    Collection, Panel, Depsgraph
+    Collection, Panel
 from mathutils import Matrix, Vector
 
-from .builder import ASEBuildOptions, ASEBuildError, build_ase
+from .ase import ASE
+from .builder import ASEBuildOptions, ASEBuildError, build_ase, iter_build_ase
 from .writer import write_ase
-from .properties import AseExportMixin, TransformMixin, MaterialMappingMixin, VertexColorMixin, get_vertex_color_attributes_from_objects
-from .dfs import dfs_collection_objects, dfs_objects_recursive
-
-
-def _get_unique_materials(depsgraph: Depsgraph, mesh_objects: Iterable[Object]) -> List[Material]:
-    materials = []
-    for mesh_object in mesh_objects:
-        eo = mesh_object.evaluated_get(depsgraph)
-        for i, material_slot in enumerate(eo.material_slots):
-            material = material_slot.material
-            if material not in materials:
-                materials.append(material)
-    return materials
+from .manifest import write_ase_if_changed
+from .intermediate import save_ase, INTERMEDIATE_SUFFIX
+from .properties import AseExportMixin, TransformMixin, MaterialMappingMixin, VertexColorMixin
+from .dfs import DfsObject, dfs_collection_objects
+from .snapshot import MeshObjectScan, ObjectsSnapshot, get_collection_snapshot, get_selection_snapshot
+from .cache import ExtractionCache, extraction_cache
+from .materials import MaterialTable
+from .stats import ExportStats, NULL_STATS
+from .modal import ModalExport, MODAL_TIMER_INTERVAL, get_dependency_uids, is_navigation_event
 
 
 def _get_collection_from_context(context: Context) -> Optional[Collection]:
@@ -44,50 +44,59 @@ def _get_collection_export_operator_from_context(context: Context) -> 'ASE_OT_ex
     if 0 > collection.active_exporter_index >= len(collection.exporters):
         return None
     exporter = collection.exporters[collection.active_exporter_index]
-    # TODO: make sure this is actually an ASE exporter.
+    if not _is_ase_collection_exporter(exporter):
+        return None
     return exporter.export_properties
 
 
+def _is_ase_collection_exporter(exporter) -> bool:
+    # The exporter's properties are those of `ASE_OT_export_collection`.
+    props = exporter.export_properties
+    return props is not None and hasattr(props, 'object_eval_state') and hasattr(props, 'export_space')
+
+
+def _get_ase_collection_exporters() -> Iterable[Tuple[Collection, 'ASE_OT_export_collection']]:
+    for collection in bpy.data.collections:
+        for exporter in collection.exporters:
+            if _is_ase_collection_exporter(exporter):
+                yield collection, exporter.export_properties
+
+
 class ObjectsSource:
     __metaclass__ = ABCMeta
 
     @staticmethod
     @abstractmethod
-    def _get_objects(context: Context) -> List[Object]:
-        """Hey"""
+    def _get_snapshot(context: Context) -> Optional[ObjectsSnapshot]:
+        pass
+
+    @classmethod
+    def _get_objects(cls, context: Context) -> List[Object]:
+        snapshot = cls._get_snapshot(context)
+        return snapshot.mesh_objects if snapshot is not None else []
 
 
 class ObjectsSourceCollection(ObjectsSource):
     @staticmethod
-    def _get_objects(context: Context) -> List[Object]:
+    def _get_snapshot(context: Context) -> Optional[ObjectsSnapshot]:
         collection = _get_collection_from_context(context)
         operator = _get_collection_export_operator_from_context(context)
         if collection is None or operator is None:
-            return []
-        return list(map(lambda x: x.obj, filter(lambda x: x.obj.type == 'MESH', dfs_collection_objects(collection))))
+            return None
+        return get_collection_snapshot(context, collection)
 
 
 class ObjectsSourceScene(ObjectsSource):
     @staticmethod
-    def _get_objects(context: Context) -> List[Object]:
-        if context.selected_objects is None:
-            return []
-        return list(map(lambda x: x.obj, filter(lambda x: x.obj.type == 'MESH', dfs_objects_recursive(context.selected_objects))))
+    def _get_snapshot(context: Context) -> Optional[ObjectsSnapshot]:
+        return get_selection_snapshot(context)
 
 
 class MaterialsSource(ObjectsSource):
     @classmethod
-    def _get_materials(cls, context: Context) -> List[Material]:
-        return _get_unique_materials(context.evaluated_depsgraph_get(), cls._get_objects(context))
-
-
-def _get_unique_materials_from_selected_objects(context: Context):
-    if context.selected_objects is None:
-            return []
-    from .dfs import dfs_objects_recursive
-    dfs_objects = list(filter(lambda x: x.obj.type == 'MESH', dfs_objects_recursive(context.selected_objects)))
-    mesh_objects = list(map(lambda x: x.obj, dfs_objects))
-    return _get_unique_materials(context.evaluated_depsgraph_get(), mesh_objects)
+    def _get_materials(cls, context: Context) -> MaterialTable:
+        snapshot = cls._get_snapshot(context)
+        return snapshot.get_unique_materials() if snapshot is not None else MaterialTable()
 
 
 class AseExportSource:
@@ -259,9 +268,9 @@ def _material_mapping_populate(props: MaterialMappingMixin, materials: Iterable[
         m.value = material.name
 
 
-def _vertex_color_attributes_populate(props: VertexColorMixin, mesh_objects: Iterable[Object]):
+def _vertex_color_attributes_populate(props: VertexColorMixin, names: Iterable[str]):
     props.vertex_color_attributes.clear()
-    for name in get_vertex_color_attributes_from_objects(mesh_objects):
+    for name in names:
         x = props.vertex_color_attributes.add()
         x.name = name
 
@@ -271,11 +280,11 @@ class VertexColorAttributesPopulateOperator(Operator, ObjectsSource, VertexColor
     bl_description = 'Populate the vertex colors list with those used by the relevant objects'
 
     def execute(self, context: Context):
-        objects = self._get_objects(context)
+        snapshot = self._get_snapshot(context)
         props = self._get_props(context)
-        if props is None:
+        if props is None or snapshot is None:
             return {'CANCELLED'}
-        _vertex_color_attributes_populate(props, objects)
+        _vertex_color_attributes_populate(props, snapshot.get_vertex_color_attributes())
         return {'FINISHED'}
 
 
@@ -308,21 +317,19 @@ class ASE_OT_export_scene_material_mapping_populate(MaterialMappingPopulateOpera
     bl_idname = 'ase_export.scene_material_mapping_populate'
 
 
-def _get_selected_mesh_objects(context: Context):
-    if context.selected_objects is None:
-        return []
-    dfs_objects = list(filter(lambda x: x.obj.type == 'MESH', dfs_objects_recursive(context.selected_objects)))
-    return [x.obj for x in dfs_objects]
-
-
-def _options_build(options: ASEBuildOptions, props: AseExportMixin, mesh_objects: Iterable[Object]):
+def _options_build(options: ASEBuildOptions, props: AseExportMixin, mesh_objects: Iterable[Object],
+                   scan: Optional[MeshObjectScan] = None):
+    if scan is None:
+        scan = MeshObjectScan(bpy.context.evaluated_depsgraph_get())
     options.object_eval_state = props.object_eval_state
     options.should_export_vertex_colors = props.should_export_vertex_colors
     options.vertex_color_mode = props.vertex_color_mode
-    options.has_vertex_colors = len(get_vertex_color_attributes_from_objects(mesh_objects)) > 0
+    options.has_vertex_colors = len(scan.get_vertex_color_attributes(mesh_objects)) > 0
     options.vertex_color_attribute = props.vertex_color_attribute
     options.should_invert_normals = props.should_invert_normals
     options.scct_versus_mcdcx_flip = props.scct_versus_mcdcx_flip
+    options.should_dodge_overlapping_smoothing_groups = props.should_dodge_overlapping_smoothing_groups
+    options.should_deduplicate_vertex_attributes = props.should_deduplicate_vertex_attributes
 
     match props.transform_source:
         case 'SCENE':
@@ -336,13 +343,145 @@ def _options_build(options: ASEBuildOptions, props: AseExportMixin, mesh_objects
     options.forward_axis = transform_source.forward_axis
     options.up_axis = transform_source.up_axis
 
-    options.materials = _get_unique_materials(bpy.context.evaluated_depsgraph_get(), mesh_objects)
+    scene_settings = getattr(bpy.context.scene, 'ase_settings')
+    if scene_settings.use_extraction_cache:
+        extraction_cache.max_bytes = scene_settings.extraction_cache_size * 1024 * 1024
+        extraction_cache.evict()
+        options.extraction_cache = extraction_cache
+    else:
+        extraction_cache.clear()
+
+    options.materials = scan.get_unique_materials(mesh_objects)
     if props.material_mode == 'MANUAL':
         options.materials = _apply_material_mapping(options.materials, props)
         options.material_mapping = {x.key: x.value for x in props.material_mapping}
 
 
-class ASE_OT_export(Operator, ExportHelper):
+def _get_writer_worker_count(context: Context) -> int:
+    scene_settings = getattr(context.scene, 'ase_settings')
+    if not scene_settings.use_parallel_writer:
+        return 0
+    return scene_settings.writer_worker_count or os.cpu_count() or 1
+
+
+def _report_ase_warnings(operator: Operator, ase: ASE):
+    for warning in ase.warnings:
+        operator.report({'WARNING'}, warning)
+
+
+def _get_export_stats(context: Context) -> ExportStats:
+    scene_settings = getattr(context.scene, 'ase_settings')
+    if not scene_settings.use_export_stats:
+        return NULL_STATS
+    return ExportStats(should_trace_memory=scene_settings.should_trace_memory)
+
+
+def _finish_export_stats(context: Context, stats: ExportStats) -> str:
+    '''
+    Prints the statistics of an export to the console and saves them as a Chrome trace, if a trace file is set.
+    @return: A summary of the statistics to append to the report message, or an empty string.
+    '''
+    if stats is NULL_STATS:
+        return ''
+    stats.close()
+    print(f'ASCII Scene Export statistics:\n{stats.get_report()}')
+    trace_path = getattr(context.scene, 'ase_settings').export_trace_path
+    if trace_path:
+        stats.write_chrome_trace(bpy.path.abspath(trace_path))
+    return f' [{stats.get_summary()}]'
+
+
+def _is_modal_export_enabled(context: Context) -> bool:
+    return getattr(context.scene, 'ase_settings').use_modal_export and not bpy.app.background
+
+
+def _get_ase_counts_message(ase: ASE) -> str:
+    object_count = len(ase.geometry_objects)
+    material_count = len(ase.materials)
+    face_count = sum(len(x.face_indices) for x in ase.geometry_objects)
+    vertex_count = sum(len(x.vertices) for x in ase.geometry_objects)
+    return f'{object_count} objects, {material_count} materials, {face_count} faces, {vertex_count} vertices'
+
+
+class ModalExportMixin:
+    '''
+    Runs an export as a `ModalExport`, advanced by a timer so that the interface stays responsive.
+    '''
+    def start_modal_export(self, context: Context, modal_export: ModalExport) -> Set[str]:
+        self._modal_export = modal_export
+        self._timer = context.window_manager.event_timer_add(MODAL_TIMER_INTERVAL, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def _end_modal_export(self, context: Context):
+        context.window_manager.event_timer_remove(self._timer)
+        context.workspace.status_text_set(None)
+        self._modal_export.stats.close()
+
+    def modal(self, context: Context, event: Event):
+        modal_export = self._modal_export
+        if event.type == 'ESC':
+            modal_export.cancel()
+        elif event.type != 'TIMER':
+            if modal_export.state == 'BUILDING' and not is_navigation_event(event.type):
+                # The build refers to the objects being exported, so they must not be edited until it is done.
+                return {'RUNNING_MODAL'}
+            return {'PASS_THROUGH'}
+
+        try:
+            is_done = modal_export.step()
+        except ReferenceError:
+            # An object was removed in a way that the dependency handlers didn't catch (e.g., by a script).
+            self._end_modal_export(context)
+            self.report({'ERROR'}, 'An exported object was removed during the export, the file was not written')
+            return {'CANCELLED'}
+        except Exception as e:
+            self._end_modal_export(context)
+            if not isinstance(e, (ASEBuildError, OSError)):
+                raise
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        if not is_done:
+            context.workspace.status_text_set(modal_export.get_status_text())
+            return {'RUNNING_MODAL'}
+
+        self._end_modal_export(context)
+
+        if modal_export.abandon_reason is not None:
+            self.report({'ERROR'}, f'{modal_export.abandon_reason}, the file was not written')
+            return {'CANCELLED'}
+        elif modal_export.state == 'CANCELLED':
+            self.report({'WARNING'}, 'ASE export cancelled, the file was not written')
+            return {'CANCELLED'}
+
+        ase = modal_export.ase
+        _report_ase_warnings(self, ase)
+        stats_summary = _finish_export_stats(context, modal_export.stats)
+        if modal_export.is_written:
+            self.report({'INFO'}, f'ASE exported successfully ({_get_ase_counts_message(ase)}){stats_summary}')
+        else:
+            self.report({'INFO'}, f'ASE output is unchanged, the file was not rewritten{stats_summary}')
+        return {'FINISHED'}
+
+
+def _write_ase(filepath: str, ase, should_skip_unchanged: bool, worker_count: int = 0,
+               should_save_intermediate: bool = False, stats: ExportStats = NULL_STATS) -> bool:
+    '''
+    Writes the ASE, optionally skipping the write if the output would be unchanged.
+    @param should_save_intermediate: Whether to also save the built data next to the file, in the intermediate format.
+    @return: True if the file was written.
+    '''
+    if should_save_intermediate:
+        with stats.stage('save_intermediate'):
+            save_ase(os.path.splitext(filepath)[0] + INTERMEDIATE_SUFFIX, ase)
+    if should_skip_unchanged:
+        return write_ase_if_changed(filepath, ase, worker_count=worker_count, stats=stats)
+    write_ase(filepath, ase, worker_count=worker_count, stats=stats)
+    return True
+
+
+class ASE_OT_export(Operator, ExportHelper, ModalExportMixin):
     bl_idname = 'io_scene_ase.ase_export'
     bl_label = 'Export ASE'
     bl_space_type = 'PROPERTIES'
@@ -353,7 +492,7 @@ class ASE_OT_export(Operator, ExportHelper):
 
     @classmethod
     def poll(cls, context):
-        if not context.selected_objects or not any(x.type == 'MESH' or (x.type == 'EMPTY' and x.instance_collection is not None) for x in context.selected_objects):
+        if not get_selection_snapshot(context).has_exportable_objects:
             cls.poll_message_set('At least one mesh or instanced collection must be selected')
             return False
         return True
@@ -378,11 +517,9 @@ class ASE_OT_export(Operator, ExportHelper):
         pg = cast(AseExportMixin, getattr(context.scene, 'ase_export'))
 
         # Populate the material mapping list and vertex color attributes.
-        materials = _get_unique_materials_from_selected_objects(context)
-        _material_mapping_populate(pg, materials)
-
-        mesh_objects = _get_selected_mesh_objects(context)
-        _vertex_color_attributes_populate(pg, mesh_objects)
+        snapshot = get_selection_snapshot(context)
+        _material_mapping_populate(pg, snapshot.get_unique_materials())
+        _vertex_color_attributes_populate(pg, snapshot.get_vertex_color_attributes())
 
         if context.active_object is not None:
             self.filepath = f'{context.active_object.name}.ase'
@@ -394,27 +531,39 @@ class ASE_OT_export(Operator, ExportHelper):
     def execute(self, context):
         pg = cast(AseExportMixin, getattr(context.scene, 'ase_export'))
 
-        mesh_objects = _get_selected_mesh_objects(context)
+        snapshot = get_selection_snapshot(context)
         options = ASEBuildOptions()
-        _options_build(options, pg, mesh_objects)
+        _options_build(options, pg, snapshot.mesh_objects, snapshot.mesh_object_scan)
+        options.stats = _get_export_stats(context)
 
-        try:
-            assert context.selected_objects is not None
-            dfs_objects = dfs_objects_recursive(context.selected_objects)
-            ase = build_ase(context, options, dfs_objects)
+        dfs_objects = snapshot.dfs_objects
 
-            # Calculate some statistics about the ASE file to display in the console.
-            object_count = len(ase.geometry_objects)
-            material_count = len(ase.materials)
-            face_count = sum(len(x.faces) for x in ase.geometry_objects)
-            vertex_count = sum(len(x.vertices) for x in ase.geometry_objects)
+        if _is_modal_export_enabled(context):
+            # The build outlives this call, so it is given `bpy.context`, which always refers to the current context.
+            builder = iter_build_ase(bpy.context, options, dfs_objects)
+            return self.start_modal_export(context, ModalExport(builder, self.filepath, pg.should_skip_unchanged,
+                                                                _get_writer_worker_count(context),
+                                                                pg.should_save_intermediate, options.stats,
+                                                                dependency_uids=get_dependency_uids(dfs_objects)))
 
-            write_ase(self.filepath, ase)
-            self.report({'INFO'}, f'ASE exported successfully ({object_count} objects, {material_count} materials, {face_count} faces, {vertex_count} vertices)')
+        try:
+            ase = build_ase(context, options, dfs_objects)
+            _report_ase_warnings(self, ase)
+
+            is_written = _write_ase(self.filepath, ase, pg.should_skip_unchanged,
+                                    worker_count=_get_writer_worker_count(context),
+                                    should_save_intermediate=pg.should_save_intermediate, stats=options.stats)
+            stats_summary = _finish_export_stats(context, options.stats)
+            if not is_written:
+                self.report({'INFO'}, f'ASE output is unchanged, the file was not rewritten{stats_summary}')
+                return {'FINISHED'}
+            self.report({'INFO'}, f'ASE exported successfully ({_get_ase_counts_message(ase)}){stats_summary}')
             return {'FINISHED'}
         except ASEBuildError as e:
             self.report({'ERROR'}, str(e))
             return {'CANCELLED'}
+        finally:
+            options.stats.close()
 
 
 export_space_items = [
@@ -422,24 +571,10 @@ export_space_items = [
     ('INSTANCE', 'Instance Space', 'Export the collection in instance space'),
 ]
 
-def _apply_material_mapping(materials: list[Material], material_mapping_mixin: MaterialMappingMixin):
+def _apply_material_mapping(materials: MaterialTable, material_mapping_mixin: MaterialMappingMixin) -> MaterialTable:
     # Sort the materials based on the order in the material order list, keeping in mind that the material order list
     # may not contain all the materials used by the objects in the collection.
-    material_names = {x.key for x in material_mapping_mixin.material_mapping}
-    material_names_map = {x: i for i, x in enumerate(material_names)}
-
-    # Split the list of materials into two lists: one for materials that appear in the material order list, and one
-    # for materials that do not. Then append the two lists together, with the ordered materials first.
-    ordered_materials = []
-    unordered_materials = []
-    for material in materials:
-        if material.name in material_names_map:
-            ordered_materials.append(material)
-        else:
-            unordered_materials.append(material)
-
-    ordered_materials.sort(key=lambda x: material_names_map.get(x.name, len(material_names)))
-    return ordered_materials + unordered_materials
+    return materials.sorted_by_names([x.key for x in material_mapping_mixin.material_mapping])
 
 
 def _draw_materials_panel(
@@ -543,10 +678,15 @@ def _draw_advanced_panel(layout: UILayout, props):
             fixes_panel.use_property_split = True
             fixes_panel.use_property_decorate = False
             fixes_panel.prop(props, 'should_invert_normals')
+            fixes_panel.prop(props, 'should_dodge_overlapping_smoothing_groups')
             fixes_panel.prop(props, 'scct_versus_mcdcx_flip')
 
+        advanced_panel.prop(props, 'should_deduplicate_vertex_attributes')
+        advanced_panel.prop(props, 'should_skip_unchanged')
+        advanced_panel.prop(props, 'should_save_intermediate')
+
 
-class ASE_OT_export_collection(Operator, ExportHelper, AseExportMixin):
+class ASE_OT_export_collection(Operator, ExportHelper, AseExportMixin, ModalExportMixin):
     bl_idname = 'io_scene_ase.ase_export_collection'
     bl_label = 'Export collection to ASE'
     bl_space_type = 'PROPERTIES'
@@ -578,32 +718,194 @@ class ASE_OT_export_collection(Operator, ExportHelper, AseExportMixin):
         if collection is None:
             return {'CANCELLED'}
 
-        dfs_objects = list(filter(lambda x: x.obj.type == 'MESH', dfs_collection_objects(collection)))
+        if _is_modal_export_enabled(context):
+            stats = _get_export_stats(context)
+            options, dfs_objects = _get_collection_build_inputs(collection, self, stats=stats)
+            # The build outlives this call, so it is given `bpy.context`, which always refers to the current context.
+            builder = iter_build_ase(bpy.context, options, dfs_objects)
+            return self.start_modal_export(context, ModalExport(builder, self.filepath, self.should_skip_unchanged,
+                                                                _get_writer_worker_count(context),
+                                                                self.should_save_intermediate, stats,
+                                                                dependency_uids=get_dependency_uids(dfs_objects)))
+
+        with _get_export_stats(context) as stats:
+            try:
+                ase = _build_collection_ase(context, collection, self, stats=stats)
+            except ASEBuildError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+
+            _report_ase_warnings(self, ase)
+
+            try:
+                is_written = _write_ase(self.filepath, ase, self.should_skip_unchanged,
+                                        worker_count=_get_writer_worker_count(context),
+                                        should_save_intermediate=self.should_save_intermediate, stats=stats)
+            except OSError as e:
+                # Includes failures to write the manifest or the intermediate file (e.g., a missing directory).
+                self.report({'ERROR'}, 'ASCII Scene Export: ' + str(e))
+                return {'CANCELLED'}
+
+            stats_summary = _finish_export_stats(context, stats)
+            if not is_written:
+                self.report({'INFO'}, f'ASE output is unchanged, the file was not rewritten{stats_summary}')
+            elif stats_summary:
+                self.report({'INFO'}, f'ASE exported successfully{stats_summary}')
 
-        # Get all the materials used by the objects in the collection.
-        mesh_objects = [x.obj for x in dfs_objects]
+        return {'FINISHED'}
 
-        options = ASEBuildOptions()
-        _options_build(options, self, mesh_objects)
 
-        # Only the collection exporter has the export_space option.
-        match self.export_space:
-            case 'WORLD':
-                options.transform = Matrix.Identity(4)
-            case 'INSTANCE':
-                options.transform = Matrix.Translation(-Vector(collection.instance_offset))
+def _get_collection_build_inputs(collection: Collection, props: ASE_OT_export_collection,
+                                 scan: Optional[MeshObjectScan] = None,
+                                 cache: Optional[ExtractionCache] = None,
+                                 stats: ExportStats = NULL_STATS) -> Tuple[ASEBuildOptions, List[DfsObject]]:
+    '''
+    Gets the build options and the objects to build for the export of a collection.
+    '''
+    dfs_objects = list(filter(lambda x: x.obj.type == 'MESH', dfs_collection_objects(collection)))
 
-        try:
-            ase = build_ase(context, options, dfs_objects)
-        except ASEBuildError as e:
-            self.report({'ERROR'}, str(e))
-            return {'CANCELLED'}
+    # Get all the materials used by the objects in the collection.
+    mesh_objects = [x.obj for x in dfs_objects]
+
+    options = ASEBuildOptions()
+    _options_build(options, props, mesh_objects, scan)
+
+    if cache is not None:
+        options.extraction_cache = cache
+
+    options.stats = stats
+
+    # Only the collection exporter has the export_space option.
+    match props.export_space:
+        case 'WORLD':
+            options.transform = Matrix.Identity(4)
+        case 'INSTANCE':
+            options.transform = Matrix.Translation(-Vector(collection.instance_offset))
+
+    return options, dfs_objects
+
+
+def _build_collection_ase(context: Context, collection: Collection, props: ASE_OT_export_collection,
+                          scan: Optional[MeshObjectScan] = None,
+                          cache: Optional[ExtractionCache] = None,
+                          stats: ExportStats = NULL_STATS,
+                          should_show_progress: bool = True):
+    options, dfs_objects = _get_collection_build_inputs(collection, props, scan, cache, stats)
+    return build_ase(context, options, dfs_objects, should_show_progress)
+
+
+class ASE_OT_export_all_collections(Operator):
+    bl_idname = 'io_scene_ase.ase_export_all_collections'
+    bl_label = 'Export All ASE Collections'
+    bl_description = 'Export every collection that has an ASE exporter'
+    bl_options = {'REGISTER'}
 
+    # The maximum number of built ASEs that can be waiting to be written at once.
+    max_pending_writes = 8
+
+    @classmethod
+    def poll(cls, context: Context):
+        if not any(True for _ in _get_ase_collection_exporters()):
+            cls.poll_message_set('No collections have an ASE exporter')
+            return False
+        return True
+
+    def execute(self, context: Context):
+        start_time = time.perf_counter()
+        exporters = list(_get_ase_collection_exporters())
+
+        # The depsgraph, the material and vertex color scans and the extracted meshes are shared by all exports.
+        scan = MeshObjectScan(context.evaluated_depsgraph_get())
+        scene_settings = getattr(context.scene, 'ase_settings')
+        cache = extraction_cache if scene_settings.use_extraction_cache else ExtractionCache(scene_settings.extraction_cache_size * 1024 * 1024)
+
+        exported: List[str] = []
+        skipped: List[str] = []
+        errors: List[str] = []
+        warnings: List[str] = []
+        face_count = 0
+        vertex_count = 0
+        pending: Dict[Future, str] = dict()
+
+        def collect(futures: Iterable[Future]):
+            for future in futures:
+                filepath = pending.pop(future)
+                try:
+                    if future.result():
+                        exported.append(filepath)
+                    else:
+                        skipped.append(filepath)
+                except OSError as e:
+                    errors.append(f'{filepath}: {e}')
+                except Exception as e:
+                    # Any other failure of a write (e.g., of a process pool that formats its sections) only fails that
+                    # collection.
+                    errors.append(f'{filepath}: {type(e).__name__}: {e}')
+
+        context.window_manager.progress_begin(0, len(exporters))
+
+        # Each ASE is built on the main thread, since Blender's data can't be accessed from other threads, and then
+        # written on the thread pool while the next one is being built.
         try:
-            write_ase(self.filepath, ase)
-        except PermissionError as e:
-            self.report({'ERROR'}, 'ASCII Scene Export: ' + str(e))
-            return {'CANCELLED'}
+            with _get_export_stats(context) as stats, \
+                    ThreadPoolExecutor(max_workers=min(self.max_pending_writes, os.cpu_count() or 1)) as executor:
+                for exporter_index, (collection, props) in enumerate(exporters):
+                    filepath = bpy.path.abspath(props.filepath)
+                    if not filepath:
+                        errors.append(f'{collection.name}: No file path set')
+                        continue
+                    try:
+                        # The progress of the batch is shown instead of that of each build.
+                        ase = _build_collection_ase(context, collection, props, scan, cache, stats,
+                                                    should_show_progress=False)
+                    except ASEBuildError as e:
+                        errors.append(f'{collection.name}: {e}')
+                        continue
+                    except Exception as e:
+                        # Any other failure (e.g., of an object that was removed, or of the evaluation of a mesh) only
+                        # fails this collection.
+                        errors.append(f'{collection.name}: {type(e).__name__}: {e}')
+                        continue
+
+                    warnings.extend(f'{collection.name}: {warning}' for warning in ase.warnings)
+                    face_count += sum(len(x.face_indices) for x in ase.geometry_objects)
+                    vertex_count += sum(len(x.vertices) for x in ase.geometry_objects)
+
+                    if len(pending) >= self.max_pending_writes:
+                        done, _ = wait(pending.keys(), return_when=FIRST_COMPLETED)
+                        collect(done)
+
+                    pending[executor.submit(_write_ase, filepath, ase, props.should_skip_unchanged, 0,
+                                            props.should_save_intermediate, stats)] = filepath
+                    del ase
+
+                    context.window_manager.progress_update(exporter_index + 1)
+
+                collect(list(pending.keys()))
+        finally:
+            context.window_manager.progress_end()
+
+        duration = time.perf_counter() - start_time
+        stats_summary = _finish_export_stats(context, stats)
+
+        for warning in warnings:
+            print(f'ASCII Scene Export: {warning}')
+        for error in errors:
+            print(f'ASCII Scene Export: {error}')
+
+        summary = (f'Exported {len(exported)} of {len(exporters)} collections in {duration:.2f}s '
+                   f'({face_count} faces, {vertex_count} vertices)')
+        if skipped:
+            summary += f', {len(skipped)} unchanged'
+        if warnings:
+            summary += f', {len(warnings)} warnings'
+        if errors:
+            summary += f', {len(errors)} failed'
+        summary += stats_summary
+        if warnings or errors:
+            self.report({'WARNING'}, f'{summary} (see the console for details)')
+        else:
+            self.report({'INFO'}, summary)
 
         return {'FINISHED'}
 
@@ -631,6 +933,36 @@ class ASE_PT_export_scene_settings(Panel):
             flow = transform_panel.grid_flow()
             _draw_transform_controls(flow, transform_source)
 
+        performance_header, performance_panel = layout.panel('Performance', default_closed=True)
+        performance_header.label(text='Performance')
+
+        if performance_panel:
+            scene_settings = getattr(context.scene, 'ase_settings')
+            performance_panel.use_property_split = True
+            performance_panel.use_property_decorate = False
+            performance_panel.prop(scene_settings, 'use_extraction_cache')
+            row = performance_panel.row()
+            row.enabled = scene_settings.use_extraction_cache
+            row.prop(scene_settings, 'extraction_cache_size', text='Cache Size (MB)')
+            performance_panel.prop(scene_settings, 'use_parallel_writer')
+            row = performance_panel.row()
+            row.enabled = scene_settings.use_parallel_writer
+            row.prop(scene_settings, 'writer_worker_count')
+            performance_panel.prop(scene_settings, 'use_modal_export')
+
+        statistics_header, statistics_panel = layout.panel('Statistics', default_closed=True)
+        statistics_header.label(text='Statistics')
+
+        if statistics_panel:
+            scene_settings = getattr(context.scene, 'ase_settings')
+            statistics_panel.use_property_split = True
+            statistics_panel.use_property_decorate = False
+            statistics_panel.prop(scene_settings, 'use_export_stats')
+            column = statistics_panel.column()
+            column.enabled = scene_settings.use_export_stats
+            column.prop(scene_settings, 'should_trace_memory')
+            column.prop(scene_settings, 'export_trace_path')
+
 
 
 class ASE_FH_export(FileHandler):
@@ -645,6 +977,7 @@ classes = (
     ASE_UL_material_names,
     ASE_OT_export,
     ASE_OT_export_collection,
+    ASE_OT_export_all_collections,
 
     ASE_OT_export_scene_material_mapping_add,
     ASE_OT_export_scene_material_mapping_remove,
@@ -0,0 +1,146 @@
+'''
+Bulk extraction of mesh data into NumPy arrays.
+
+All data is pulled out of Blender with `foreach_get` into preallocated buffers and is kept in the mesh's local space.
+The builder is then responsible for transforming and offsetting the arrays for each exported object.
+'''
+
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import numpy as np
+from bpy.types import Depsgraph, Mesh, Object
+
+from .ase import POSITION_DTYPE, INDEX_DTYPE, ATTRIBUTE_DTYPE
+from .smoothing import assign_smoothing_groups
+from .stats import ExportStats, NULL_STATS
+
+
+class MeshExtraction:
+    '''
+    Local-space geometry extracted from a mesh.
+    '''
+    def __init__(self):
+        self.loop_count: int = 0
+        # (V, 3) vertex positions.
+        self.positions: np.ndarray = np.zeros((0, 3), dtype=POSITION_DTYPE)
+        # (T, 3) vertex indices of each loop triangle.
+        self.triangle_vertices: np.ndarray = np.zeros((0, 3), dtype=INDEX_DTYPE)
+        # (T, 3) loop indices of each loop triangle.
+        self.triangle_loops: np.ndarray = np.zeros((0, 3), dtype=INDEX_DTYPE)
+        # (T,) material slot index of each loop triangle.
+        self.triangle_material_indices: np.ndarray = np.zeros(0, dtype=INDEX_DTYPE)
+        # (T,) smoothing group of each loop triangle, in the range [0, SMOOTHING_GROUP_MAX) (see `smoothing`).
+        self.triangle_smoothing_groups: np.ndarray = np.zeros(0, dtype=INDEX_DTYPE)
+        # The number of pairs of smooth regions that share an edge, or only vertices, but not a smoothing group.
+        self.smoothing_edge_conflict_count = 0
+        self.smoothing_vertex_conflict_count = 0
+        # (T, 3) normal of each loop triangle.
+        self.triangle_normals: Optional[np.ndarray] = None
+        # (T, 3, 3) split normals of each corner of each loop triangle.
+        self.triangle_split_normals: Optional[np.ndarray] = None
+        # (L, 2) texture coordinates for each UV layer.
+        self.uv_layers: List[np.ndarray] = []
+        # (L, 3) corner colors.
+        self.colors: Optional[np.ndarray] = None
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.positions)
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.triangle_vertices)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.positions, self.triangle_vertices, self.triangle_loops, self.triangle_material_indices,
+                  self.triangle_smoothing_groups, self.triangle_normals, self.triangle_split_normals, self.colors]
+        arrays += self.uv_layers
+        return sum(x.nbytes for x in arrays if x is not None)
+
+
+def _foreach_get(collection, attribute: str, count: int, components: int, dtype) -> np.ndarray:
+    buffer = np.empty(count * components, dtype=dtype)
+    if count > 0:
+        collection.foreach_get(attribute, buffer)
+    return buffer if components == 1 else buffer.reshape(count, components)
+
+
+@contextmanager
+def object_mesh(obj: Object, depsgraph: Optional[Depsgraph] = None) -> Iterator[Mesh]:
+    '''
+    Provides the mesh of an object for the duration of the context.
+    @param obj: The object.
+    @param depsgraph: If given, the evaluated mesh (i.e., with modifiers applied) is provided. It is held in a temporary
+    datablock that is freed when the context exits, even if an exception is raised. Otherwise, the object's own mesh
+    is provided.
+    '''
+    if depsgraph is None:
+        yield obj.data
+        return
+    evaluated_object = obj.evaluated_get(depsgraph)
+    mesh_data = evaluated_object.to_mesh(preserve_all_data_layers=True, depsgraph=depsgraph)
+    try:
+        yield mesh_data
+    finally:
+        evaluated_object.to_mesh_clear()
+
+
+def extract_mesh(mesh_data: Mesh, should_extract_attributes: bool = True,
+                 color_attribute_name: Optional[str] = None, stats: ExportStats = NULL_STATS) -> MeshExtraction:
+    '''
+    Extracts the geometry of a mesh into arrays.
+    @param mesh_data: The mesh to extract. Its loop triangles are (re)calculated.
+    @param should_extract_attributes: Whether to extract normals and UV layers. Collision meshes don't need these.
+    @param color_attribute_name: The name of the CORNER domain color attribute to extract, if any.
+    @param stats: The statistics to record the stages of the extraction in.
+    @return: The extracted mesh data.
+    '''
+    extraction = MeshExtraction()
+
+    with stats.stage('triangulate'):
+        mesh_data.calc_loop_triangles()
+
+    vertex_count = len(mesh_data.vertices)
+    loop_count = len(mesh_data.loops)
+    triangle_count = len(mesh_data.loop_triangles)
+    loop_triangles = mesh_data.loop_triangles
+
+    with stats.stage('read_geometry'):
+        extraction.loop_count = loop_count
+        extraction.positions = _foreach_get(mesh_data.vertices, 'co', vertex_count, 3, POSITION_DTYPE)
+        extraction.triangle_vertices = _foreach_get(loop_triangles, 'vertices', triangle_count, 3, INDEX_DTYPE)
+        extraction.triangle_loops = _foreach_get(loop_triangles, 'loops', triangle_count, 3, INDEX_DTYPE)
+        extraction.triangle_material_indices = _foreach_get(loop_triangles, 'material_index', triangle_count, 1, INDEX_DTYPE)
+        triangle_polygon_indices = _foreach_get(loop_triangles, 'polygon_index', triangle_count, 1, INDEX_DTYPE)
+
+    with stats.stage('read_attributes'):
+        if should_extract_attributes:
+            extraction.triangle_normals = _foreach_get(loop_triangles, 'normal', triangle_count, 3, ATTRIBUTE_DTYPE)
+            extraction.triangle_split_normals = _foreach_get(loop_triangles, 'split_normals', triangle_count, 9, ATTRIBUTE_DTYPE).reshape(-1, 3, 3)
+            extraction.uv_layers = [_foreach_get(uv_layer.data, 'uv', loop_count, 2, ATTRIBUTE_DTYPE) for uv_layer in mesh_data.uv_layers]
+
+        if color_attribute_name is not None:
+            color_attribute = mesh_data.color_attributes.get(color_attribute_name, None)
+            if color_attribute is not None:
+                extraction.colors = np.ascontiguousarray(_foreach_get(color_attribute.data, 'color', loop_count, 4, ATTRIBUTE_DTYPE)[:, :3])
+
+    # Calculate smoothing groups. These honor the split normals, when they have been read, as well as sharp edges and
+    # flat faces.
+    with stats.stage('smoothing_groups'):
+        polygon_count = len(mesh_data.polygons)
+        edge_count = len(mesh_data.edges)
+        polygon_smooth = _foreach_get(mesh_data.polygons, 'use_smooth', polygon_count, 1, bool)
+        edge_sharp = _foreach_get(mesh_data.edges, 'use_edge_sharp', edge_count, 1, bool)
+        edge_vertices = _foreach_get(mesh_data.edges, 'vertices', edge_count, 2, INDEX_DTYPE)
+        smoothing_groups = assign_smoothing_groups(extraction.triangle_vertices, vertex_count,
+                                                   triangle_polygons=triangle_polygon_indices,
+                                                   polygon_smooth=polygon_smooth,
+                                                   sharp_edges=edge_vertices[edge_sharp],
+                                                   triangle_split_normals=extraction.triangle_split_normals)
+        extraction.triangle_smoothing_groups = smoothing_groups.triangle_groups
+        extraction.smoothing_edge_conflict_count = smoothing_groups.edge_conflict_count
+        extraction.smoothing_vertex_conflict_count = smoothing_groups.vertex_conflict_count
+
+    return extraction
@@ -0,0 +1,170 @@
+'''
+A binary intermediate format for built ASE data.
+
+The output of `build_ase` can be saved to a NumPy .npz archive and loaded again without Blender, so that the expensive
+extraction in Blender and the text generation can happen separately (e.g., on different machines of a build farm, or
+when only the writer settings change between runs). The archive holds the arrays of each geometry object as they are,
+plus a small JSON header with the materials, names and layout. Nothing is pickled.
+
+To write an ASE file from an intermediate file:
+
+    python -m io_scene_ase.intermediate model.npz model.ase
+'''
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict
+
+import numpy as np
+
+from .ase import ASE, ASEGeometryObject, ASEUVLayer
+
+
+# Bump this whenever the layout of the archive changes.
+INTERMEDIATE_VERSION = 1
+
+INTERMEDIATE_SUFFIX = '.npz'
+
+# The array attributes of a geometry object. Those that can be None are omitted from the archive when they are.
+GEOMETRY_OBJECT_ARRAYS = (
+    'vertices',
+    'face_indices',
+    'face_smoothing',
+    'face_material_indices',
+    'texture_vertex_faces',
+    'normals',
+    'vertex_normals',
+    'vertex_colors',
+    'color_vertex_faces',
+)
+
+UV_LAYER_ARRAYS = (
+    'texture_vertices',
+    'texture_vertex_faces',
+)
+
+_HEADER_KEY = 'header'
+
+
+class IntermediateFormatError(Exception):
+    pass
+
+
+def _add_arrays(arrays: Dict[str, np.ndarray], prefix: str, obj: Any, names) -> list[str]:
+    '''
+    Adds the non-None array attributes of `obj` to `arrays`.
+    @return: The names of the attributes that were added.
+    '''
+    added_names = []
+    for name in names:
+        value = getattr(obj, name)
+        if value is not None:
+            arrays[f'{prefix}{name}'] = np.ascontiguousarray(value)
+            added_names.append(name)
+    return added_names
+
+
+def save_ase(file: str | Path | BinaryIO, ase: ASE, compress: bool = False):
+    '''
+    Saves built ASE data to an .npz archive.
+    @param file: The path or binary file to write to.
+    @param compress: Whether to compress the arrays. This makes the archive smaller but slower to save and load.
+    '''
+    arrays: Dict[str, np.ndarray] = dict()
+    geometry_objects = []
+    for geometry_object_index, geometry_object in enumerate(ase.geometry_objects):
+        prefix = f'geometry_objects/{geometry_object_index}/'
+        uv_layers = []
+        for uv_layer_index, uv_layer in enumerate(geometry_object.uv_layers):
+            uv_layers.append({
+                'arrays': _add_arrays(arrays, f'{prefix}uv_layers/{uv_layer_index}/', uv_layer, UV_LAYER_ARRAYS),
+            })
+        geometry_objects.append({
+            'name': geometry_object.name,
+            'vertex_offset': geometry_object.vertex_offset,
+            'texture_vertex_offset': geometry_object.texture_vertex_offset,
+            'arrays': _add_arrays(arrays, prefix, geometry_object, GEOMETRY_OBJECT_ARRAYS),
+            'uv_layers': uv_layers,
+        })
+    header = {
+        'version': INTERMEDIATE_VERSION,
+        'materials': ase.materials,
+        'warnings': ase.warnings,
+        'geometry_objects': geometry_objects,
+    }
+    arrays[_HEADER_KEY] = np.frombuffer(json.dumps(header).encode('utf-8'), dtype=np.uint8)
+    if compress:
+        np.savez_compressed(file, **arrays)
+    else:
+        np.savez(file, **arrays)
+
+
+def load_ase(file: str | Path | BinaryIO) -> ASE:
+    '''
+    Loads built ASE data from an .npz archive written by `save_ase`.
+    '''
+    with np.load(file, allow_pickle=False) as archive:
+        if _HEADER_KEY not in archive:
+            raise IntermediateFormatError('Not an ASE intermediate file')
+        header = json.loads(archive[_HEADER_KEY].tobytes().decode('utf-8'))
+        if header.get('version') != INTERMEDIATE_VERSION:
+            raise IntermediateFormatError(f'Unsupported ASE intermediate version {header.get("version")} '
+                                          f'(expected {INTERMEDIATE_VERSION})')
+        ase = ASE()
+        ase.materials = header['materials']
+        ase.warnings = header['warnings']
+        for geometry_object_index, geometry_object_header in enumerate(header['geometry_objects']):
+            prefix = f'geometry_objects/{geometry_object_index}/'
+            geometry_object = ASEGeometryObject()
+            geometry_object.name = geometry_object_header['name']
+            geometry_object.vertex_offset = geometry_object_header['vertex_offset']
+            geometry_object.texture_vertex_offset = geometry_object_header['texture_vertex_offset']
+            for name in geometry_object_header['arrays']:
+                setattr(geometry_object, name, archive[f'{prefix}{name}'])
+            for uv_layer_index, uv_layer_header in enumerate(geometry_object_header['uv_layers']):
+                uv_layer = ASEUVLayer()
+                for name in uv_layer_header['arrays']:
+                    setattr(uv_layer, name, archive[f'{prefix}uv_layers/{uv_layer_index}/{name}'])
+                geometry_object.uv_layers.append(uv_layer)
+            ase.geometry_objects.append(geometry_object)
+    return ase
+
+
+def main():
+    from .manifest import write_ase_if_changed
+    from .writer import write_ase
+
+    parser = argparse.ArgumentParser(description='Writes an ASE file from an ASE intermediate (.npz) file.')
+    parser.add_argument('input', help='The intermediate file to read')
+    parser.add_argument('output', help='The ASE file to write')
+    parser.add_argument('--workers', type=int, default=0, help='Format large sections in this many worker processes')
+    parser.add_argument('--skip-unchanged', action='store_true', help='Don\'t rewrite the output if it would not change')
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    try:
+        ase = load_ase(args.input)
+    except (OSError, IntermediateFormatError) as e:
+        parser.exit(1, f'{parser.prog}: error: {e}\n')
+    load_time = time.perf_counter()
+
+    if args.skip_unchanged:
+        is_written = write_ase_if_changed(args.output, ase, worker_count=args.workers)
+    else:
+        write_ase(args.output, ase, worker_count=args.workers)
+        is_written = True
+    write_time = time.perf_counter()
+
+    if is_written:
+        megabytes = os.path.getsize(args.output) / (1024 * 1024)
+        print(f'Wrote {args.output} ({megabytes:.1f} MB) in {write_time - start_time:.3f}s '
+              f'(load {load_time - start_time:.3f}s, write {write_time - load_time:.3f}s)')
+    else:
+        print(f'{args.output} is unchanged')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+'''
+Content hashing of built ASE data, used to skip rewriting output files that would not change.
+
+A small JSON manifest is kept next to each output file (`<file>.hash`), recording the hash of the ASE data that
+produced it along with the size and modification time of the file as written. If the next export hashes to the same
+value and the file on disk has not been touched since, both the serialization and the write are skipped, leaving the
+file's timestamp alone.
+'''
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .ase import ASE
+from .sinks import DEFAULT_ENCODING, DEFAULT_NEWLINE
+from .stats import ExportStats, NULL_STATS
+from .writer import write_ase
+
+
+# Bump this whenever the writer's output changes for the same input data.
+HASH_VERSION = 1
+
+MANIFEST_SUFFIX = '.hash'
+
+
+def _update_hash(hasher, value: Any):
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        hasher.update(f'ndarray:{array.dtype.str}:{array.shape}:'.encode())
+        hasher.update(array.data)
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f'list:{len(value)}:'.encode())
+        for item in value:
+            _update_hash(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(f'dict:{len(value)}:'.encode())
+        for key in sorted(value.keys()):
+            hasher.update(f'{key}='.encode())
+            _update_hash(hasher, value[key])
+    elif value is None or isinstance(value, (str, int, float, bool)):
+        hasher.update(f'{type(value).__name__}:{value!r};'.encode())
+    else:
+        # Model objects, such as geometry objects and UV layers.
+        _update_hash(hasher, vars(value))
+
+
+def hash_ase(ase: ASE) -> str:
+    '''
+    Calculates a deterministic hash of the data that determines the written ASE file.
+    '''
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f'io_scene_ase:{HASH_VERSION}:{DEFAULT_ENCODING}:{DEFAULT_NEWLINE!r};'.encode())
+    _update_hash(hasher, ase.materials)
+    _update_hash(hasher, ase.geometry_objects)
+    return hasher.hexdigest()
+
+
+def get_manifest_path(filepath: str | Path) -> str:
+    return os.fspath(filepath) + MANIFEST_SUFFIX
+
+
+def is_output_unchanged(filepath: str | Path, content_hash: str) -> bool:
+    '''
+    Checks whether the file at `filepath` was written from data with the given hash and has not been modified since.
+    '''
+    try:
+        with open(get_manifest_path(filepath), 'r') as fp:
+            manifest = json.load(fp)
+        stat = os.stat(filepath)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get('hash') == content_hash and
+            manifest.get('size') == stat.st_size and
+            manifest.get('mtime_ns') == stat.st_mtime_ns)
+
+
+def write_manifest(filepath: str | Path, content_hash: str):
+    stat = os.stat(filepath)
+    manifest = {
+        'hash': content_hash,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+    with open(get_manifest_path(filepath), 'w') as fp:
+        json.dump(manifest, fp, indent=2)
+
+
+def write_ase_if_changed(filepath: str | Path, ase: ASE, worker_count: int = 0,
+                         stats: ExportStats = NULL_STATS) -> bool:
+    '''
+    Writes the ASE to `filepath` unless the file already holds the output for identical data.
+    @return: True if the file was written, False if it was skipped.
+    '''
+    with stats.stage('hash'):
+        content_hash = hash_ase(ase)
+    if is_output_unchanged(filepath, content_hash):
+        return False
+    write_ase(filepath, ase, worker_count=worker_count, stats=stats)
+    write_manifest(filepath, content_hash)
+    return True
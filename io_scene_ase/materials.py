@@ -0,0 +1,81 @@
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from bpy.types import Material
+
+
+def get_material_name(material: Optional[Material]) -> str:
+    return material.name if material is not None else 'None'
+
+
+class MaterialTable:
+    '''
+    The ordered, unique materials of an export.
+    Materials are interned on insertion so that looking up the index of a material, or of a material name, is a
+    dictionary lookup rather than a search of the list.
+    '''
+    def __init__(self, materials: Iterable[Optional[Material]] = ()):
+        self.materials: List[Optional[Material]] = []
+        self._indices: Dict[Optional[Material], int] = dict()
+        # The index of the first material with each name.
+        self._name_indices: Dict[str, int] = dict()
+        self.update(materials)
+
+    def add(self, material: Optional[Material]) -> int:
+        '''
+        Adds the material if it is not already in the table.
+        @return: The index of the material.
+        '''
+        index = self._indices.get(material, None)
+        if index is None:
+            index = len(self.materials)
+            self.materials.append(material)
+            self._indices[material] = index
+            self._name_indices.setdefault(get_material_name(material), index)
+        return index
+
+    def update(self, materials: Iterable[Optional[Material]]):
+        for material in materials:
+            self.add(material)
+
+    def index(self, material: Optional[Material]) -> int:
+        return self._indices[material]
+
+    def index_of_name(self, name: str) -> Optional[int]:
+        return self._name_indices.get(name, None)
+
+    def __len__(self) -> int:
+        return len(self.materials)
+
+    def __iter__(self) -> Iterator[Optional[Material]]:
+        return iter(self.materials)
+
+    def __contains__(self, material: Optional[Material]) -> bool:
+        return material in self._indices
+
+    def get_names(self, material_mapping: Optional[Mapping[str, str]] = None) -> List[str]:
+        '''
+        Gets the names of the materials, in order.
+        @param material_mapping: Replacement names for materials, keyed by material name.
+        '''
+        names = [get_material_name(material) for material in self.materials]
+        if material_mapping:
+            names = [material_mapping.get(name, name) for name in names]
+        return names
+
+    def sorted_by_names(self, material_names: Sequence[str]) -> 'MaterialTable':
+        '''
+        Sorts the materials by the order of their names in `material_names`.
+        Materials whose names do not appear in `material_names` come after the others, in their original order.
+        '''
+        name_order: Dict[str, int] = dict()
+        for name in material_names:
+            name_order.setdefault(name, len(name_order))
+        ordered_materials = []
+        unordered_materials = []
+        for material in self.materials:
+            if get_material_name(material) in name_order:
+                ordered_materials.append(material)
+            else:
+                unordered_materials.append(material)
+        ordered_materials.sort(key=lambda x: name_order[get_material_name(x)])
+        return MaterialTable(ordered_materials + unordered_materials)
@@ -0,0 +1,307 @@
+'''
+Non-blocking exports.
+
+A modal export builds the ASE a unit of work at a time from a timer (see `iter_build_ase`), so that Blender's interface
+stays responsive between units, and then writes it on a background thread, since the writer doesn't touch Blender's
+data. The file is written to a temporary file next to the output, which replaces the output only once it is complete,
+so cancelling the export (or a failure) never leaves a partially written file behind.
+
+While an export is building, it holds on to the objects it exports and the depsgraph it was started with, so it is
+abandoned if the data it depends on changes or is replaced: when one of its objects, their data or the collections that
+hold them is updated, or when a file is loaded or the undo history is stepped through.
+'''
+
+import os
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Generator, Iterable, Optional, Set
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Depsgraph
+
+from .ase import ASE
+from .dfs import DfsObject
+from .intermediate import save_ase, INTERMEDIATE_SUFFIX
+from .manifest import hash_ase, is_output_unchanged, write_manifest
+from .sinks import FileSink
+from .stats import ExportStats, NULL_STATS
+from .writer import estimate_ase_size, write_ase
+
+
+# The time, in seconds, that a modal export may spend building in a single timer event.
+MODAL_TIME_BUDGET = 0.05
+
+# The interval, in seconds, of the timer that drives a modal export.
+MODAL_TIMER_INTERVAL = 0.01
+
+# The events that only navigate the interface, which are let through while an export is building. Every other event is
+# blocked, since it could edit the data that is being exported.
+MODAL_NAVIGATION_EVENT_TYPES = {
+    'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'MIDDLEMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM',
+    'MOUSEROTATE', 'MOUSESMARTZOOM', 'NDOF_MOTION', 'WINDOW_DEACTIVATE',
+}
+
+
+def is_navigation_event(event_type: str) -> bool:
+    # Timers of other operators (and of Blender itself) are let through as well.
+    return event_type in MODAL_NAVIGATION_EVENT_TYPES or event_type.startswith('TIMER')
+
+
+def get_dependency_uids(dfs_objects: Iterable[DfsObject]) -> Set[int]:
+    '''
+    Gets the session UIDs of the data-blocks that a build of the given objects depends on: the objects, the instancers
+    they come from, their data, and the collections that hold them (which are updated when an object is removed).
+    '''
+    uids = set()
+    for dfs_object in dfs_objects:
+        for obj in (dfs_object.obj, *dfs_object.instance_objects):
+            uids.add(obj.session_uid)
+            if obj.data is not None:
+                uids.add(obj.data.session_uid)
+            uids.update(collection.session_uid for collection in obj.users_collection)
+    return uids
+
+
+class ExportCancelledError(Exception):
+    pass
+
+
+class CancellableFileSink(FileSink):
+    '''
+    A file sink that counts the bytes written to it and that stops the writer, by raising `ExportCancelledError`, once
+    its cancel event is set.
+    '''
+    def __init__(self, path: str, cancel_event: threading.Event):
+        super().__init__(path)
+        self.cancel_event = cancel_event
+        self.bytes_written = 0
+
+    def write_bytes(self, data: bytes):
+        if self.cancel_event.is_set():
+            raise ExportCancelledError()
+        super().write_bytes(data)
+        self.bytes_written += len(data)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    return f'{minutes}:{seconds:02d}'
+
+
+class ModalExport:
+    '''
+    The state of a single modal export, advanced by calling `step` from a timer until it returns True.
+    Exceptions raised while building or writing are re-raised from `step`.
+    '''
+    def __init__(self, builder: Generator[float, None, ASE], filepath: str, should_skip_unchanged: bool = False,
+                 worker_count: int = 0, should_save_intermediate: bool = False, stats: ExportStats = NULL_STATS,
+                 time_budget: float = MODAL_TIME_BUDGET, dependency_uids: Optional[Set[int]] = None):
+        '''
+        @param builder: The generator returned by `iter_build_ase`.
+        @param dependency_uids: The session UIDs of the data-blocks that the build depends on (see
+            `get_dependency_uids`). The build is abandoned if any of them is updated.
+        '''
+        self.builder = builder
+        self.filepath = filepath
+        self.should_skip_unchanged = should_skip_unchanged
+        self.worker_count = worker_count
+        self.should_save_intermediate = should_save_intermediate
+        self.stats = stats
+        self.time_budget = time_budget
+        # One of 'BUILDING', 'WRITING', 'CANCELLING', 'FINISHED' or 'CANCELLED'.
+        self.state = 'BUILDING'
+        self.ase: Optional[ASE] = None
+        # Whether the output file was written. It isn't if the output is unchanged.
+        self.is_written = False
+        self._build_fraction = 0.0
+        self._phase_start_time = time.perf_counter()
+        self._cancel_event = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._future: Optional[Future] = None
+        self._sink: Optional[CancellableFileSink] = None
+        self._estimated_size = 0
+        self.dependency_uids: Set[int] = dependency_uids or set()
+        # Why the build was abandoned, if it was.
+        self.abandon_reason: Optional[str] = None
+        _modal_exports.add(self)
+
+    @property
+    def is_done(self) -> bool:
+        return self.state in ('FINISHED', 'CANCELLED')
+
+    def step(self) -> bool:
+        '''
+        Advances the export.
+        @return: True once the export has finished or has been cancelled.
+        '''
+        match self.state:
+            case 'BUILDING':
+                self._step_build()
+            case 'WRITING' | 'CANCELLING':
+                self._step_write()
+        return self.is_done
+
+    def _step_build(self):
+        deadline = time.perf_counter() + self.time_budget
+        try:
+            while time.perf_counter() < deadline:
+                self._build_fraction = next(self.builder)
+        except StopIteration as e:
+            self.ase = e.value
+            self._start_write()
+
+    def _start_write(self):
+        self.state = 'WRITING'
+        self._phase_start_time = time.perf_counter()
+        self._estimated_size = estimate_ase_size(self.ase)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = self._executor.submit(self._write, self.ase)
+
+    def _step_write(self):
+        if not self._future.done():
+            return
+        self._executor.shutdown(wait=False)
+        try:
+            self.is_written = self._future.result()
+        except ExportCancelledError:
+            self.state = 'CANCELLED'
+            return
+        self.state = 'CANCELLED' if self.state == 'CANCELLING' else 'FINISHED'
+
+    def _write(self, ase: ASE) -> bool:
+        '''
+        Writes the ASE to a temporary file that then replaces the output file. This runs on the background thread.
+        @return: True if the file was written, False if it was skipped because the output is unchanged.
+        '''
+        content_hash = None
+        if self.should_skip_unchanged:
+            with self.stats.stage('hash'):
+                content_hash = hash_ase(ase)
+            if is_output_unchanged(self.filepath, content_hash):
+                return False
+        if self.should_save_intermediate:
+            with self.stats.stage('save_intermediate'):
+                save_ase(os.path.splitext(self.filepath)[0] + INTERMEDIATE_SUFFIX, ase)
+        directory, filename = os.path.split(os.path.abspath(self.filepath))
+        file_descriptor, temporary_path = tempfile.mkstemp(suffix='.tmp', prefix=f'.{filename}.', dir=directory)
+        os.close(file_descriptor)
+        try:
+            with CancellableFileSink(temporary_path, self._cancel_event) as sink:
+                self._sink = sink
+                write_ase(sink, ase, worker_count=self.worker_count, stats=self.stats)
+            if self._cancel_event.is_set():
+                raise ExportCancelledError()
+            os.replace(temporary_path, self.filepath)
+        except BaseException:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+            raise
+        if content_hash is not None:
+            write_manifest(self.filepath, content_hash)
+        return True
+
+    def cancel(self):
+        '''
+        Cancels the export. A build is abandoned immediately; a write stops at its next chunk, so `step` must still be
+        called until it returns True. The output file is left untouched.
+        '''
+        match self.state:
+            case 'BUILDING':
+                self.builder.close()
+                self.state = 'CANCELLED'
+            case 'WRITING':
+                self._cancel_event.set()
+                self.state = 'CANCELLING'
+
+    def abandon(self, reason: str):
+        '''
+        Abandons a build whose data has changed or is about to be freed. Unlike `cancel`, this has no effect once the
+        build is done, since the write doesn't touch Blender's data.
+        '''
+        if self.state != 'BUILDING':
+            return
+        self.abandon_reason = reason
+        self.state = 'CANCELLED'
+        try:
+            self.builder.close()
+        except ReferenceError:
+            # The build's clean-up may touch data that has already been freed.
+            pass
+
+    @property
+    def fraction(self) -> float:
+        '''
+        The fraction of the current phase (building or writing) that is done.
+        '''
+        if self.state == 'BUILDING':
+            return self._build_fraction
+        if self._sink is None or self._estimated_size == 0:
+            return 0.0
+        # The size is only an estimate, so the fraction is capped until the write is actually done.
+        return min(self._sink.bytes_written / self._estimated_size, 0.99)
+
+    @property
+    def eta(self) -> Optional[float]:
+        '''
+        The estimated time, in seconds, until the current phase is done, extrapolated from its progress so far.
+        '''
+        fraction = self.fraction
+        if fraction <= 0.0:
+            return None
+        elapsed = time.perf_counter() - self._phase_start_time
+        return elapsed / fraction * (1.0 - fraction)
+
+    def get_status_text(self) -> str:
+        match self.state:
+            case 'BUILDING':
+                phase = 'Building'
+            case 'WRITING':
+                phase = 'Writing'
+            case 'CANCELLING':
+                return 'ASE export: cancelling...'
+            case _:
+                return ''
+        eta = self.eta
+        eta_text = f', {_format_duration(eta)} remaining' if eta is not None else ''
+        return f'ASE export: {phase} {self.fraction:.0%}{eta_text} (Esc to cancel)'
+
+
+# The modal exports that haven't been garbage collected, so that their builds can be abandoned from the handlers.
+_modal_exports: 'weakref.WeakSet[ModalExport]' = weakref.WeakSet()
+
+
+def _get_building_exports():
+    return [x for x in _modal_exports if x.state == 'BUILDING']
+
+
+@persistent
+def on_depsgraph_update_post(_scene, depsgraph: Depsgraph):
+    modal_exports = _get_building_exports()
+    if not modal_exports:
+        return
+    updated_uids = {update.id.original.session_uid for update in depsgraph.updates}
+    for modal_export in modal_exports:
+        if not modal_export.dependency_uids.isdisjoint(updated_uids):
+            modal_export.abandon('The exported objects were changed during the export')
+
+
+@persistent
+def on_data_replaced(*_args):
+    # Loading a file or stepping through the undo history frees the data-blocks that a build refers to. This runs
+    # before they are freed, so that the builds can still clean up.
+    for modal_export in _get_building_exports():
+        modal_export.abandon('The file was loaded or undone during the export')
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update_post),
+    (bpy.app.handlers.load_pre, on_data_replaced),
+    (bpy.app.handlers.undo_pre, on_data_replaced),
+    (bpy.app.handlers.redo_pre, on_data_replaced),
+)
@@ -0,0 +1,112 @@
+'''
+Detection of coincident vertices between the meshes that are merged into a single geometry object.
+
+When two meshes have vertices in the same place and the faces around them share a smoothing group, the engine's
+importer treats the faces as one smooth surface and calculates bad normals for them. The vertices are matched by
+hashing their positions, rounded to the precision they are written with, and the smoothing groups of the later mesh
+are then rotated to a range that does not clash with those of the earlier meshes at the shared positions.
+'''
+
+from typing import List, Sequence
+
+import numpy as np
+
+
+# Vertices are written with 4 decimal places, so positions that are equal at that precision are coincident.
+OVERLAP_DECIMALS = 4
+
+
+def _rotate_mask(mask: int, offset: int, group_count: int) -> int:
+    '''
+    Rotates a smoothing group bit mask, which is the same as adding `offset` to each group modulo `group_count`.
+    '''
+    return ((mask << offset) | (mask >> (group_count - offset))) & ((1 << group_count) - 1)
+
+
+def dodge_overlapping_smoothing_groups(vertices: np.ndarray, vertex_counts: Sequence[int], face_indices: np.ndarray,
+                                       face_counts: Sequence[int], face_smoothing: np.ndarray,
+                                       group_count: int) -> List[int]:
+    '''
+    Offsets the smoothing groups of meshes that have vertices coincident with those of earlier meshes, so that the
+    faces around a shared position never have a smoothing group in common across meshes.
+    @param vertices: (V, 3) vertex positions of all meshes, one after the other.
+    @param vertex_counts: The number of vertices of each mesh.
+    @param face_indices: (F, 3) vertex indices of all faces, into `vertices`.
+    @param face_counts: The number of faces of each mesh.
+    @param face_smoothing: (F,) smoothing group of each face, in the range [0, group_count). Modified in place.
+    @param group_count: The number of available smoothing groups.
+    @return: The indices of the meshes whose smoothing groups clash with an earlier mesh however they are offset.
+    '''
+    source_count = len(vertex_counts)
+    if source_count < 2 or len(vertices) == 0:
+        return []
+
+    vertex_sources = np.repeat(np.arange(source_count), vertex_counts)
+    keys = np.round(vertices.astype(np.float64) * 10 ** OVERLAP_DECIMALS).astype(np.int64)
+
+    # Sort the vertices by position and then by source, so that equal positions are contiguous.
+    order = np.lexsort((vertex_sources, keys[:, 2], keys[:, 1], keys[:, 0]))
+    sorted_keys = keys[order]
+    sorted_sources = vertex_sources[order]
+    is_new_position = np.ones(len(order), dtype=bool)
+    is_new_position[1:] = (sorted_keys[1:] != sorted_keys[:-1]).any(axis=1)
+    is_new_pair = is_new_position.copy()
+    is_new_pair[1:] |= sorted_sources[1:] != sorted_sources[:-1]
+    del sorted_keys
+
+    # Each unique (position, source) pair, and the number of sources at each position.
+    position_ids = np.cumsum(is_new_position) - 1
+    pair_positions = position_ids[is_new_pair]
+    pair_sources = sorted_sources[is_new_pair]
+    position_source_counts = np.bincount(pair_positions)
+    if position_source_counts.max() < 2:
+        return []
+
+    # Map each vertex to its pair, or -1 if no other mesh has a vertex at the same position.
+    is_shared_pair = position_source_counts[pair_positions] > 1
+    shared_pair_ids = np.full(len(pair_positions), -1, dtype=np.int64)
+    shared_pair_ids[is_shared_pair] = np.arange(np.count_nonzero(is_shared_pair))
+    vertex_pairs = np.empty(len(vertices), dtype=np.int64)
+    vertex_pairs[order] = shared_pair_ids[np.cumsum(is_new_pair) - 1]
+    pair_positions = pair_positions[is_shared_pair]
+    pair_sources = pair_sources[is_shared_pair]
+    del order, sorted_sources, position_ids, shared_pair_ids
+
+    # The smoothing groups of the faces around each shared position, per mesh.
+    corner_pairs = vertex_pairs[face_indices]
+    corner_groups = np.repeat(face_smoothing.astype(np.uint64)[:, np.newaxis], 3, axis=1)
+    is_shared_corner = corner_pairs >= 0
+    pair_masks = np.zeros(len(pair_sources), dtype=np.uint64)
+    np.bitwise_or.at(pair_masks, corner_pairs[is_shared_corner], np.uint64(1) << corner_groups[is_shared_corner])
+    del corner_pairs, corner_groups, is_shared_corner
+
+    # Visit the meshes in order, each one dodging the groups claimed by the earlier meshes at the shared positions.
+    # Most meshes only share a handful of positions, so this is done with plain integers rather than small arrays.
+    source_order = np.argsort(pair_sources, kind='stable')
+    sources, source_starts = np.unique(pair_sources[source_order], return_index=True)
+    source_stops = np.append(source_starts[1:], len(source_order))
+    sorted_pair_positions = pair_positions[source_order].tolist()
+    sorted_pair_masks = pair_masks[source_order].tolist()
+    position_masks = [0] * len(position_source_counts)
+    offsets = np.zeros(source_count, dtype=np.int64)
+    unresolved_sources: List[int] = []
+    for source, start, stop in zip(sources.tolist(), source_starts.tolist(), source_stops.tolist()):
+        positions = sorted_pair_positions[start:stop]
+        masks = sorted_pair_masks[start:stop]
+        claimed_masks = [position_masks[position] for position in positions]
+        for offset in range(group_count):
+            rotated_masks = [_rotate_mask(mask, offset, group_count) for mask in masks] if offset != 0 else masks
+            if not any(mask & claimed_mask for mask, claimed_mask in zip(rotated_masks, claimed_masks)):
+                offsets[source] = offset
+                break
+        else:
+            unresolved_sources.append(source)
+            rotated_masks = masks
+        for position, mask in zip(positions, rotated_masks):
+            position_masks[position] |= mask
+
+    if offsets.any():
+        face_sources = np.repeat(np.arange(source_count), face_counts)
+        face_smoothing[:] = (face_smoothing + offsets[face_sources]) % group_count
+
+    return unresolved_sources
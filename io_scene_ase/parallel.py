@@ -0,0 +1,131 @@
+'''
+Multi-process formatting of the bulk sections written by `ASEWriter`.
+
+Formatting the text of large sections is pure CPU work that does not touch Blender, so it can be spread over a pool of
+worker processes. The arrays of each section are copied once into shared memory, the workers render fixed-size row
+ranges with `format_row_range`, and the results are handed back to the writer in order.
+'''
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .writer import format_row_range, format_rows
+
+
+# Sections with fewer rows than this are formatted in the calling process.
+PARALLEL_MIN_ROWS = 65536
+
+# The number of rows rendered by a worker per task.
+PARALLEL_CHUNK_ROWS = 32768
+
+# The name, shape and data type of an array in shared memory.
+SharedArrayDescriptor = Tuple[str, Tuple[int, ...], str]
+
+
+def _format_shared_row_range(template: str, descriptors: Sequence[SharedArrayDescriptor], start: int, stop: int,
+                             with_index: bool) -> str:
+    shared_memories: List[SharedMemory] = []
+    columns: List[np.ndarray] = []
+    try:
+        for name, shape, dtype in descriptors:
+            shared_memory = SharedMemory(name=name)
+            shared_memories.append(shared_memory)
+            columns.append(np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf))
+        return format_row_range(template, columns, start, stop, with_index)
+    finally:
+        # The array views must be released before the shared memory can be closed.
+        columns.clear()
+        for shared_memory in shared_memories:
+            shared_memory.close()
+
+
+def _get_bootstrap_source() -> Optional[str]:
+    '''
+    Worker processes import this module by its full name. When the add-on is installed as an extension, its parent
+    packages (e.g., `bl_ext.user_default`) are created by Blender at runtime and cannot be imported by a plain Python
+    interpreter, so they are recreated as namespace modules when each worker starts.
+    '''
+    parent_names = __package__.split('.')[:-1]
+    if len(parent_names) == 0:
+        return None
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    packages = []
+    for i in reversed(range(len(parent_names))):
+        packages.append(('.'.join(parent_names[:i + 1]), path))
+        path = os.path.dirname(path)
+    return (
+        'import sys, types\n'
+        f'for name, path in {packages!r}:\n'
+        '    if name not in sys.modules:\n'
+        '        module = types.ModuleType(name)\n'
+        '        module.__path__ = [path]\n'
+        '        sys.modules[name] = module\n'
+    )
+
+
+class ParallelRowFormatter:
+    '''
+    Renders bulk sections for `ASEWriter` in a pool of worker processes.
+    Call `release` once the arrays passed to `format_rows` are no longer needed, and `close` when done.
+    '''
+    def __init__(self, worker_count: int, min_rows: int = PARALLEL_MIN_ROWS, chunk_rows: int = PARALLEL_CHUNK_ROWS):
+        self.min_rows = min_rows
+        self.chunk_rows = chunk_rows
+        self.is_broken = False
+        bootstrap_source = _get_bootstrap_source()
+        self.executor = ProcessPoolExecutor(
+            max_workers=worker_count,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=exec if bootstrap_source is not None else None,
+            initargs=(bootstrap_source, {}) if bootstrap_source is not None else (),
+        )
+        # Shared copies of the arrays, keyed by the identity of the original array.
+        self._shared: Dict[int, Tuple[np.ndarray, SharedMemory, SharedArrayDescriptor]] = dict()
+
+    def share(self, array: np.ndarray) -> SharedArrayDescriptor:
+        entry = self._shared.get(id(array), None)
+        if entry is None:
+            shared_memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)[...] = array
+            descriptor = (shared_memory.name, array.shape, array.dtype.str)
+            # Keep a reference to the original array so that its identity can't be reused while it is shared.
+            entry = (array, shared_memory, descriptor)
+            self._shared[id(array)] = entry
+        return entry[2]
+
+    def format_rows(self, template: str, columns: Sequence[np.ndarray], row_count: int,
+                    with_index: bool = True) -> Iterator[str]:
+        if self.is_broken or row_count < self.min_rows:
+            yield from format_rows(template, columns, row_count, with_index)
+            return
+        descriptors = [self.share(column) for column in columns]
+        starts = range(0, row_count, self.chunk_rows)
+        stops = [min(start + self.chunk_rows, row_count) for start in starts]
+        results = self.executor.map(_format_shared_row_range, repeat(template), repeat(descriptors), starts, stops,
+                                    repeat(with_index))
+        try:
+            first_chunk = next(results)
+        except BrokenProcessPool:
+            # The workers could not be started (e.g., the add-on can't be imported by the worker processes).
+            self.is_broken = True
+            yield from format_rows(template, columns, row_count, with_index)
+            return
+        yield first_chunk
+        yield from results
+
+    def release(self):
+        for _, shared_memory, _ in self._shared.values():
+            shared_memory.close()
+            shared_memory.unlink()
+        self._shared.clear()
+
+    def close(self):
+        self.release()
+        self.executor.shutdown()
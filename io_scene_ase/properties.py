@@ -112,7 +112,11 @@ object_eval_state_items = [
 class AseExportMixin(TransformMixin, MaterialMappingMixin, VertexColorMixin):
     object_eval_state: EnumProperty( items=object_eval_state_items, name='Data', default='EVALUATED')
     should_invert_normals: BoolProperty(name='Invert Normals', default=False, description='Invert the normals of the exported geometry. This should be used if the software you are exporting to uses a different winding order than Blender')
+    should_dodge_overlapping_smoothing_groups: BoolProperty(name='Dodge Overlapping Smoothing Groups', default=True, description='Offset the smoothing groups of meshes that have vertices coincident with those of other meshes, so that the engine does not smooth across them')
     scct_versus_mcdcx_flip: BoolProperty(name='SCCT MCDCX Flip', default=False, description='Flip X and Y axes for MCDCX collision meshes only (for Splinter Cell: Chaos Theory Versus compatibility)')
+    should_deduplicate_vertex_attributes: BoolProperty(name='Deduplicate Texture & Color Vertices', default=False, description='Write each unique texture coordinate and vertex color once and index them from the faces, instead of writing one per face corner. This makes files considerably smaller')
+    should_skip_unchanged: BoolProperty(name='Skip Unchanged', default=False, description='Don\'t rewrite the output file if its contents would not change. A small manifest file (.hash) is kept next to the output file to track this')
+    should_save_intermediate: BoolProperty(name='Save Intermediate', default=False, description='Also save the built geometry next to the output file (.npz), so that it can be written again without Blender using `python -m io_scene_ase.intermediate`')
 
 
 class ASE_PG_export(PropertyGroup, AseExportMixin):
@@ -120,7 +124,14 @@ class ASE_PG_export(PropertyGroup, AseExportMixin):
 
 
 class ASE_PG_scene_settings(PropertyGroup, TransformMixin):
-    pass
+    use_extraction_cache: BoolProperty(name='Cache Extracted Meshes', default=True, description='Keep the extracted geometry of exported meshes in memory so that subsequent exports only need to re-extract meshes that have changed')
+    extraction_cache_size: IntProperty(name='Cache Size', default=1024, min=0, soft_max=16384, description='The maximum amount of memory, in megabytes, used by the extracted mesh cache')
+    use_parallel_writer: BoolProperty(name='Parallel Writing', default=False, description='Format the text of large meshes in a pool of worker processes')
+    writer_worker_count: IntProperty(name='Workers', default=0, min=0, soft_max=64, description='The number of worker processes used for parallel writing. Zero uses one worker per CPU core')
+    use_modal_export: BoolProperty(name='Export in Background', default=False, description='Build exports a little at a time and write them on a background thread, keeping the interface responsive. Progress is shown in the status bar, and pressing Esc cancels the export without touching the output file')
+    use_export_stats: BoolProperty(name='Collect Statistics', default=False, description='Time each stage of exports, printing a breakdown to the console and summarizing it in the report message')
+    should_trace_memory: BoolProperty(name='Trace Memory', default=False, description='Also record the peak memory allocated by each stage. This slows down exports considerably')
+    export_trace_path: StringProperty(name='Trace File', default='', subtype='FILE_PATH', description='If set, the stages of each export are saved to this file as a Chrome trace, which can be opened in chrome://tracing or Perfetto')
 
 
 classes = (
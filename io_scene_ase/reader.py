@@ -0,0 +1,348 @@
+'''
+A streaming reader for ASE files.
+
+The file is memory-mapped and read one command at a time, so only the parts of the file being looked at are paged in.
+The bulk lists of a mesh (vertices, faces, texture vertices, normals, etc.) are parsed in large chunks of rows with
+NumPy rather than one command at a time.
+
+The bulk lists are expected to be laid out the way `ASEWriter` writes them: one command per line, with a fixed number
+of tokens per row.
+'''
+
+import mmap
+import re
+import warnings
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .ase import ASE, ASEGeometryObject, ASEUVLayer, POSITION_DTYPE, INDEX_DTYPE, ATTRIBUTE_DTYPE, empty_indices
+
+
+# The approximate number of bytes of a bulk list parsed at once.
+LIST_CHUNK_BYTES = 4 * 1024 * 1024
+
+_VALUE_PATTERN = re.compile(rb'"[^"]*"|\S+')
+
+
+class ASEParseError(Exception):
+    pass
+
+
+class ASEListFormat:
+    '''
+    The layout of the rows of a bulk list.
+    @param row_command: The command that starts each row.
+    @param value_count: The number of numbers in each row, including indices.
+    @param columns: The positions of the numbers that hold the values of a row.
+    '''
+    def __init__(self, row_command: bytes, value_count: int, columns: Tuple[int, ...]):
+        self.row_command = row_command
+        self.value_count = value_count
+        self.columns = columns
+
+
+LIST_FORMATS: Dict[str, ASEListFormat] = {
+    # *MESH_VERTEX 0 0.0000 0.0000 0.0000
+    'MESH_VERTEX_LIST': ASEListFormat(b'*MESH_VERTEX ', 4, (1, 2, 3)),
+    # *MESH_FACE 0: A: 0 B: 1 C: 2 AB: 0 BC: 0 CA: 0 *MESH_SMOOTHING 0 *MESH_MTLID 0
+    'MESH_FACE_LIST': ASEListFormat(b'*MESH_FACE ', 9, (1, 2, 3, 7, 8)),
+    # *MESH_TVERT 0 0.0000 0.0000 0.0000
+    'MESH_TVERTLIST': ASEListFormat(b'*MESH_TVERT ', 4, (1, 2, 3)),
+    # *MESH_TFACE 0 0 1 2
+    'MESH_TFACELIST': ASEListFormat(b'*MESH_TFACE ', 4, (1, 2, 3)),
+    # *MESH_FACENORMAL 0 0.0000 0.0000 0.0000, followed by three of *MESH_VERTEXNORMAL 0 0.0000 0.0000 0.0000
+    'MESH_NORMALS': ASEListFormat(b'*MESH_FACENORMAL ', 16, (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15)),
+    # *MESH_VERTCOL 0 1.0000 1.0000 1.0000
+    'MESH_CVERTLIST': ASEListFormat(b'*MESH_VERTCOL ', 4, (1, 2, 3)),
+    # *MESH_CFACE 0 0 1 2
+    'MESH_CFACELIST': ASEListFormat(b'*MESH_CFACE ', 4, (1, 2, 3)),
+}
+
+# Deleting these characters from the rows of a bulk list leaves only the numbers. Numbers are written with `%d` and
+# `%.4f`, which never produce upper-case letters.
+_LIST_DELETE_CHARACTERS = b'*_:ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+class ASERecord:
+    '''
+    A single command of an ASE file, or the end of a block.
+    '''
+    __slots__ = ('name', 'data', 'is_block', 'start', 'end')
+
+    def __init__(self, name: Optional[str], data: bytes, is_block: bool, start: int, end: int):
+        # The name of the command without the leading asterisk, or None for the end of a block.
+        self.name = name
+        # The unparsed data following the name.
+        self.data = data
+        # Whether the command opens a block.
+        self.is_block = is_block
+        # The byte offsets of the start of the line and of the start of the next line.
+        self.start = start
+        self.end = end
+
+    @property
+    def is_end(self) -> bool:
+        return self.name is None
+
+    def get_values(self) -> List[str | int | float]:
+        '''
+        Parses the data of the command into values. Quoted strings, integers and floats are converted; any other
+        tokens (such as `A:` or `*MESH_MTLID`) are returned as strings.
+        '''
+        values = []
+        for token in _VALUE_PATTERN.findall(self.data):
+            if token.startswith(b'"'):
+                values.append(token[1:-1].decode('utf-8', errors='replace'))
+                continue
+            try:
+                values.append(int(token))
+            except ValueError:
+                try:
+                    values.append(float(token))
+                except ValueError:
+                    values.append(token.decode('utf-8', errors='replace'))
+        return values
+
+
+class ASEReader:
+    '''
+    Reads an ASE file through a memory map. Records are read in order from `position` with `read_record`.
+    '''
+    def __init__(self, path: str | Path):
+        self.path = path
+        self.fp = open(path, 'rb')
+        self.mm: Optional[mmap.mmap] = None
+        self.size = self.fp.seek(0, 2)
+        if self.size > 0:
+            self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.position = 0
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _find_line_end(self, position: int) -> int:
+        line_end = self.mm.find(b'\n', position)
+        return self.size if line_end == -1 else line_end
+
+    def read_record(self) -> Optional[ASERecord]:
+        '''
+        Reads the next record, skipping blank lines.
+        @return: The record, or None at the end of the file.
+        '''
+        while self.position < self.size:
+            start = self.position
+            line_end = self._find_line_end(start)
+            self.position = line_end + 1
+            line = self.mm[start:line_end].strip()
+            if not line:
+                continue
+            if line == b'}':
+                return ASERecord(None, b'', False, start, self.position)
+            if not line.startswith(b'*'):
+                raise ASEParseError(f'Expected a command at byte {start}, found {line[:32]!r}')
+            is_block = line.endswith(b'{')
+            if is_block:
+                line = line[:-1].rstrip()
+            name, _, data = line[1:].partition(b' ')
+            return ASERecord(name.decode('ascii', errors='replace'), data.strip(), is_block, start, self.position)
+        return None
+
+    def skip_block(self, record: ASERecord):
+        '''
+        Moves past the end of the block opened by `record`, which must be the last record read.
+        '''
+        depth = 1
+        while depth > 0:
+            child = self.read_record()
+            if child is None:
+                raise ASEParseError(f'Unterminated block \'{record.name}\' starting at byte {record.start}')
+            if child.is_end:
+                depth -= 1
+            elif child.is_block:
+                depth += 1
+
+    def iter_list_rows(self, record: ASERecord) -> Iterator[np.ndarray]:
+        '''
+        Parses the rows of a bulk list in chunks, moving past the end of the list.
+        The row commands are stripped from each chunk and the remaining numbers are parsed in one go.
+        @param record: The bulk list record, which must be the last record read.
+        @return: An iterator of (N, C) float64 arrays of the row values, where C is the number of value columns of
+            the list's format.
+        '''
+        list_format = LIST_FORMATS[record.name]
+        if not record.is_block:
+            return
+        # The rows never contain braces, so the list ends at the first closing brace.
+        list_end = self.mm.find(b'}', record.end)
+        if list_end == -1:
+            raise ASEParseError(f'Unterminated list \'{record.name}\' starting at byte {record.start}')
+        columns = list(list_format.columns)
+        position = record.end
+        while position < list_end:
+            chunk_end = list_end
+            if list_end - position > LIST_CHUNK_BYTES:
+                # End the chunk at the start of the line of the last row that begins within the chunk.
+                row_start = self.mm.rfind(list_format.row_command, position + 1, position + LIST_CHUNK_BYTES)
+                if row_start != -1:
+                    chunk_end = self.mm.rfind(b'\n', position, row_start) + 1 or row_start
+            chunk = self.mm[position:chunk_end]
+            row_count = chunk.count(list_format.row_command)
+            try:
+                with warnings.catch_warnings():
+                    # Treat text that can't be parsed as an error rather than a warning.
+                    warnings.simplefilter('error', DeprecationWarning)
+                    values = np.fromstring(chunk.translate(None, _LIST_DELETE_CHARACTERS), dtype=np.float64, sep=' ')
+            except (ValueError, DeprecationWarning) as e:
+                raise ASEParseError(f'Invalid value in \'{record.name}\' between bytes {position} and '
+                                    f'{chunk_end}: {e}') from None
+            if len(values) != row_count * list_format.value_count:
+                raise ASEParseError(f'Unexpected row format in \'{record.name}\' between bytes {position} and '
+                                    f'{chunk_end} (found {len(values)} values in {row_count} rows, expected '
+                                    f'{list_format.value_count} per row)')
+            if row_count > 0:
+                yield values.reshape(row_count, list_format.value_count)[:, columns]
+            position = chunk_end
+        self.position = self._find_line_end(list_end) + 1
+
+    def read_list(self, record: ASERecord) -> np.ndarray:
+        '''
+        Parses all the rows of a bulk list. See `iter_list_rows`.
+        '''
+        chunks = list(self.iter_list_rows(record))
+        if len(chunks) == 0:
+            return np.zeros((0, len(LIST_FORMATS[record.name].columns)), dtype=np.float64)
+        return np.concatenate(chunks)
+
+    def read_material_list(self, record: ASERecord) -> List[str]:
+        '''
+        Reads the material names of a MATERIAL_LIST block, moving past its end.
+        Sub-material names are returned if there are any, otherwise the names of the top-level materials.
+        '''
+        material_names: List[str] = []
+        sub_material_names: List[str] = []
+        stack = [record.name]
+        while stack:
+            child = self.read_record()
+            if child is None:
+                raise ASEParseError(f'Unterminated block \'{record.name}\' starting at byte {record.start}')
+            if child.is_end:
+                stack.pop()
+                continue
+            if child.name == 'MATERIAL_NAME':
+                values = child.get_values()
+                name = str(values[0]) if values else ''
+                if stack[-1] == 'SUBMATERIAL':
+                    sub_material_names.append(name)
+                elif stack[-1] == 'MATERIAL':
+                    material_names.append(name)
+            if child.is_block:
+                stack.append(child.name)
+        return sub_material_names if sub_material_names else material_names
+
+    def read(self) -> ASE:
+        '''
+        Reads the whole file into an `ASE`.
+        '''
+        ase = ASE()
+        self.position = 0
+        stack: List[str] = []
+        geometry_object: Optional[ASEGeometryObject] = None
+        uv_layer_faces: List[Optional[np.ndarray]] = []
+        color_vertex_faces: Optional[np.ndarray] = None
+
+        while (record := self.read_record()) is not None:
+            if record.is_end:
+                if not stack:
+                    raise ASEParseError(f'Unexpected end of block at byte {record.start}')
+                if stack.pop() == 'GEOMOBJECT' and geometry_object is not None:
+                    _assign_faces(geometry_object, uv_layer_faces, color_vertex_faces)
+                    geometry_object = None
+                continue
+
+            if record.name == 'MATERIAL_LIST' and record.is_block:
+                ase.materials = self.read_material_list(record)
+                continue
+
+            if record.name == 'GEOMOBJECT':
+                geometry_object = ASEGeometryObject()
+                uv_layer_faces = []
+                color_vertex_faces = None
+                ase.geometry_objects.append(geometry_object)
+            elif geometry_object is not None:
+                match record.name:
+                    case 'NODE_NAME':
+                        values = record.get_values()
+                        geometry_object.name = str(values[0]) if values else ''
+                    case 'MESH_VERTEX_LIST':
+                        geometry_object.vertices = self.read_list(record).astype(POSITION_DTYPE)
+                        continue
+                    case 'MESH_FACE_LIST':
+                        values = self.read_list(record)
+                        geometry_object.face_indices = values[:, 0:3].astype(INDEX_DTYPE)
+                        geometry_object.face_smoothing = values[:, 3].astype(INDEX_DTYPE)
+                        geometry_object.face_material_indices = values[:, 4].astype(INDEX_DTYPE)
+                        continue
+                    case 'MESH_TVERTLIST':
+                        uv_layer = ASEUVLayer()
+                        uv_layer.texture_vertices = self.read_list(record).astype(ATTRIBUTE_DTYPE)
+                        geometry_object.uv_layers.append(uv_layer)
+                        uv_layer_faces.append(None)
+                        continue
+                    case 'MESH_TFACELIST':
+                        if not uv_layer_faces:
+                            raise ASEParseError(f'Texture faces without texture vertices at byte {record.start}')
+                        uv_layer_faces[-1] = self.read_list(record).astype(INDEX_DTYPE)
+                        continue
+                    case 'MESH_NORMALS':
+                        values = self.read_list(record)
+                        geometry_object.normals = values[:, 0:3].astype(ATTRIBUTE_DTYPE)
+                        # Drop the vertex index of each vertex normal.
+                        vertex_normals = values[:, 3:].reshape(-1, 3, 4)[:, :, 1:]
+                        geometry_object.vertex_normals = vertex_normals.astype(ATTRIBUTE_DTYPE)
+                        continue
+                    case 'MESH_CVERTLIST':
+                        geometry_object.vertex_colors = self.read_list(record).astype(ATTRIBUTE_DTYPE)
+                        continue
+                    case 'MESH_CFACELIST':
+                        color_vertex_faces = self.read_list(record).astype(INDEX_DTYPE)
+                        continue
+
+            if record.is_block:
+                stack.append(record.name)
+
+        if stack:
+            raise ASEParseError(f'Unterminated block \'{stack[-1]}\' at the end of the file')
+        return ase
+
+
+def _assign_faces(geometry_object: ASEGeometryObject, uv_layer_faces: List[Optional[np.ndarray]],
+                  color_vertex_faces: Optional[np.ndarray]):
+    '''
+    Assigns the texture and color faces that were read to the geometry object, sharing `texture_vertex_faces` where
+    the faces are identical.
+    '''
+    shared_faces = next((x for x in uv_layer_faces if x is not None), color_vertex_faces)
+    geometry_object.texture_vertex_faces = shared_faces if shared_faces is not None else empty_indices()
+    for uv_layer, faces in zip(geometry_object.uv_layers, uv_layer_faces):
+        if faces is None:
+            faces = empty_indices()
+        if not np.array_equal(faces, geometry_object.texture_vertex_faces):
+            uv_layer.texture_vertex_faces = faces
+    if color_vertex_faces is not None and not np.array_equal(color_vertex_faces, geometry_object.texture_vertex_faces):
+        geometry_object.color_vertex_faces = color_vertex_faces
+
+
+def read_ase(path: str | Path) -> ASE:
+    with ASEReader(path) as reader:
+        return reader.read()
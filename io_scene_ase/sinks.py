@@ -0,0 +1,166 @@
+'''
+Output sinks for the ASE writer.
+
+The writer produces text; a sink is responsible for encoding it and delivering the bytes somewhere, be it a file on
+disk, an in-memory buffer, a pipe, or a memory-mapped file.
+'''
+
+import io
+import locale
+import mmap
+import os
+import sys
+from abc import ABCMeta, abstractmethod
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+
+# Match the encoding and line endings of a file opened in text mode, which is what the writer originally used.
+DEFAULT_ENCODING = locale.getpreferredencoding(False)
+DEFAULT_NEWLINE = os.linesep
+
+# The buffer size used by the file sink.
+FILE_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+class OutputSink(metaclass=ABCMeta):
+    def __init__(self, encoding: Optional[str] = None, newline: Optional[str] = None):
+        self.encoding = encoding if encoding is not None else DEFAULT_ENCODING
+        self.newline = newline if newline is not None else DEFAULT_NEWLINE
+        self.bytes_written = 0
+
+    def encode(self, text: str) -> bytes:
+        if self.newline != '\n':
+            text = text.replace('\n', self.newline)
+        return text.encode(self.encoding)
+
+    def write(self, text: str):
+        data = self.encode(text)
+        self.write_bytes(data)
+        self.bytes_written += len(data)
+
+    @abstractmethod
+    def write_bytes(self, data: bytes):
+        pass
+
+    def reserve(self, size: int):
+        '''
+        Called by the writer with an estimate of the total output size before writing anything.
+        '''
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class FileSink(OutputSink):
+    '''
+    Writes to a file on disk through a large buffer.
+    '''
+    def __init__(self, path: str | Path, buffer_size: int = FILE_BUFFER_SIZE, encoding: Optional[str] = None,
+                 newline: Optional[str] = None):
+        super().__init__(encoding, newline)
+        self.path = path
+        self.fp: BinaryIO = open(path, 'wb', buffering=buffer_size)
+
+    def write_bytes(self, data: bytes):
+        self.fp.write(data)
+
+    def flush(self):
+        self.fp.flush()
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
+
+
+class BytesSink(OutputSink):
+    '''
+    Collects the output in memory. The output remains available through `getvalue` after the sink is closed.
+    '''
+    def __init__(self, encoding: Optional[str] = None, newline: Optional[str] = None):
+        super().__init__(encoding, newline)
+        self.buffer = io.BytesIO()
+
+    def write_bytes(self, data: bytes):
+        self.buffer.write(data)
+
+    def getvalue(self) -> bytes:
+        return self.buffer.getvalue()
+
+
+class PipeSink(OutputSink):
+    '''
+    Writes to a binary stream such as standard output or the standard input of a subprocess.
+    @param stream: The stream to write to. Defaults to standard output.
+    @param close_stream: Whether to close the stream when the sink is closed.
+    '''
+    def __init__(self, stream: Optional[BinaryIO] = None, close_stream: bool = False, encoding: Optional[str] = None,
+                 newline: Optional[str] = None):
+        super().__init__(encoding, newline)
+        self.stream = stream if stream is not None else sys.stdout.buffer
+        self.close_stream = close_stream
+
+    def write_bytes(self, data: bytes):
+        self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.close_stream:
+            self.stream.close()
+
+
+class MmapSink(OutputSink):
+    '''
+    Writes into a memory-mapped file that is preallocated from the writer's size estimate.
+    The mapping grows if the estimate turns out to be too small, and the file is truncated to the written size when
+    the sink is closed.
+    '''
+    def __init__(self, path: str | Path, size: int = 0, encoding: Optional[str] = None, newline: Optional[str] = None):
+        super().__init__(encoding, newline)
+        self.path = path
+        self.fp: BinaryIO = open(path, 'w+b')
+        self.mm: Optional[mmap.mmap] = None
+        self.offset = 0
+        self.reserve(size)
+
+    def reserve(self, size: int):
+        size = max(size, mmap.PAGESIZE)
+        if self.mm is not None:
+            if size <= len(self.mm):
+                return
+            self.mm.close()
+        self.fp.truncate(size)
+        self.mm = mmap.mmap(self.fp.fileno(), size)
+
+    def write_bytes(self, data: bytes):
+        end = self.offset + len(data)
+        if end > len(self.mm):
+            self.reserve(max(end, len(self.mm) * 2))
+        self.mm[self.offset:end] = data
+        self.offset = end
+
+    def flush(self):
+        if self.mm is not None:
+            self.mm.flush()
+
+    def close(self):
+        if self.mm is None:
+            return
+        self.mm.flush()
+        self.mm.close()
+        self.mm = None
+        self.fp.truncate(self.offset)
+        self.fp.close()
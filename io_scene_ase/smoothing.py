@@ -0,0 +1,328 @@
+'''
+Assignment of smoothing groups.
+
+The engine's importer calculates the normal of a vertex from the faces around it that share its smoothing group, and
+only accepts 32 groups. The faces of a mesh are first joined into smooth regions across every edge that is shaded
+smoothly, that is, an edge between smooth faces that isn't marked sharp and along which the split normals agree. The
+regions are then colored with the 32 groups so that regions that meet never share a group: regions are colored
+greedily, many at a time, with the lowest group that none of their already colored neighbors use.
+
+Regions meet along sharp edges or at single vertices. When there are too few groups to separate every region, the
+regions that only share vertices are given up first, since that only softens the shading right at those vertices.
+Both kinds of failure are counted so they can be reported.
+
+This doesn't depend on Blender, so the arrays can come from any source.
+'''
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .ase import INDEX_DTYPE
+
+
+# The number of smoothing groups accepted by the importer.
+SMOOTHING_GROUP_MAX = 32
+
+# Split normals further apart than this (in any component) are treated as a sharp edge.
+SPLIT_NORMAL_TOLERANCE = 1e-4
+
+
+class SmoothingGroups:
+    '''
+    The smoothing groups assigned to the triangles of a mesh.
+    '''
+    def __init__(self):
+        # (T,) smoothing group of each triangle, in the range [0, group_count).
+        self.triangle_groups: np.ndarray = np.zeros(0, dtype=INDEX_DTYPE)
+        # The number of smooth regions the triangles form.
+        self.region_count = 0
+        # The number of pairs of regions that share an edge but were given the same group.
+        self.edge_conflict_count = 0
+        # The number of pairs of regions that only share vertices but were given the same group, plus the number of
+        # vertices shared by more regions than there are groups.
+        self.vertex_conflict_count = 0
+
+
+def _get_pair_keys(a: np.ndarray, b: np.ndarray, count: int) -> np.ndarray:
+    '''
+    Gets a key for each unordered pair of indices in the range [0, count).
+    '''
+    return np.minimum(a, b).astype(np.int64) * count + np.maximum(a, b)
+
+
+def _get_unique_sorted(values: np.ndarray) -> np.ndarray:
+    '''
+    Gets the unique values in ascending order. This is faster than `np.unique` for large arrays of integers.
+    '''
+    values = np.sort(values)
+    is_unique = np.ones(len(values), dtype=bool)
+    is_unique[1:] = values[1:] != values[:-1]
+    return values[is_unique]
+
+
+def _get_unique_pairs(a: np.ndarray, b: np.ndarray, count: int) -> np.ndarray:
+    '''
+    Gets the unique unordered pairs of distinct indices, as a (P, 2) array with the lower index first.
+    '''
+    is_distinct = a != b
+    keys = _get_unique_sorted(_get_pair_keys(a[is_distinct], b[is_distinct], count))
+    return np.stack((keys // count, keys % count), axis=1)
+
+
+def _find_adjacent_triangles(triangle_vertices: np.ndarray, vertex_count: int,
+                             triangle_polygons: Optional[np.ndarray], polygon_smooth: Optional[np.ndarray],
+                             sharp_edges: Optional[np.ndarray],
+                             triangle_split_normals: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    '''
+    Finds the pairs of triangles that share an edge, and whether each of the edges is smooth.
+    @return: The indices of the first and second triangle of each pair, and whether the edge between them is smooth.
+    '''
+    triangle_count = len(triangle_vertices)
+    # Each triangle has the edges (0, 1), (1, 2) and (2, 0). Edge `e` of triangle `t` is record `3 * t + e`.
+    edge_start_vertices = triangle_vertices.ravel().astype(np.int64)
+    edge_end_vertices = triangle_vertices[:, [1, 2, 0]].ravel().astype(np.int64)
+    edge_keys = _get_pair_keys(edge_start_vertices, edge_end_vertices, vertex_count)
+
+    # Records with the same key are the same edge; consecutive ones are paired up (which also chains the faces of
+    # non-manifold edges together).
+    order = np.argsort(edge_keys, kind='stable')
+    sorted_keys = edge_keys[order]
+    is_shared = sorted_keys[1:] == sorted_keys[:-1]
+    first_records = order[:-1][is_shared]
+    second_records = order[1:][is_shared]
+    first_triangles = first_records // 3
+    second_triangles = second_records // 3
+
+    is_smooth = np.ones(len(first_records), dtype=bool)
+
+    if sharp_edges is not None and len(sharp_edges) > 0:
+        sharp_keys = np.sort(_get_pair_keys(sharp_edges[:, 0], sharp_edges[:, 1], vertex_count))
+        shared_keys = sorted_keys[1:][is_shared]
+        positions = np.minimum(np.searchsorted(sharp_keys, shared_keys), len(sharp_keys) - 1)
+        is_smooth &= sharp_keys[positions] != shared_keys
+
+    if triangle_split_normals is not None:
+        # Compare the normals of the two triangles at each end of the edge, ordered by vertex index so that the ends
+        # line up regardless of the winding of each triangle.
+        # The corners at the start and end of each edge record.
+        start_normals = triangle_split_normals.reshape(-1, 3)
+        end_normals = triangle_split_normals[:, [1, 2, 0]].reshape(-1, 3)
+        is_start_lower = (edge_start_vertices <= edge_end_vertices)[:, np.newaxis]
+        lower_normals = np.where(is_start_lower, start_normals, end_normals)
+        upper_normals = np.where(is_start_lower, end_normals, start_normals)
+        for normals in (lower_normals, upper_normals):
+            normal_differences = np.abs(normals[first_records] - normals[second_records])
+            is_smooth &= np.all(normal_differences <= SPLIT_NORMAL_TOLERANCE, axis=1)
+
+    if triangle_polygons is not None:
+        first_polygons = triangle_polygons[first_triangles]
+        second_polygons = triangle_polygons[second_triangles]
+        if polygon_smooth is not None:
+            is_smooth &= polygon_smooth[first_polygons] & polygon_smooth[second_polygons]
+        # Triangles of the same polygon are always shaded together.
+        is_smooth |= first_polygons == second_polygons
+
+    return first_triangles, second_triangles, is_smooth
+
+
+def find_connected_components(count: int, a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, int]:
+    '''
+    Finds the connected components of a graph with a union-find, in which all of the edges are hooked at once in each
+    round: the root of each edge's higher component is pointed at the lower one, and paths are then fully compressed.
+    @param count: The number of nodes.
+    @param a: The first node of each edge.
+    @param b: The second node of each edge.
+    @return: The component of each node, numbered in the order of the lowest node of each component, and the number of
+        components.
+    '''
+    parent = np.arange(count, dtype=np.int64)
+    while len(a) > 0:
+        root_a = parent[a]
+        root_b = parent[b]
+        is_split = root_a != root_b
+        if not np.any(is_split):
+            break
+        # Edges within a component never split it again, so they are dropped.
+        a = a[is_split]
+        b = b[is_split]
+        root_a = root_a[is_split]
+        root_b = root_b[is_split]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+    # Every root is the lowest node of its component, so numbering the roots in order numbers the components.
+    is_root = parent == np.arange(count)
+    root_labels = np.cumsum(is_root) - 1
+    return root_labels[parent], int(np.count_nonzero(is_root))
+
+
+def _get_vertex_region_pairs(triangle_vertices: np.ndarray, triangle_regions: np.ndarray, region_count: int,
+                             group_count: int) -> Tuple[np.ndarray, int]:
+    '''
+    Finds the pairs of regions that share a vertex.
+    @return: The unique pairs, and the number of vertices shared by more than `group_count` regions. Those vertices
+        can't separate all of their regions, and they are left out so that a fan of many regions doesn't add a
+        quadratic number of pairs.
+    '''
+    corner_regions = np.repeat(triangle_regions, 3)
+    keys = _get_unique_sorted(triangle_vertices.ravel().astype(np.int64) * region_count + corner_regions)
+    vertices = keys // region_count
+    regions = keys % region_count
+
+    # The keys are sorted by vertex, so the regions of each vertex form a run.
+    is_run_start = np.ones(len(vertices), dtype=bool)
+    is_run_start[1:] = vertices[1:] != vertices[:-1]
+    run_starts = np.flatnonzero(is_run_start)
+    run_lengths = np.diff(np.append(run_starts, len(vertices)))
+    crowded_vertex_count = int(np.count_nonzero(run_lengths > group_count))
+
+    record_run_lengths = np.repeat(run_lengths, run_lengths)
+    record_run_ends = np.repeat(run_starts + run_lengths, run_lengths)
+    is_paired = (record_run_lengths > 1) & (record_run_lengths <= group_count)
+    indices = np.flatnonzero(is_paired)
+    first_regions = []
+    second_regions = []
+    for offset in range(1, int(run_lengths.max(initial=0))):
+        indices = indices[indices + offset < record_run_ends[indices]]
+        if len(indices) == 0:
+            break
+        first_regions.append(regions[indices])
+        second_regions.append(regions[indices + offset])
+    if not first_regions:
+        return np.zeros((0, 2), dtype=np.int64), crowded_vertex_count
+    return (_get_unique_pairs(np.concatenate(first_regions), np.concatenate(second_regions), region_count),
+            crowded_vertex_count)
+
+
+def _get_lowest_free_colors(taken: np.ndarray) -> np.ndarray:
+    '''
+    Gets the lowest bit that isn't set in each mask.
+    '''
+    free = ~taken & (taken + np.uint64(1))
+    return np.log2(free.astype(np.float64)).astype(np.int64)
+
+
+def color_regions(region_count: int, edge_pairs: np.ndarray, vertex_pairs: np.ndarray,
+                  group_count: int = SMOOTHING_GROUP_MAX) -> np.ndarray:
+    '''
+    Colors the regions so that neighboring regions have different colors where possible.
+    The coloring is greedy, in rounds (after Jones and Plassmann): each round colors every uncolored region that has a
+    higher priority than all of its uncolored neighbors, with the lowest color its colored neighbors don't use. Regions
+    with more neighbors have a higher priority; ties are broken by a fixed pseudo-random order, so that the result is
+    deterministic.
+    @param edge_pairs: (P, 2) pairs of regions that share an edge.
+    @param vertex_pairs: (Q, 2) pairs of regions that share a vertex.
+    @param group_count: The number of colors, at most 64.
+    @return: (R,) color of each region. Regions that can't be given a color that differs from all of their neighbors
+        are given the lowest color that differs from the neighbors they share an edge with, if there is one, or 0.
+    '''
+    colors = np.full(region_count, -1, dtype=np.int64)
+    if region_count == 0:
+        return colors
+    pairs = _get_unique_pairs(np.concatenate((edge_pairs[:, 0], vertex_pairs[:, 0])),
+                              np.concatenate((edge_pairs[:, 1], vertex_pairs[:, 1])), region_count)
+    sources = np.concatenate((pairs[:, 0], pairs[:, 1]))
+    targets = np.concatenate((pairs[:, 1], pairs[:, 0]))
+    edge_sources = np.concatenate((edge_pairs[:, 0], edge_pairs[:, 1]))
+    edge_targets = np.concatenate((edge_pairs[:, 1], edge_pairs[:, 0]))
+
+    degrees = np.bincount(sources, minlength=region_count).astype(np.int64)
+    priorities = degrees * region_count + np.random.default_rng(0).permutation(region_count)
+    all_colors = np.uint64((1 << group_count) - 1) if group_count < 64 else np.uint64(0xFFFFFFFFFFFFFFFF)
+
+    is_uncolored = np.ones(region_count, dtype=bool)
+    while np.any(is_uncolored):
+        # Only the neighbors of uncolored regions still matter.
+        is_relevant = is_uncolored[sources]
+        sources = sources[is_relevant]
+        targets = targets[is_relevant]
+        is_relevant = is_uncolored[edge_sources]
+        edge_sources = edge_sources[is_relevant]
+        edge_targets = edge_targets[is_relevant]
+
+        # Select the uncolored regions whose priority is higher than that of all of their uncolored neighbors.
+        is_active = is_uncolored[sources] & is_uncolored[targets]
+        neighbor_priorities = np.full(region_count, -1, dtype=np.int64)
+        np.maximum.at(neighbor_priorities, sources[is_active], priorities[targets[is_active]])
+        selected = np.flatnonzero(is_uncolored & (priorities > neighbor_priorities))
+
+        # Gather the colors used by the colored neighbors of the selected regions.
+        is_selected = np.zeros(region_count, dtype=bool)
+        is_selected[selected] = True
+        is_constraint = is_selected[sources] & ~is_uncolored[targets]
+        taken = np.zeros(region_count, dtype=np.uint64)
+        np.bitwise_or.at(taken, sources[is_constraint],
+                         np.left_shift(np.uint64(1), colors[targets[is_constraint]].astype(np.uint64)))
+        selected_taken = taken[selected] & all_colors
+        selected_colors = _get_lowest_free_colors(selected_taken)
+
+        is_full = selected_taken == all_colors
+        if np.any(is_full):
+            # Fall back to only keeping apart the regions that share an edge.
+            full_regions = selected[is_full]
+            is_full_region = np.zeros(region_count, dtype=bool)
+            is_full_region[full_regions] = True
+            is_edge_constraint = is_full_region[edge_sources] & ~is_uncolored[edge_targets]
+            edge_taken = np.zeros(region_count, dtype=np.uint64)
+            np.bitwise_or.at(edge_taken, edge_sources[is_edge_constraint],
+                             np.left_shift(np.uint64(1), colors[edge_targets[is_edge_constraint]].astype(np.uint64)))
+            full_taken = edge_taken[full_regions] & all_colors
+            selected_colors[is_full] = np.where(full_taken == all_colors, 0, _get_lowest_free_colors(full_taken))
+
+        colors[selected] = selected_colors
+        is_uncolored[selected] = False
+    return colors
+
+
+def assign_smoothing_groups(triangle_vertices: np.ndarray, vertex_count: int,
+                            triangle_polygons: Optional[np.ndarray] = None,
+                            polygon_smooth: Optional[np.ndarray] = None,
+                            sharp_edges: Optional[np.ndarray] = None,
+                            triangle_split_normals: Optional[np.ndarray] = None,
+                            group_count: int = SMOOTHING_GROUP_MAX) -> SmoothingGroups:
+    '''
+    Assigns smoothing groups to the triangles of a mesh.
+    @param triangle_vertices: (T, 3) vertex indices of each triangle.
+    @param vertex_count: The number of vertices.
+    @param triangle_polygons: (T,) polygon index of each triangle. Triangles of the same polygon are always smoothed
+        together.
+    @param polygon_smooth: (P,) whether each polygon is smooth. Edges of flat polygons are sharp.
+    @param sharp_edges: (E, 2) vertex indices of the edges that are marked sharp.
+    @param triangle_split_normals: (T, 3, 3) normals of the corners of each triangle. Edges along which these differ
+        are sharp.
+    @param group_count: The number of available smoothing groups.
+    @return: The smoothing groups.
+    '''
+    result = SmoothingGroups()
+    triangle_count = len(triangle_vertices)
+    if triangle_count == 0:
+        return result
+
+    first_triangles, second_triangles, is_smooth = _find_adjacent_triangles(
+        triangle_vertices, vertex_count, triangle_polygons, polygon_smooth, sharp_edges, triangle_split_normals)
+    triangle_regions, region_count = find_connected_components(triangle_count, first_triangles[is_smooth],
+                                                               second_triangles[is_smooth])
+
+    is_sharp = ~is_smooth
+    edge_pairs = _get_unique_pairs(triangle_regions[first_triangles[is_sharp]],
+                                   triangle_regions[second_triangles[is_sharp]], region_count)
+    vertex_pairs, crowded_vertex_count = _get_vertex_region_pairs(triangle_vertices, triangle_regions, region_count,
+                                                                  group_count)
+    region_colors = color_regions(region_count, edge_pairs, vertex_pairs, group_count)
+
+    result.triangle_groups = region_colors[triangle_regions].astype(INDEX_DTYPE)
+    result.region_count = region_count
+    is_edge_conflict = region_colors[edge_pairs[:, 0]] == region_colors[edge_pairs[:, 1]]
+    result.edge_conflict_count = int(np.count_nonzero(is_edge_conflict))
+    is_vertex_conflict = region_colors[vertex_pairs[:, 0]] == region_colors[vertex_pairs[:, 1]]
+    # Regions that share an edge also share its vertices, so those conflicts are only counted once.
+    vertex_conflict_keys = _get_pair_keys(vertex_pairs[is_vertex_conflict, 0], vertex_pairs[is_vertex_conflict, 1],
+                                          region_count)
+    edge_conflict_keys = _get_pair_keys(edge_pairs[is_edge_conflict, 0], edge_pairs[is_edge_conflict, 1], region_count)
+    result.vertex_conflict_count = (int(np.count_nonzero(~np.isin(vertex_conflict_keys, edge_conflict_keys))) +
+                                    crowded_vertex_count)
+    return result
@@ -0,0 +1,186 @@
+'''
+Snapshots of the objects that an export would include.
+
+Exporting the selection scans it several times: `poll` checks it on every redraw, `invoke` populates the material
+mapping and vertex color lists from it, and `execute` traverses it again to build the export. A snapshot holds the
+result of the depth-first traversal, the mesh objects and their materials and vertex color attributes, so that all of
+these (and the populate operators) share a single scan.
+
+Snapshots are discarded when the depsgraph reports an update to an object, mesh, material or collection, when the frame
+changes, or when the data is reloaded. Updates to the scene alone are ignored: they include the writes that `invoke` makes to the scene's export
+settings, which would otherwise discard the snapshot before `execute` could use it. Changes to the selection only
+update the scene, so the selection of a snapshot is instead compared with the current selection whenever it is used.
+'''
+
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import Collection, Context, Depsgraph, Material, Mesh, Object
+
+from .dfs import DfsObject, dfs_collection_objects, dfs_objects_recursive
+from .materials import MaterialTable
+from .properties import get_vertex_color_attributes_from_objects
+
+
+class MeshObjectScan:
+    '''
+    Memoizes the materials and vertex color attributes of mesh objects so that they only need to be scanned once when
+    exporting many collections that share objects.
+    '''
+    def __init__(self, depsgraph: Optional[Depsgraph] = None):
+        '''
+        @param depsgraph: The evaluated depsgraph to get the materials from. If none is given, the depsgraph of the
+            current context is fetched the first time it is needed, so that a scan that is never used (e.g., that of a
+            snapshot made by `poll`) doesn't evaluate the depsgraph.
+        '''
+        self._depsgraph = depsgraph
+        self._materials: Dict[Object, List[Material]] = dict()
+        self._color_attributes: Dict[Object, Set[str]] = dict()
+
+    @property
+    def depsgraph(self) -> Depsgraph:
+        if self._depsgraph is None:
+            self._depsgraph = bpy.context.evaluated_depsgraph_get()
+        return self._depsgraph
+
+    def get_unique_materials(self, mesh_objects: Iterable[Object]) -> MaterialTable:
+        materials = MaterialTable()
+        for mesh_object in mesh_objects:
+            object_materials = self._materials.get(mesh_object, None)
+            if object_materials is None:
+                eo = mesh_object.evaluated_get(self.depsgraph)
+                object_materials = [material_slot.material for material_slot in eo.material_slots]
+                self._materials[mesh_object] = object_materials
+            materials.update(object_materials)
+        return materials
+
+    def get_vertex_color_attributes(self, mesh_objects: Iterable[Object]) -> Set[str]:
+        color_attributes = set()
+        for mesh_object in mesh_objects:
+            object_color_attributes = self._color_attributes.get(mesh_object, None)
+            if object_color_attributes is None:
+                object_color_attributes = get_vertex_color_attributes_from_objects([mesh_object])
+                self._color_attributes[mesh_object] = object_color_attributes
+            color_attributes |= object_color_attributes
+        return color_attributes
+
+
+class ObjectsSnapshot:
+    '''
+    The objects included by an export, scanned on first use.
+    '''
+    def __init__(self, get_dfs_objects: Callable[[], Iterable[DfsObject]], depsgraph: Optional[Depsgraph] = None):
+        '''
+        @param get_dfs_objects: Traverses the objects of the export.
+        '''
+        self._get_dfs_objects = get_dfs_objects
+        self._dfs_objects: Optional[List[DfsObject]] = None
+        self._mesh_objects: Optional[List[Object]] = None
+        self.mesh_object_scan = MeshObjectScan(depsgraph)
+
+    @property
+    def dfs_objects(self) -> List[DfsObject]:
+        '''
+        The objects of the export, in depth-first order, including those of instances.
+        '''
+        if self._dfs_objects is None:
+            self._dfs_objects = list(self._get_dfs_objects())
+        return self._dfs_objects
+
+    @property
+    def mesh_objects(self) -> List[Object]:
+        if self._mesh_objects is None:
+            self._mesh_objects = [x.obj for x in self.dfs_objects if x.obj.type == 'MESH']
+        return self._mesh_objects
+
+    def get_unique_materials(self) -> MaterialTable:
+        return self.mesh_object_scan.get_unique_materials(self.mesh_objects)
+
+    def get_vertex_color_attributes(self) -> Set[str]:
+        return self.mesh_object_scan.get_vertex_color_attributes(self.mesh_objects)
+
+
+class SelectionSnapshot(ObjectsSnapshot):
+    '''
+    The selected objects, and the objects included by exporting them.
+    '''
+    def __init__(self, selected_objects: Iterable[Object], depsgraph: Optional[Depsgraph] = None):
+        self.selected_objects = list(selected_objects)
+        super().__init__(lambda: dfs_objects_recursive(self.selected_objects), depsgraph)
+        self.has_exportable_objects = any(
+            x.type == 'MESH' or (x.type == 'EMPTY' and x.instance_collection is not None)
+            for x in self.selected_objects)
+
+
+_selection_snapshots: Dict[Tuple[int, str], SelectionSnapshot] = dict()
+_collection_snapshots: Dict[Tuple[int, str, Collection], ObjectsSnapshot] = dict()
+
+
+def _get_context_key(context: Context) -> Tuple[int, str]:
+    return context.scene.session_uid, context.view_layer.name
+
+
+def get_selection_snapshot(context: Context) -> SelectionSnapshot:
+    '''
+    Gets the snapshot of the selected objects of the context's view layer, scanning them if there is none.
+    '''
+    key = _get_context_key(context)
+    snapshot = _selection_snapshots.get(key, None)
+    selected_objects = context.selected_objects or []
+    if snapshot is None or snapshot.selected_objects != selected_objects:
+        # The depsgraph is only fetched once materials are needed, since `poll` makes snapshots during redraws.
+        snapshot = SelectionSnapshot(selected_objects)
+        _selection_snapshots[key] = snapshot
+    return snapshot
+
+
+def get_collection_snapshot(context: Context, collection: Collection) -> ObjectsSnapshot:
+    '''
+    Gets the snapshot of the objects of a collection, scanning them if there is none.
+    '''
+    key = _get_context_key(context) + (collection,)
+    snapshot = _collection_snapshots.get(key, None)
+    if snapshot is None:
+        snapshot = ObjectsSnapshot(lambda: dfs_collection_objects(collection))
+        _collection_snapshots[key] = snapshot
+    return snapshot
+
+
+def clear_snapshots():
+    _selection_snapshots.clear()
+    _collection_snapshots.clear()
+
+
+# The types of data-blocks whose updates may change the objects of a snapshot, or their materials and attributes.
+_SNAPSHOT_DEPENDENCY_TYPES = (Object, Mesh, Material, Collection)
+
+
+@persistent
+def on_depsgraph_update_post(_scene, depsgraph: Depsgraph):
+    if not _selection_snapshots and not _collection_snapshots:
+        return
+    if any(isinstance(update.id, _SNAPSHOT_DEPENDENCY_TYPES) for update in depsgraph.updates):
+        clear_snapshots()
+
+
+@persistent
+def on_data_reloaded(*_args):
+    # Loading a file or stepping through the undo history replaces the data-blocks wholesale.
+    clear_snapshots()
+
+
+@persistent
+def on_frame_change_post(_scene, _depsgraph: Optional[Depsgraph] = None):
+    # Changing the frame sends no depsgraph update, but may move any object, and the snapshots hold the matrices of the
+    # objects of instanced collections.
+    clear_snapshots()
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, on_depsgraph_update_post),
+    (bpy.app.handlers.load_post, on_data_reloaded),
+    (bpy.app.handlers.undo_post, on_data_reloaded),
+    (bpy.app.handlers.redo_post, on_data_reloaded),
+    (bpy.app.handlers.frame_change_post, on_frame_change_post),
+)
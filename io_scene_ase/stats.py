@@ -0,0 +1,207 @@
+'''
+Timing and memory instrumentation of exports.
+
+The builder and the writer wrap each stage of their work in `ExportStats.stage`, which records the time spent in the
+stage (in total, and excluding nested stages) and, optionally, the peak memory allocated during it as traced by
+`tracemalloc`. Stages that work on a single object are also attributed to that object. The results can be summarized
+in a line, printed as a table, or saved as a Chrome trace (viewable in `chrome://tracing` or Perfetto).
+
+When no statistics are wanted, `NULL_STATS` can be used in place of an `ExportStats`; its stages do nothing.
+'''
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import ContextManager, Dict, Iterator, List, Optional
+
+
+class StageStats:
+    '''
+    The accumulated statistics of every run of a stage with the same name.
+    '''
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        # The total time spent in the stage, including nested stages.
+        self.seconds = 0.0
+        # The total time spent in the stage, excluding nested stages.
+        self.self_seconds = 0.0
+        # The largest growth in traced memory during any single run of the stage.
+        self.peak_bytes = 0
+
+
+class _StageFrame:
+    def __init__(self, name: str, source: Optional[str], is_source_counted: bool):
+        self.name = name
+        self.source = source
+        self.is_source_counted = is_source_counted
+        self.start_time = time.perf_counter()
+        self.child_seconds = 0.0
+        self.start_bytes = 0
+        self.peak_bytes = 0
+
+
+class ExportStats:
+    '''
+    Collects the time and memory used by each stage of an export.
+    Stages may be nested, and may be entered from several threads at once, although memory peaks are process-wide and
+    are therefore only meaningful when stages don't overlap.
+    '''
+    def __init__(self, should_trace_memory: bool = False):
+        '''
+        @param should_trace_memory: Whether to record memory peaks with `tracemalloc`. This slows down allocations
+            considerably, so the times of stages are less representative when it is enabled.
+        '''
+        self.should_trace_memory = should_trace_memory
+        self.stages: Dict[str, StageStats] = dict()
+        # The total time spent in stages attributed to each source object.
+        self.source_seconds: Dict[str, float] = dict()
+        self.events: List[dict] = []
+        self._origin_time = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._is_tracing_started = False
+
+    def __enter__(self) -> 'ExportStats':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        '''
+        Stops tracing memory allocations, if they were being traced on behalf of these statistics.
+        '''
+        if self._is_tracing_started:
+            tracemalloc.stop()
+            self._is_tracing_started = False
+
+    def _get_frames(self) -> List[_StageFrame]:
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    @contextmanager
+    def stage(self, name: str, source: Optional[str] = None) -> Iterator[None]:
+        '''
+        Records the time (and, optionally, the memory) used by the body of the `with` statement.
+        @param name: The name of the stage. Runs of stages with the same name are accumulated.
+        @param source: The name of the object that the stage works on, if any. Its time is attributed to the object,
+            unless an enclosing stage is already attributed to the same object.
+        '''
+        if self.should_trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._is_tracing_started = True
+        frames = self._get_frames()
+        is_source_counted = source is not None and not any(x.source == source for x in frames)
+        frame = _StageFrame(name, source, is_source_counted)
+        if tracemalloc.is_tracing():
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            if frames:
+                # The peak is reset for this stage, so hand the peak so far over to the enclosing stage.
+                frames[-1].peak_bytes = max(frames[-1].peak_bytes, peak_bytes)
+            tracemalloc.reset_peak()
+            frame.start_bytes = frame.peak_bytes = current_bytes
+        frames.append(frame)
+        try:
+            yield
+        finally:
+            frames.pop()
+            self._end_stage(frame, frames[-1] if frames else None)
+
+    def _end_stage(self, frame: _StageFrame, parent: Optional[_StageFrame]):
+        end_time = time.perf_counter()
+        seconds = end_time - frame.start_time
+        stage_peak_bytes = 0
+        if tracemalloc.is_tracing():
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            peak_bytes = max(frame.peak_bytes, peak_bytes)
+            stage_peak_bytes = max(peak_bytes - frame.start_bytes, 0)
+            if parent is not None:
+                parent.peak_bytes = max(parent.peak_bytes, peak_bytes)
+        if parent is not None:
+            parent.child_seconds += seconds
+
+        event_args = {}
+        if frame.source is not None:
+            event_args['source'] = frame.source
+        if stage_peak_bytes > 0:
+            event_args['peak_bytes'] = stage_peak_bytes
+
+        with self._lock:
+            stage = self.stages.get(frame.name, None)
+            if stage is None:
+                stage = self.stages[frame.name] = StageStats(frame.name)
+            stage.count += 1
+            stage.seconds += seconds
+            stage.self_seconds += seconds - frame.child_seconds
+            stage.peak_bytes = max(stage.peak_bytes, stage_peak_bytes)
+            if frame.is_source_counted:
+                self.source_seconds[frame.source] = self.source_seconds.get(frame.source, 0.0) + seconds
+            self.events.append({
+                'name': frame.name,
+                'cat': 'io_scene_ase',
+                'ph': 'X',
+                'ts': (frame.start_time - self._origin_time) * 1e6,
+                'dur': seconds * 1e6,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': event_args,
+            })
+
+    def get_summary(self, stage_names=('build', 'write')) -> str:
+        '''
+        Gets a one-line summary of the statistics, suitable for a report message.
+        @param stage_names: The stages whose total time is listed first.
+        '''
+        parts = [f'{name} {self.stages[name].seconds:.2f}s' for name in stage_names if name in self.stages]
+        if self.stages:
+            slowest_stage = max(self.stages.values(), key=lambda x: x.self_seconds)
+            parts.append(f'most time in {slowest_stage.name} ({slowest_stage.self_seconds:.2f}s)')
+        if self.source_seconds:
+            slowest_source = max(self.source_seconds.items(), key=lambda x: x[1])
+            parts.append(f'slowest object \'{slowest_source[0]}\' ({slowest_source[1]:.2f}s)')
+        return ', '.join(parts)
+
+    def get_report(self, max_sources: int = 10) -> str:
+        '''
+        Gets a table of the statistics of each stage, followed by the slowest source objects.
+        '''
+        lines = [f'{"Stage":32} {"Count":>8} {"Total (s)":>10} {"Self (s)":>10} {"Peak (MB)":>10}']
+        for stage in sorted(self.stages.values(), key=lambda x: x.seconds, reverse=True):
+            peak = f'{stage.peak_bytes / (1024 * 1024):10.1f}' if self.should_trace_memory else f'{"-":>10}'
+            lines.append(f'{stage.name:32} {stage.count:8} {stage.seconds:10.3f} {stage.self_seconds:10.3f} {peak}')
+        if self.source_seconds:
+            lines.append('')
+            lines.append(f'{"Object":43} {"Total (s)":>10}')
+            sources = sorted(self.source_seconds.items(), key=lambda x: x[1], reverse=True)
+            for source, seconds in sources[:max_sources]:
+                lines.append(f'{source:43} {seconds:10.3f}')
+            if len(sources) > max_sources:
+                lines.append(f'... ({len(sources) - max_sources} more)')
+        return '\n'.join(lines)
+
+    def write_chrome_trace(self, path: str | Path):
+        '''
+        Writes the recorded stages as a Chrome trace (the JSON object format of the Trace Event Format).
+        '''
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as fp:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fp)
+
+
+class NullStats(ExportStats):
+    '''
+    Statistics that record nothing, for when no statistics are wanted.
+    '''
+    def stage(self, name: str, source: Optional[str] = None) -> ContextManager[None]:
+        return nullcontext()
+
+
+NULL_STATS = NullStats()
@@ -0,0 +1,226 @@
+'''
+Structural comparison of two ASE files.
+
+Both files are read side by side with `ASEReader`, command by command, and the bulk lists are compared chunk by chunk,
+so memory use does not grow with the size of the files. Numbers are compared with a tolerance, and materials are
+compared by name regardless of their order: the material indices of the faces of the second file are remapped to those
+of the first before they are compared.
+
+    python -m io_scene_ase.verify expected.ase actual.ase
+'''
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .reader import ASEParseError, ASERecord, ASEReader, LIST_FORMATS
+
+
+# Values are written with 4 decimal places, so allow for a difference in rounding of the last place.
+DEFAULT_TOLERANCE = 1.5e-4
+
+# The column of the material index in the rows of a MESH_FACE_LIST.
+_FACE_MATERIAL_INDEX_COLUMN = 4
+
+
+class ASEDifferences:
+    '''
+    Collects the differences found between two files, keeping at most `max_differences` descriptions.
+    '''
+    def __init__(self, max_differences: int):
+        self.max_differences = max_differences
+        self.messages: List[str] = []
+        self.count = 0
+
+    def add(self, message: str, count: int = 1):
+        self.count += count
+        if len(self.messages) < self.max_differences:
+            self.messages.append(message)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.messages) >= self.max_differences
+
+    def __bool__(self) -> bool:
+        return self.count > 0
+
+
+def _iter_aligned_chunks(a: Iterator[np.ndarray], b: Iterator[np.ndarray]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    '''
+    Re-chunks two iterators of row chunks so that each pair of yielded chunks holds the same rows.
+    When one side runs out of rows, the remaining rows of the other side are yielded against an empty chunk.
+    '''
+    chunk_a = chunk_b = None
+    while True:
+        if chunk_a is None or len(chunk_a) == 0:
+            chunk_a = next(a, None)
+        if chunk_b is None or len(chunk_b) == 0:
+            chunk_b = next(b, None)
+        if chunk_a is None or chunk_b is None:
+            break
+        row_count = min(len(chunk_a), len(chunk_b))
+        yield chunk_a[:row_count], chunk_b[:row_count]
+        chunk_a = chunk_a[row_count:]
+        chunk_b = chunk_b[row_count:]
+    if chunk_a is not None:
+        yield chunk_a, chunk_a[:0]
+        for chunk in a:
+            yield chunk, chunk[:0]
+    if chunk_b is not None:
+        yield chunk_b[:0], chunk_b
+        for chunk in b:
+            yield chunk[:0], chunk
+
+
+def _get_material_index_map(materials_a: List[str], materials_b: List[str]) -> np.ndarray:
+    '''
+    Maps the material indices of the second file to those of the first, by name. Duplicate names are matched in order.
+    Materials that only exist in the second file are mapped to -1.
+    '''
+    indices_a: Dict[str, List[int]] = dict()
+    for index, name in enumerate(materials_a):
+        indices_a.setdefault(name, []).append(index)
+    index_map = np.full(len(materials_b), -1, dtype=np.float64)
+    for index, name in enumerate(materials_b):
+        candidates = indices_a.get(name, None)
+        if candidates:
+            index_map[index] = candidates.pop(0)
+    return index_map
+
+
+def _compare_materials(materials_a: List[str], materials_b: List[str], differences: ASEDifferences):
+    remaining_b = list(materials_b)
+    for name in materials_a:
+        if name in remaining_b:
+            remaining_b.remove(name)
+        else:
+            differences.add(f'Material \'{name}\' is missing')
+    for name in remaining_b:
+        differences.add(f'Material \'{name}\' is unexpected')
+
+
+def _compare_lists(reader_a: ASEReader, reader_b: ASEReader, record_a: ASERecord, record_b: ASERecord, context: str,
+                   tolerance: float, material_index_map: Optional[np.ndarray], differences: ASEDifferences):
+    row_offset = 0
+    row_count_a = row_count_b = 0
+    for chunk_a, chunk_b in _iter_aligned_chunks(reader_a.iter_list_rows(record_a), reader_b.iter_list_rows(record_b)):
+        row_count_a += len(chunk_a)
+        row_count_b += len(chunk_b)
+        if len(chunk_a) != len(chunk_b):
+            continue
+        if material_index_map is not None and record_a.name == 'MESH_FACE_LIST':
+            chunk_b = chunk_b.copy()
+            material_indices = chunk_b[:, _FACE_MATERIAL_INDEX_COLUMN].astype(np.int64)
+            is_valid = (material_indices >= 0) & (material_indices < len(material_index_map))
+            chunk_b[:, _FACE_MATERIAL_INDEX_COLUMN] = np.where(
+                is_valid, material_index_map[np.clip(material_indices, 0, max(len(material_index_map) - 1, 0))], -1)
+        is_different = ~np.isclose(chunk_a, chunk_b, rtol=0.0, atol=tolerance, equal_nan=True)
+        different_rows = np.flatnonzero(is_different.any(axis=1))
+        if len(different_rows) > 0:
+            row = int(different_rows[0])
+            differences.add(f'{context}: {len(different_rows)} rows of {record_a.name} differ, first at row '
+                            f'{row_offset + row}: expected {chunk_a[row].tolist()}, found {chunk_b[row].tolist()}',
+                            count=len(different_rows))
+        row_offset += len(chunk_a)
+    if row_count_a != row_count_b:
+        differences.add(f'{context}: {record_a.name} has {row_count_b} rows, expected {row_count_a}')
+
+
+def _compare_values(record_a: ASERecord, record_b: ASERecord, context: str, tolerance: float,
+                    differences: ASEDifferences):
+    values_a = record_a.get_values()
+    values_b = record_b.get_values()
+    is_equal = len(values_a) == len(values_b)
+    if is_equal:
+        for value_a, value_b in zip(values_a, values_b):
+            if isinstance(value_a, (int, float)) and isinstance(value_b, (int, float)):
+                if abs(value_a - value_b) > tolerance:
+                    is_equal = False
+            elif value_a != value_b:
+                is_equal = False
+    if not is_equal:
+        differences.add(f'{context}: {record_a.name} is {values_b}, expected {values_a}')
+
+
+def verify_ase(path_a: str | Path, path_b: str | Path, tolerance: float = DEFAULT_TOLERANCE,
+               max_differences: int = 20) -> ASEDifferences:
+    '''
+    Compares two ASE files structurally.
+    @param path_a: The expected file.
+    @param path_b: The file to check.
+    @param tolerance: The largest allowed absolute difference between numbers.
+    @param max_differences: The maximum number of differences to describe. Comparison stops once this is reached.
+    @return: The differences found.
+    '''
+    differences = ASEDifferences(max_differences)
+    material_index_map: Optional[np.ndarray] = None
+    with ASEReader(path_a) as reader_a, ASEReader(path_b) as reader_b:
+        # The names of the enclosing commands, used to describe where differences are.
+        stack: List[str] = []
+        while not differences.is_full:
+            record_a = reader_a.read_record()
+            record_b = reader_b.read_record()
+            if record_a is None or record_b is None:
+                if record_a is not None or record_b is not None:
+                    differences.add(f'{"/".join(stack) or "File"}: '
+                                    f'{"unexpected end of file" if record_b is None else "unexpected content"} '
+                                    f'at byte {(record_b or record_a).start}')
+                break
+            context = '/'.join(stack) or 'File'
+            if record_a.name != record_b.name or record_a.is_block != record_b.is_block:
+                # The structure differs, so nothing after this point can be matched up.
+                differences.add(f'{context}: found {record_b.name or "end of block"} at byte {record_b.start}, '
+                                f'expected {record_a.name or "end of block"} at byte {record_a.start}')
+                break
+            if record_a.is_end:
+                stack.pop()
+                continue
+            if record_a.name == 'MATERIAL_LIST' and record_a.is_block:
+                materials_a = reader_a.read_material_list(record_a)
+                materials_b = reader_b.read_material_list(record_b)
+                _compare_materials(materials_a, materials_b, differences)
+                material_index_map = _get_material_index_map(materials_a, materials_b)
+                continue
+            if record_a.name in LIST_FORMATS:
+                _compare_lists(reader_a, reader_b, record_a, record_b, context, tolerance, material_index_map,
+                               differences)
+                continue
+            _compare_values(record_a, record_b, context, tolerance, differences)
+            if record_a.is_block:
+                stack.append(record_a.name)
+            elif record_a.name == 'NODE_NAME' and stack:
+                # Name the geometry object in the context of later differences.
+                stack[-1] = f'{stack[-1]}[{record_a.data.decode("utf-8", errors="replace")}]'
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares two ASE files structurally, with a tolerance for numbers '
+                                                 'and regardless of the order of the materials.')
+    parser.add_argument('expected', help='The expected ASE file')
+    parser.add_argument('actual', help='The ASE file to check')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'The largest allowed difference between numbers (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--max-differences', type=int, default=20, help='Stop after this many differences')
+    args = parser.parse_args()
+
+    try:
+        differences = verify_ase(args.expected, args.actual, args.tolerance, args.max_differences)
+    except (OSError, ASEParseError) as e:
+        parser.exit(2, f'{parser.prog}: error: {e}\n')
+
+    if not differences:
+        print('The files match')
+        return
+    for message in differences.messages:
+        print(message)
+    if differences.count > len(differences.messages):
+        print(f'... ({differences.count} differences in total)')
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
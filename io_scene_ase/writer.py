@@ -1,11 +1,47 @@
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, Sequence, TypeAlias
 
-from .ase import ASE
+import numpy as np
+
+from .ase import ASE, ASEGeometryObject
+from .sinks import OutputSink, FileSink
+from .stats import ExportStats, NULL_STATS
 
 
 # Type alias for datum.
-type Datum = str | int | float | dict[str, Datum]
+Datum: TypeAlias = 'str | int | float | dict[str, Datum]'
+
+# The number of rows rendered per chunk by the bulk formatter.
+BULK_CHUNK_ROWS = 16384
+
+
+def format_row_range(template: str, columns: Sequence[np.ndarray], start: int, stop: int, with_index: bool = True) -> str:
+    '''
+    Renders a %-style row template once for each row in `[start, stop)` of the given columns.
+
+    The rows are rendered with a single `%` operation on the template repeated for every row, which avoids per-value
+    dispatch and per-token writes. All values are passed as floats: `%.4f` is identical to the `{:0.4f}` format used by
+    `ASEWriter.write_datum`, and `%d` renders integral floats exactly.
+    @param template: The template for a single row, including its indentation and trailing newline.
+    @param columns: Arrays of rows, either 1D or 2D. Their values are laid out left to right.
+    @param start: The first row to render.
+    @param stop: The row to stop at.
+    @param with_index: Whether to prepend the row index as the first value of each row.
+    @return: The rendered rows.
+    '''
+    parts = [np.arange(start, stop, dtype=np.float64)] if with_index else []
+    parts += [column[start:stop] for column in columns]
+    values = np.column_stack(parts).astype(np.float64, copy=False)
+    return (template * (stop - start)) % tuple(values.ravel().tolist())
+
+
+def format_rows(template: str, columns: Sequence[np.ndarray], row_count: int, with_index: bool = True,
+                chunk_rows: int = BULK_CHUNK_ROWS) -> Iterator[str]:
+    '''
+    Renders a row template for every row of the given columns with `format_row_range`, yielding large chunks of text.
+    '''
+    for start in range(0, row_count, chunk_rows):
+        yield format_row_range(template, columns, start, min(start + chunk_rows, row_count), with_index)
 
 
 class ASEFile(object):
@@ -56,14 +92,88 @@ class ASECommand(object):
         return child
 
 
-def write_ase(filepath: str, ase: ASE):
-    ASEWriter(filepath).write(ase)
+def write_ase(file: int | str | Path | OutputSink, ase: ASE, worker_count: int = 0, stats: ExportStats = NULL_STATS):
+    '''
+    Writes an ASE to a file path or an output sink.
+    Sinks that are passed in are flushed but not closed, so that the caller can still access their contents.
+    @param worker_count: If greater than 1, large sections are formatted in a pool of this many processes.
+    @param stats: The statistics to record the stages of the write in.
+    '''
+    with stats.stage('write'):
+        row_formatter = None
+        if worker_count > 1:
+            from .parallel import ParallelRowFormatter
+            row_formatter = ParallelRowFormatter(worker_count)
+        writer = ASEWriter(file, row_formatter, stats)
+        try:
+            writer.write(ase)
+        finally:
+            if row_formatter is not None:
+                row_formatter.close()
+            if isinstance(file, OutputSink):
+                writer.fp.flush()
+            else:
+                writer.fp.close()
+
+
+def _float_width(values: np.ndarray) -> int:
+    if values.size == 0:
+        return 0
+    largest = float(np.nanmax(np.abs(values))) if not np.isnan(values).all() else 0.0
+    # Sign, integer digits, decimal point and four decimal digits.
+    return len('{:0.4f}'.format(largest)) + 1
+
+
+def _int_width(value: int) -> int:
+    return len(str(value)) + 1
+
+
+def estimate_ase_size(ase: ASE) -> int:
+    '''
+    Estimates the size of the written ASE in characters, from the geometry counts and value ranges.
+    This is used by output sinks that preallocate their storage; it is not an exact upper bound.
+    '''
+    # Header and material list.
+    size = 256 + sum(320 + 2 * len(material) for material in ase.materials)
+    for geometry_object in ase.geometry_objects:
+        size += 512 + len(geometry_object.name)
+        vertex_count = len(geometry_object.vertices)
+        face_count = len(geometry_object.face_indices)
+        vertex_index_width = _int_width(vertex_count)
+        face_index_width = _int_width(face_count)
+        # Vertices
+        size += vertex_count * (16 + vertex_index_width + 3 * (_float_width(geometry_object.vertices) + 1))
+        # Faces
+        size += face_count * (72 + face_index_width + 3 * vertex_index_width + 2 * 12)
+        # Texture vertices and texture faces
+        for uv_layer in geometry_object.uv_layers:
+            texture_vertex_count = len(uv_layer.texture_vertices)
+            texture_vertex_faces = geometry_object.get_texture_vertex_faces(uv_layer)
+            size += texture_vertex_count * (16 + _int_width(texture_vertex_count) + 3 * (_float_width(uv_layer.texture_vertices) + 1))
+            size += len(texture_vertex_faces) * (16 + face_index_width + 3 * _int_width(texture_vertex_count))
+        # Normals
+        size += len(geometry_object.normals) * 4 * (24 + max(face_index_width, vertex_index_width) + 3 * 9)
+        # Vertex colors and color faces
+        vertex_color_count = len(geometry_object.vertex_colors)
+        if vertex_color_count > 0:
+            color_vertex_faces = geometry_object.get_color_vertex_faces()
+            size += vertex_color_count * (18 + _int_width(vertex_color_count) + 3 * (_float_width(geometry_object.vertex_colors) + 1))
+            size += len(color_vertex_faces) * (16 + face_index_width + 3 * _int_width(vertex_color_count))
+    return size
 
 
 class ASEWriter(object):
 
-    def __init__(self, file: int | str | Path):
-        self.fp = open(file, 'w')
+    def __init__(self, file: int | str | Path | OutputSink, row_formatter=None, stats: ExportStats = NULL_STATS):
+        '''
+        @param file: The file path or output sink to write to.
+        @param row_formatter: An optional object with `format_rows` and `release` methods (such as a
+            `ParallelRowFormatter`) that renders the bulk sections in place of `format_rows`.
+        @param stats: The statistics to record the time spent on each section in.
+        '''
+        self.fp: OutputSink = file if isinstance(file, OutputSink) else FileSink(file)
+        self.row_formatter = row_formatter
+        self.stats = stats
         self.indent = 0
 
     def write_datum(self, datum: Datum):
@@ -112,8 +222,113 @@ class ASEWriter(object):
         for command in file.commands:
             self.write_command(command)
 
+    def begin_block(self, name: str, *data: Datum):
+        self.fp.write('\t' * self.indent + f'*{name}')
+        for datum in data:
+            self.fp.write(' ')
+            self.write_datum(datum)
+        self.fp.write(' {\n')
+        self.indent += 1
+
+    def end_block(self):
+        self.indent -= 1
+        self.fp.write('\t' * self.indent + '}\n')
+
+    def write_leaf(self, name: str, *data: Datum):
+        self.fp.write('\t' * self.indent + f'*{name}')
+        for datum in data:
+            self.fp.write(' ')
+            self.write_datum(datum)
+        self.fp.write('\n')
+
+    def write_rows(self, name: str, template: str, columns: Sequence[np.ndarray], row_count: int,
+                   with_index: bool = True):
+        '''
+        Writes a list command whose children are rendered in bulk from arrays with `format_rows`.
+        Lists without any rows have no braces, matching the output of `write_command` for commands without children.
+        @param template: The template for the children of a single row, excluding indentation.
+        '''
+        if row_count == 0:
+            self.write_leaf(name)
+            return
+        with self.stats.stage(name):
+            self.begin_block(name)
+            indent = '\t' * self.indent
+            row_template = ''.join(f'{indent}{line}\n' for line in template.split('\n'))
+            if self.row_formatter is not None:
+                chunks = self.row_formatter.format_rows(row_template, columns, row_count, with_index)
+            else:
+                chunks = format_rows(row_template, columns, row_count, with_index)
+            for chunk in chunks:
+                self.fp.write(chunk)
+            self.end_block()
+
+    def write_geometry_object(self, geometry_object: ASEGeometryObject):
+        '''
+        Streams a GEOMOBJECT straight from the geometry object's arrays, without building a command tree.
+        The output is identical to writing the tree built by `build_geometry_object_tree`.
+        '''
+        self.begin_block('GEOMOBJECT')
+        self.write_leaf('NODE_NAME', geometry_object.name)
+        self.begin_block('MESH')
+
+        # Vertices
+        vertex_count = len(geometry_object.vertices)
+        self.write_leaf('MESH_NUMVERTEX', vertex_count)
+        self.write_rows('MESH_VERTEX_LIST', '*MESH_VERTEX %d %.4f %.4f %.4f', [geometry_object.vertices], vertex_count)
+
+        # Faces
+        face_count = len(geometry_object.face_indices)
+        self.write_leaf('MESH_NUMFACES', face_count)
+        self.write_rows('MESH_FACE_LIST',
+                        '*MESH_FACE %d: A: %d B: %d C: %d AB: 0 BC: 0 CA: 0 *MESH_SMOOTHING %d *MESH_MTLID %d',
+                        [geometry_object.face_indices, geometry_object.face_smoothing, geometry_object.face_material_indices],
+                        face_count)
+
+        # Texture Coordinates
+        for i, uv_layer in enumerate(geometry_object.uv_layers):
+            if i > 0:
+                self.begin_block('MESH_MAPPINGCHANNEL', i + 1)
+            texture_vertex_count = len(uv_layer.texture_vertices)
+            self.write_leaf('MESH_NUMTVERTEX', texture_vertex_count)
+            self.write_rows('MESH_TVERTLIST', '*MESH_TVERT %d %.4f %.4f %.4f', [uv_layer.texture_vertices], texture_vertex_count)
+            # Texture Faces
+            texture_vertex_faces = geometry_object.get_texture_vertex_faces(uv_layer)
+            texture_face_count = len(texture_vertex_faces)
+            if texture_face_count > 0:
+                self.write_leaf('MESH_NUMTVFACES', texture_face_count)
+                self.write_rows('MESH_TFACELIST', '*MESH_TFACE %d %d %d %d', [texture_vertex_faces], texture_face_count)
+            if i > 0:
+                self.end_block()
+
+        # Normals
+        normal_count = len(geometry_object.normals)
+        if normal_count > 0:
+            # Each face normal is followed by the vertex normals of its three corners, each prefixed by its vertex index.
+            vertex_normals = np.concatenate((geometry_object.face_indices[:, :, np.newaxis],
+                                             geometry_object.vertex_normals), axis=2, dtype=np.float64)
+            self.write_rows('MESH_NORMALS',
+                            '*MESH_FACENORMAL %d %.4f %.4f %.4f' + '\n*MESH_VERTEXNORMAL %d %.4f %.4f %.4f' * 3,
+                            [geometry_object.normals, vertex_normals.reshape(normal_count, 12)],
+                            normal_count)
+            del vertex_normals
+
+        # Vertex Colors
+        vertex_color_count = len(geometry_object.vertex_colors)
+        if vertex_color_count > 0:
+            self.write_leaf('MESH_NUMCVERTEX', vertex_color_count)
+            self.write_rows('MESH_CVERTLIST', '*MESH_VERTCOL %d %.4f %.4f %.4f', [geometry_object.vertex_colors], vertex_color_count)
+            color_vertex_faces = geometry_object.get_color_vertex_faces()
+            color_face_count = len(color_vertex_faces)
+            self.write_leaf('MESH_NUMCVFACES', color_face_count)
+            self.write_rows('MESH_CFACELIST', '*MESH_CFACE %d %d %d %d', [color_vertex_faces], color_face_count)
+
+        self.end_block()
+        self.write_leaf('MATERIAL_REF', 0)
+        self.end_block()
+
     @staticmethod
-    def build_ase_tree(ase: ASE) -> ASEFile:
+    def build_header_tree(ase: ASE) -> ASEFile:
         root = ASEFile()
         root.add_command('3DSMAX_ASCIIEXPORT').push_datum(200)
 
@@ -140,76 +355,98 @@ class ASEWriter(object):
                 diffuse_node.push_child('UVW_U_TILING').push_datum(1.0)
                 diffuse_node.push_child('UVW_V_TILING').push_datum(1.0)
 
-        for geometry_object in ase.geometry_objects:
-            geomobject_node = root.add_command('GEOMOBJECT')
-            geomobject_node.push_child('NODE_NAME').push_datum(geometry_object.name)
-
-            mesh_node = geomobject_node.push_child('MESH')
-
-            # Vertices
-            mesh_node.push_child('MESH_NUMVERTEX').push_datum(len(geometry_object.vertices))
-            vertex_list_node = mesh_node.push_child('MESH_VERTEX_LIST')
-            for vertex_index, vertex in enumerate(geometry_object.vertices):
-                mesh_vertex = vertex_list_node.push_child('MESH_VERTEX').push_datum(vertex_index)
-                mesh_vertex.push_data([x for x in vertex])
-
-            # Faces
-            mesh_node.push_child('MESH_NUMFACES').push_datum(len(geometry_object.faces))
-            faces_node = mesh_node.push_child('MESH_FACE_LIST')
-            for face_index, face in enumerate(geometry_object.faces):
-                face_node = faces_node.push_child('MESH_FACE')
-                face_node.push_datum({str(face_index): {'A': face.a, 'B': face.b, 'C': face.c, 'AB': 0, 'BC': 0, 'CA': 0}})
-                face_node.push_sub_command('MESH_SMOOTHING').push_datum(face.smoothing)
-                face_node.push_sub_command('MESH_MTLID').push_datum(face.material_index)
-
-            # Texture Coordinates
-            for i, uv_layer in enumerate(geometry_object.uv_layers):
-                parent_node = mesh_node if i == 0 else mesh_node.push_child('MESH_MAPPINGCHANNEL')
-                if i > 0:
-                    parent_node.push_datum(i + 1)
-                parent_node.push_child('MESH_NUMTVERTEX').push_datum(len(uv_layer.texture_vertices))
-                tvertlist_node = parent_node.push_child('MESH_TVERTLIST')
-                for tvert_index, tvert in enumerate(uv_layer.texture_vertices):
-                    tvert_node = tvertlist_node.push_child('MESH_TVERT')
-                    tvert_node.push_datum(tvert_index)
-                    tvert_node.push_data(list(tvert))
-                # Texture Faces
-                if len(geometry_object.texture_vertex_faces) > 0:
-                    parent_node.push_child('MESH_NUMTVFACES').push_datum(len(geometry_object.texture_vertex_faces))
-                    texture_faces_node = parent_node.push_child('MESH_TFACELIST')
-                    for texture_face_index, texture_face in enumerate(geometry_object.texture_vertex_faces):
-                        texture_face_node = texture_faces_node.push_child('MESH_TFACE')
-                        texture_face_node.push_data([texture_face_index] + list(texture_face))
-
-            # Normals
-            if len(geometry_object.face_normals) > 0:
-                normals_node = mesh_node.push_child('MESH_NORMALS')
-                for normal_index, normal in enumerate(geometry_object.face_normals):
-                    normal_node = normals_node.push_child('MESH_FACENORMAL')
-                    normal_node.push_datum(normal_index)
-                    normal_node.push_data(list(normal.normal))
-                    for vertex_normal in normal.vertex_normals:
-                        vertex_normal_node = normals_node.push_child('MESH_VERTEXNORMAL')
-                        vertex_normal_node.push_datum(vertex_normal.vertex_index)
-                        vertex_normal_node.push_data(list(vertex_normal.normal))
-
-            # Vertex Colors
-            if len(geometry_object.vertex_colors) > 0:
-                mesh_node.push_child('MESH_NUMCVERTEX').push_datum(len(geometry_object.vertex_colors))
-                cvert_list = mesh_node.push_child('MESH_CVERTLIST')
-                for i, vertex_color in enumerate(geometry_object.vertex_colors):
-                    cvert_list.push_child('MESH_VERTCOL').push_datum(i).push_data(vertex_color)
-                mesh_node.push_child('MESH_NUMCVFACES').push_datum(len(geometry_object.texture_vertex_faces))
-                texture_faces_node = mesh_node.push_child('MESH_CFACELIST')
-                for texture_face_index, texture_face in enumerate(geometry_object.texture_vertex_faces):
-                    texture_face_node = texture_faces_node.push_child('MESH_CFACE')
-                    texture_face_node.push_data([texture_face_index] + list(texture_face))
-
-            geomobject_node.push_child('MATERIAL_REF').push_datum(0)
+        return root
+
+    @staticmethod
+    def build_geometry_object_tree(root: ASEFile, geometry_object: ASEGeometryObject):
+        geomobject_node = root.add_command('GEOMOBJECT')
+        geomobject_node.push_child('NODE_NAME').push_datum(geometry_object.name)
+
+        mesh_node = geomobject_node.push_child('MESH')
+
+        # Vertices
+        mesh_node.push_child('MESH_NUMVERTEX').push_datum(len(geometry_object.vertices))
+        vertex_list_node = mesh_node.push_child('MESH_VERTEX_LIST')
+        for vertex_index, vertex in enumerate(geometry_object.vertices.tolist()):
+            mesh_vertex = vertex_list_node.push_child('MESH_VERTEX').push_datum(vertex_index)
+            mesh_vertex.push_data(vertex)
+
+        # Faces
+        mesh_node.push_child('MESH_NUMFACES').push_datum(len(geometry_object.face_indices))
+        faces_node = mesh_node.push_child('MESH_FACE_LIST')
+        for face_index, ((a, b, c), smoothing, material_index) in enumerate(zip(geometry_object.face_indices.tolist(),
+                                                                                 geometry_object.face_smoothing.tolist(),
+                                                                                 geometry_object.face_material_indices.tolist())):
+            face_node = faces_node.push_child('MESH_FACE')
+            face_node.push_datum({str(face_index): {'A': a, 'B': b, 'C': c, 'AB': 0, 'BC': 0, 'CA': 0}})
+            face_node.push_sub_command('MESH_SMOOTHING').push_datum(smoothing)
+            face_node.push_sub_command('MESH_MTLID').push_datum(material_index)
+
+        # Texture Coordinates
+        for i, uv_layer in enumerate(geometry_object.uv_layers):
+            parent_node = mesh_node if i == 0 else mesh_node.push_child('MESH_MAPPINGCHANNEL')
+            if i > 0:
+                parent_node.push_datum(i + 1)
+            parent_node.push_child('MESH_NUMTVERTEX').push_datum(len(uv_layer.texture_vertices))
+            tvertlist_node = parent_node.push_child('MESH_TVERTLIST')
+            for tvert_index, tvert in enumerate(uv_layer.texture_vertices.tolist()):
+                tvert_node = tvertlist_node.push_child('MESH_TVERT')
+                tvert_node.push_datum(tvert_index)
+                tvert_node.push_data(tvert)
+            # Texture Faces
+            texture_vertex_faces = geometry_object.get_texture_vertex_faces(uv_layer).tolist()
+            if len(texture_vertex_faces) > 0:
+                parent_node.push_child('MESH_NUMTVFACES').push_datum(len(texture_vertex_faces))
+                texture_faces_node = parent_node.push_child('MESH_TFACELIST')
+                for texture_face_index, texture_face in enumerate(texture_vertex_faces):
+                    texture_face_node = texture_faces_node.push_child('MESH_TFACE')
+                    texture_face_node.push_data([texture_face_index] + texture_face)
+
+        # Normals
+        if len(geometry_object.normals) > 0:
+            normals_node = mesh_node.push_child('MESH_NORMALS')
+            for normal_index, (normal, vertex_indices, vertex_normals) in enumerate(zip(geometry_object.normals.tolist(),
+                                                                                        geometry_object.face_indices.tolist(),
+                                                                                        geometry_object.vertex_normals.tolist())):
+                normal_node = normals_node.push_child('MESH_FACENORMAL')
+                normal_node.push_datum(normal_index)
+                normal_node.push_data(normal)
+                for vertex_index, vertex_normal in zip(vertex_indices, vertex_normals):
+                    vertex_normal_node = normals_node.push_child('MESH_VERTEXNORMAL')
+                    vertex_normal_node.push_datum(vertex_index)
+                    vertex_normal_node.push_data(vertex_normal)
+
+        # Vertex Colors
+        if len(geometry_object.vertex_colors) > 0:
+            mesh_node.push_child('MESH_NUMCVERTEX').push_datum(len(geometry_object.vertex_colors))
+            cvert_list = mesh_node.push_child('MESH_CVERTLIST')
+            for i, vertex_color in enumerate(geometry_object.vertex_colors.tolist()):
+                cvert_list.push_child('MESH_VERTCOL').push_datum(i).push_data(vertex_color)
+            color_vertex_faces = geometry_object.get_color_vertex_faces().tolist()
+            mesh_node.push_child('MESH_NUMCVFACES').push_datum(len(color_vertex_faces))
+            color_faces_node = mesh_node.push_child('MESH_CFACELIST')
+            for color_face_index, color_face in enumerate(color_vertex_faces):
+                color_face_node = color_faces_node.push_child('MESH_CFACE')
+                color_face_node.push_data([color_face_index] + color_face)
+
+        geomobject_node.push_child('MATERIAL_REF').push_datum(0)
 
+    @staticmethod
+    def build_ase_tree(ase: ASE) -> ASEFile:
+        root = ASEWriter.build_header_tree(ase)
+        for geometry_object in ase.geometry_objects:
+            ASEWriter.build_geometry_object_tree(root, geometry_object)
         return root
 
     def write(self, ase: ASE):
         self.indent = 0
-        ase_file = self.build_ase_tree(ase)
-        self.write_file(ase_file)
+        self.fp.reserve(estimate_ase_size(ase))
+        # The header and materials are small, so they are written through a command tree.
+        with self.stats.stage('write_header'):
+            self.write_file(self.build_header_tree(ase))
+        # The geometry objects are streamed directly from their arrays.
+        for geometry_object in ase.geometry_objects:
+            with self.stats.stage('write_geometry_object', geometry_object.name):
+                self.write_geometry_object(geometry_object)
+                if self.row_formatter is not None:
+                    self.row_formatter.release()